@@ -0,0 +1,111 @@
+# coding: utf-8
+"""
+基准脚本共用的本地 HTTP 服务、导入路径与缓存目录设置
+
+start_server() 在后台线程启动一个只监听回环地址的 HTTP/1.1 服务（keep-alive），代替真实数据源：
+- content 为 bytes：任何路径都返回这段正文
+- content 为 {路径: 正文}：按路径返回，未知路径 404
+- content 为函数：handler(request) -> (状态码, 响应头, 正文)，request 为 BaseHTTPRequestHandler，
+  POST 请求体已读入 request.body
+每个响应先等待 latency 秒；给出 kbps（KiB/s）时正文按 TCP 报文段大小分块限速发送。
+server.sent 记录每次响应实际发出的正文字节数（客户端提前断开时少于正文长度）。
+
+导入各工具脚本前调用 use_temp_cache_dir()：脚本在导入时按 CACHE_DIR 创建缓存、注册退出时落盘，
+不设置时会写进真实的 /cache。
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple, Union
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOOLS = os.path.dirname(HERE)
+SEND_CHUNK = 1460  # 限速时每次发送一个 TCP 报文段大小的数据
+
+Handler = Callable[[BaseHTTPRequestHandler], Tuple[int, Dict[str, str], bytes]]
+
+
+def add_tool_paths(*tools: str):
+    """把 python/tools 及其下的工具目录（如 "oil_price"）加入导入路径，之后可直接 import 各脚本与 common"""
+    for path in (TOOLS,) + tuple(os.path.join(TOOLS, tool) for tool in tools):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def use_temp_cache_dir() -> str:
+    """把 CACHE_DIR 指向新建的临时目录（进程退出时删除），子进程随环境变量继承；返回该目录"""
+    path = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ["CACHE_DIR"] = path
+    atexit.register(shutil.rmtree, path, True)  # 先于之后导入的脚本注册，最后执行
+    return path
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # 并发基准一次发出上百个连接
+
+    def __init__(self, handler: Handler, latency: float, kbps: Optional[float]):
+        super().__init__(("127.0.0.1", 0), _RequestHandler)
+        self.handler = handler
+        self.latency = latency
+        self.kbps = kbps
+        self.sent = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FixtureServer
+
+    def _respond(self):
+        self.body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        status, headers, body = self.server.handler(self)
+        self.send_response(status)
+        headers = {"Content-Type": "text/html; charset=utf-8", **headers, "Content-Length": str(len(body))}
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        sent = 0
+        chunk = SEND_CHUNK if self.server.kbps else max(len(body), 1)
+        try:
+            for start in range(0, len(body), chunk):
+                self.wfile.write(body[start:start + chunk])
+                sent += len(body[start:start + chunk])
+                if self.server.kbps:
+                    self.wfile.flush()
+                    time.sleep(chunk / (self.server.kbps * 1024))
+        except OSError:
+            self.close_connection = True  # 客户端提前断开
+        self.server.sent.append(sent)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(content: Union[bytes, Dict[str, bytes], Handler], latency: float = 0.0,
+                 kbps: Optional[float] = None) -> FixtureServer:
+    if callable(content):
+        handler = content
+    else:
+        pages = content
+
+        def handler(request):
+            body = pages if isinstance(pages, bytes) else pages.get(request.path)
+            return (404, {}, b"") if body is None else (200, {}, body)
+
+    server = FixtureServer(handler, latency, kbps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+多站点更新日志监控耗时：本地 HTTP 服务模拟 N 个更新日志页面（录制的 DigVPS 页面，
+每个页面最新一条内容不同，支持 ETag / 304），按 --latency 模拟网络延迟。
+
+分别测量：逐个检查（并发 1）、并发检查的首轮（全部为新内容）、
+以及第二轮（全部 304）的墙钟时间。推送被替换为空操作。
+
+用法：
+    python benchmarks/bench_changelog_watcher.py [--sites 200] [--latency 200] [--concurrency 32]
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(HERE, "fixtures", "digvps_update_log.html")
+
+from _fixture_server import add_tool_paths, start_server, use_temp_cache_dir  # noqa: E402
+
+use_temp_cache_dir()
+add_tool_paths("digvps_push")
+
+import changelog_watcher  # noqa: E402
+
+
+def changelog_handler(template: str):
+    """每个路径返回带有路径专属条目的页面，支持 If-None-Match 条件请求"""
+    def handler(request):
+        body = template.replace("12月28日</p>", f"12月28日</p><p>{request.path} 的最新条目</p>", 1).encode("utf-8")
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if request.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag}, body
+
+    return handler
+
+
+def timed_run(sites, db, concurrency):
+    store = changelog_watcher.WatchStore(db)
+    started = time.perf_counter()
+    results = changelog_watcher.run(sites, store, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    store.close()
+    assert not any(r.error for r in results), [r.error for r in results if r.error]
+    return elapsed, sum(bool(r.fresh) for r in results), sum(r.not_modified for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=200, help="模拟的单次请求延迟 (ms)")
+    parser.add_argument("--concurrency", type=int, default=changelog_watcher.WATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    changelog_watcher.push_serverchan = lambda title, desp: True
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        server = start_server(changelog_handler(f.read()), args.latency / 1000)
+    port = server.server_address[1]
+    # 每个站点用不同的主机名（*.localhost 由 curl 直接解析到回环地址），与真实场景一样各站点分属不同主机，
+    # 不受共享 HTTP 引擎的每主机并发上限约束
+    sites = [changelog_watcher.Site(name=f"site{i}", url=f"http://site{i}.localhost:{port}/site{i}/update-log")
+             for i in range(args.sites)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sequential, _, _ = timed_run(sites, os.path.join(tmp, "sequential.sqlite3"), 1)
+        db = os.path.join(tmp, "watch.sqlite3")
+        cold, fresh, _ = timed_run(sites, db, args.concurrency)
+        warm, _, not_modified = timed_run(sites, db, args.concurrency)
+
+    server.shutdown()
+    print(f"站点数: {args.sites}, 模拟延迟: {args.latency:.0f} ms, 并发: {args.concurrency}")
+    print(f"逐个检查（并发 1）:      {sequential:.2f}s")
+    print(f"并发检查，首轮:          {cold:.2f}s  （{fresh} 个站点有新内容）")
+    print(f"并发检查，第二轮:        {warm:.2f}s  （{not_modified} 个站点 304）")
+    print(f"加速比: {sequential / cold:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
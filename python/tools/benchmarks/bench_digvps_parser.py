@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+DigVPS 更新日志解析后端对比：BeautifulSoup（完整建树）与 lxml 流式解析。
+
+先校验两种后端在各 fixture、不同 max_items 下输出完全一致，再分别计时。
+
+用法：
+    python benchmarks/bench_digvps_parser.py [--rounds 200]
+"""
+
+import argparse
+import logging
+import os
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+from _fixture_server import add_tool_paths, use_temp_cache_dir  # noqa: E402
+
+use_temp_cache_dir()
+add_tool_paths("digvps_push")
+
+import digvps_update_push  # noqa: E402
+
+FIXTURES = ["digvps_update_log.html", "digvps_update_log_mixed.html"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    for name in FIXTURES:
+        with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+            page = f.read()
+
+        for max_items in (1, digvps_update_push.MAX_ITEMS, 100):
+            expected = digvps_update_push.extract_updates(page, max_items, backend="bs4")
+            actual = digvps_update_push.extract_updates(page, max_items, backend="lxml")
+            assert actual == expected, (name, max_items, expected, actual)
+
+        print(f"fixture: {name} ({len(page)} 字符), max_items={digvps_update_push.MAX_ITEMS}, rounds={args.rounds}")
+        timings = {}
+        for backend in digvps_update_push.PARSER_BACKENDS:
+            timings[backend] = min(timeit.repeat(
+                lambda: digvps_update_push.extract_updates(page, backend=backend),
+                number=args.rounds, repeat=3)) / args.rounds
+            print(f"  {backend:<5} {timings[backend] * 1000:8.3f} ms/页")
+        print(f"  加速比: {timings['bs4'] / timings['lxml']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
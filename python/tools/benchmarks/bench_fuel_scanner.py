@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+油价正则提取微基准：对比原先逐油品、逐模式的 re.search 循环与
+单次扫描的 scan_fuel_prices。
+
+原实现只提取 92/95 两种汽油：区块文本最多 6 次 search，整页兜底再对原始 HTML
+做 4 次 search；scan_fuel_prices 一次扫描提取 FUEL_GRADES 中的全部油品。
+价格区块按生产路径计时（区块元素取文本 + 提取）。加速比按首次扫描计算：每次调用前清空
+命中结果到油品价格的转换缓存（_parse_fuel_match），相当于新进程第一次遇到该页面；
+同一输入反复扫描（转换缓存命中，常驻调度的相邻轮询）单独列为稳态数字。
+
+用法：
+    python benchmarks/bench_fuel_scanner.py [--rounds 2000] [--fixture path]
+"""
+
+import argparse
+import logging
+import os
+import re
+import timeit
+
+from lxml import html
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+from _fixture_server import add_tool_paths, use_temp_cache_dir  # noqa: E402
+
+use_temp_cache_dir()
+add_tool_paths("oil_price")
+
+import get_price  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(HERE, "fixtures", "qiyoujiage_zhejiang.html")
+
+
+# ==================== 改造前的参考实现（已预编译） ====================
+
+LEGACY_SPECIFIC = {
+    '92号汽油': [re.compile(r'92号汽油[^\d]*([\d\.]+)\s*[元\(]'), re.compile(r'92[^\d]*([\d\.]+)\s*元'),
+               re.compile(r'汽油92[^\d]*([\d\.]+)')],
+    '95号汽油': [re.compile(r'95号汽油[^\d]*([\d\.]+)\s*[元\(]'), re.compile(r'95[^\d]*([\d\.]+)\s*元'),
+               re.compile(r'汽油95[^\d]*([\d\.]+)')],
+}
+LEGACY_GLOBAL = {
+    '92号汽油': re.compile(r'92号汽油[^\d]*([\d\.]+)\s*元'),
+    '95号汽油': re.compile(r'95号汽油[^\d]*([\d\.]+)\s*元'),
+    '汽油92': re.compile(r'汽油92[^\d]*([\d\.]+)\s*元'),
+    '汽油95': re.compile(r'汽油95[^\d]*([\d\.]+)\s*元'),
+}
+LEGACY_VALUE = re.compile(r'^\d+\.?\d*$')
+# 沿用逐模式写法、扩展到 FUEL_GRADES 全部油品时的代价（仅计时，不校验结果）
+EXTENDED_SPECIFIC = {
+    grade: [re.compile(grade + r'[^\d]*([\d\.]+)\s*[元\(]'),
+            re.compile(grade[-2:] + grade.split('号')[0] + r'[^\d]*([\d\.]+)')]
+    for grade in get_price.FUEL_GRADES
+}
+
+
+def legacy_specific(text, patterns=LEGACY_SPECIFIC):
+    prices = {}
+    for oil_type, pattern_list in patterns.items():
+        for pattern in pattern_list:
+            match = pattern.search(text)
+            if match and LEGACY_VALUE.match(match.group(1)):
+                prices[oil_type] = match.group(1)
+                break
+    return prices
+
+
+def extended_specific(text):
+    return legacy_specific(text, EXTENDED_SPECIFIC)
+
+
+def legacy_global(html_content):
+    prices = {}
+    for oil_type, pattern in LEGACY_GLOBAL.items():
+        match = pattern.search(html_content)
+        if match:
+            prices['92号汽油' if '92' in oil_type else '95号汽油'] = match.group(1)
+    return prices
+
+
+# ==================== 主流程 ====================
+
+def bench(fn, arg, rounds):
+    return min(timeit.repeat(lambda: fn(arg), number=rounds, repeat=5)) / rounds
+
+
+def first_scan(scan):
+    """清空转换缓存后再扫描：计时的是首次遇到该文本的耗时"""
+    def run(arg):
+        get_price._parse_fuel_match.cache_clear()
+        return scan(arg)
+    return run
+
+
+def report(label, chars, arg, legacy, extended, scan, rounds):
+    before = legacy(arg)
+    after = scan(arg)
+    assert before == {k: str(after[k].value) for k in before}, (before, after)
+    t_before = bench(legacy, arg, rounds)
+    t_extended = bench(extended, arg, rounds)
+    t_first = bench(first_scan(scan), arg, rounds)
+    t_steady = bench(scan, arg, rounds)
+    print(f"[{label}] {chars} 字符")
+    print(f"  逐模式 search（92/95）:   {t_before * 1e6:8.2f} us  提取 {len(before)} 种: {', '.join(before)}")
+    print(f"  逐模式 search（全部）:    {t_extended * 1e6:8.2f} us  共 {len(EXTENDED_SPECIFIC)} 种油品的模式")
+    print(f"  单次扫描（首次）:         {t_first * 1e6:8.2f} us  提取 {len(after)} 种: {', '.join(after)}")
+    print(f"  加速比（首次）: {t_before / t_first:.2f}x（对比全部油品: {t_extended / t_first:.2f}x）")
+    print(f"  稳态（同一输入重复扫描，转换缓存命中）: {t_steady * 1e6:8.2f} us，{t_before / t_steady:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    with open(args.fixture, encoding="utf-8") as f:
+        page = f.read()
+    # 与 extract_prices_advanced 相同：主 XPath 未命中时用第一个命中的备用选择器定位价格区块
+    tree = html.fromstring(page)
+    xpaths = [get_price.PRICE_DIV_XPATH] + [xpath for _, xpath in get_price.BACKUP_XPATHS]
+    elem = next(elems[0] for elems in (xpath(tree) for xpath in xpaths) if elems)
+
+    print(f"fixture: {os.path.basename(args.fixture)}, rounds={args.rounds}")
+    # 价格区块：从区块元素取文本到得出价格的完整路径（_extract_by_primary_xpath / 备用选择器）
+    report("价格区块", len(elem.text_content().strip()), elem,
+           lambda e: legacy_specific(e.text_content().strip()),
+           lambda e: extended_specific(e.text_content().strip()),
+           lambda e: get_price.extract_specific_oil_prices(get_price._element_text(e)), args.rounds)
+    # 整页兜底：对原始 HTML 做全局扫描
+    report("整页HTML", len(page), page, legacy_global, extended_specific, get_price.scan_fuel_prices, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+盘中监控的单次轮询开销与长时间运行的内存：模拟 --days 个交易日、每 --interval 秒一次轮询，
+价格随机游走，测量每次 update() + check() 的耗时，以及每个交易日结束时进程中仍存活的 Python 内存
+（tracemalloc；耗时记录预先分配，当日行情在记录前释放，剩下的增长即来自 IndexWatch）。
+
+两种行情：普通源（每次一个价格）与 Investing（每次返回当日开盘以来全部 1 分钟 K 线，只处理新增部分）。
+
+用法：
+    python benchmarks/bench_intraday.py [--days 60] [--interval 60]
+"""
+
+import argparse
+import gc
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "get_qqq"))
+
+from intraday import BAR_SECONDS, IndexWatch, parse_rules, ring_size  # noqa: E402
+from market_calendar import MARKET_TZ, session_for  # noqa: E402
+
+RULES = "open:1.5,prev:2,5m:0.5,15m:1,60m:2"
+
+
+def simulate(days: int, interval: float, bars: bool):
+    """返回 (每次轮询耗时 us, 每日结束时内存字节, 触发次数)"""
+    rng = random.Random(0)
+    rules = parse_rules(RULES)
+    watch = IndexWatch("NDX", rules, ring_size(rules, interval))
+    now = datetime(2026, 1, 5, 12, tzinfo=MARKET_TZ)
+    timings = array("d", bytes(8 * days * math.ceil(6.5 * 3600 / interval)))
+    memory = array("q", bytes(8 * days))
+    price, polls, alerts = 20000.0, 0, 0
+    tracemalloc.start()
+    for day in range(days):
+        opened, closes = session_for(now)
+        open_ts = opened.timestamp()
+        series = {"t": [open_ts - BAR_SECONDS], "o": [price], "c": [price]}   # 昨收
+        ts = open_ts
+        while ts < closes.timestamp():
+            price *= 1 + rng.gauss(0, 0.0008 * (interval / 60) ** 0.5)
+            if bars:
+                bar = open_ts + (ts - open_ts) // BAR_SECONDS * BAR_SECONDS
+                if series["t"][-1] == bar:
+                    series["c"][-1] = price
+                else:
+                    series["t"].append(bar), series["o"].append(price), series["c"].append(price)
+                quote = {"source": "investing", "price": price, "raw": series}
+            else:
+                quote = {"source": "yahoo", "price": price, "prev": series["c"][0], "raw": {}}
+            started = time.perf_counter()
+            watch.start_session(opened)
+            watch.update(quote, ts)
+            alerts += len(watch.check(ts))
+            timings[polls] = (time.perf_counter() - started) * 1e6
+            polls += 1
+            ts += interval
+        del series, quote
+        gc.collect()
+        memory[day] = tracemalloc.get_traced_memory()[0]
+        now = closes + timedelta(hours=1)
+    tracemalloc.stop()
+    return sorted(timings[:polls]), memory, alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--interval", type=float, default=60)
+    args = parser.parse_args()
+
+    rules = parse_rules(RULES)
+    print(f"规则: {RULES}，轮询间隔 {args.interval:g}s，缓冲区 {ring_size(rules, args.interval)} 个价格，{args.days} 个交易日")
+    for name, bars in (("单价格", False), ("1 分钟 K 线", True)):
+        timings, memory, alerts = simulate(args.days, args.interval, bars)
+        print(f"  {name:<10} 轮询 {len(timings)} 次，update+check 中位 {statistics.median(timings):.1f}us，"
+              f"p99 {timings[int(len(timings) * 0.99)]:.1f}us；触发 {alerts} 次；"
+              f"内存 第 1 天 {memory[0] / 1024:.1f} KiB、第 {args.days // 2} 天 {memory[args.days // 2 - 1] / 1024:.1f} KiB、"
+              f"第 {args.days} 天 {memory[-1] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+推送发件箱耗时与行为：本地 HTTP 服务模拟 ServerChan（--latency 模拟往返延迟）。
+
+分别测量：
+- 逐条同步推送（旧实现：每条消息一次 requests.post，调用方等待往返）时调用方的耗时
+- 写入发件箱时调用方的耗时，以及退出时合并投递的请求次数
+- ServerChan 返回错误时消息留在发件箱、按退避重新排队
+- 每日额度用完时消息不投递
+
+用法：
+    python benchmarks/bench_notifier.py [--messages 5] [--latency 300]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+import requests
+
+from _fixture_server import add_tool_paths, start_server, use_temp_cache_dir
+
+use_temp_cache_dir()
+add_tool_paths()
+
+from common import notifier  # noqa: E402
+
+
+def serverchan_handler(state):
+    """模拟 ServerChan：统计请求次数，state["fail"] 为真时返回业务错误"""
+    def handler(request):
+        state["posts"] += 1
+        body = json.dumps({"code": 40001 if state["fail"] else 0, "message": ""}).encode("utf-8")
+        return 200, {"Content-Type": "application/json"}, body
+
+    return handler
+
+
+def statuses(db):
+    with sqlite3.connect(db) as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=300, help="模拟的 ServerChan 往返延迟 (ms)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    state = {"posts": 0, "fail": False}
+    server = start_server(serverchan_handler(state), args.latency / 1000)
+    notifier.SERVERCHAN_API = f"{server.url}/{{sendkey}}.send"
+    messages = [(f"通知 {i}", f"内容 {i}") for i in range(args.messages)]
+
+    started = time.perf_counter()
+    for title, desp in messages:
+        requests.post(notifier.SERVERCHAN_API.format(sendkey="SCTbench"),
+                      data={"title": title, "desp": desp}, timeout=10)
+    blocking = time.perf_counter() - started
+    blocking_posts, state["posts"] = state["posts"], 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "outbox.sqlite3")
+
+        outbox = notifier.Notifier("SCTbench", db_path=db, coalesce_seconds=30)
+        started = time.perf_counter()
+        for title, desp in messages:
+            outbox.send(title, desp)
+        enqueue = time.perf_counter() - started
+        started = time.perf_counter()
+        outbox.close()
+        drain = time.perf_counter() - started
+        coalesced_posts, state["posts"] = state["posts"], 0
+        assert statuses(db) == {"sent": args.messages}, statuses(db)
+
+        state["fail"] = True
+        failing = notifier.Notifier("SCTbench", db_path=db, coalesce_seconds=0)
+        failing.send("失败的通知", "内容")
+        failing.close()
+        with sqlite3.connect(db) as conn:
+            attempts, delay = conn.execute(
+                "SELECT attempts, next_attempt_at - created_at FROM messages WHERE title = '失败的通知'").fetchone()
+        assert statuses(db).get("pending") == 1, statuses(db)
+
+        state["fail"] = False
+        limited = notifier.Notifier("SCTother", db_path=db, coalesce_seconds=0, daily_quota=2)
+        for i in range(3):
+            limited.send(f"额度测试 {i}", "内容")
+            limited.close()
+            limited = notifier.Notifier("SCTother", db_path=db, coalesce_seconds=0, daily_quota=2)
+        with sqlite3.connect(db) as conn:
+            quota = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM messages WHERE title LIKE '额度测试%' GROUP BY status").fetchall())
+
+    server.shutdown()
+    print(f"消息数: {args.messages}, 模拟延迟: {args.latency:.0f} ms")
+    print(f"逐条同步推送: 调用方耗时 {blocking * 1000:.1f} ms, 请求 {blocking_posts} 次")
+    print(f"写入发件箱:   调用方耗时 {enqueue * 1000:.1f} ms, 退出时投递 {drain * 1000:.1f} ms, 请求 {coalesced_posts} 次")
+    print(f"推送失败:     消息保留在发件箱，已尝试 {attempts} 次，{delay:.0f}s 后重试")
+    print(f"每日额度 2:   连续 3 次运行各发 1 条 → {quota}")
+
+
+if __name__ == "__main__":
+    main()
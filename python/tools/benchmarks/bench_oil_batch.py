@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+多省批量模式耗时对比：N 次单省运行（每次独立进程，模拟一省一个容器）
+与一次 --all 批量运行的墙钟时间。
+
+为保证可重复，数据源替换为本地 HTTP 服务（返回录制的页面，并按 --latency
+模拟网络延迟），通过 OIL_PRICE_URL_TEMPLATE 注入。
+
+用法：
+    python benchmarks/bench_oil_batch.py [--latency 200] [--concurrency 8]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "..", "oil_price", "get_price.py")
+FIXTURE = os.path.join(HERE, "fixtures", "qiyoujiage_zhejiang.html")
+
+from _fixture_server import add_tool_paths, start_server, use_temp_cache_dir  # noqa: E402
+
+use_temp_cache_dir()  # 子进程继承，逐省与批量运行都不写真实的 /cache
+add_tool_paths("oil_price")
+
+from get_price import PROVINCES  # noqa: E402
+
+
+def run(args, env, cwd):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, SCRIPT] + args, env=env, cwd=cwd,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=200, help="模拟的单次请求延迟 (ms)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(FIXTURE, "rb") as f:
+        body = f.read()
+    server = start_server(body, args.latency / 1000)
+
+    env = dict(os.environ)
+    env["OIL_PRICE_URL_TEMPLATE"] = f"{server.url}/{{province}}.shtml"
+    env["SERVERCHAN_SENDKEY"] = "YOUR_SENDKEY_HERE"  # 不推送
+
+    with tempfile.TemporaryDirectory() as cwd:
+        sequential = 0.0
+        for province in PROVINCES:
+            sequential += run([], dict(env, PROVINCE=province), cwd)
+        batch = run(["--all", "--concurrency", str(args.concurrency)], env, cwd)
+
+    server.shutdown()
+    print(f"省份数: {len(PROVINCES)}, 模拟延迟: {args.latency:.0f} ms, 并发: {args.concurrency}")
+    print(f"逐省独立运行: {sequential:.2f}s")
+    print(f"批量模式 --all: {batch:.2f}s")
+    print(f"加速比: {sequential / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
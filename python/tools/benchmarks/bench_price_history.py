@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+油价历史存储查询耗时：生成 --years 年、31 个省份、8 个油品的历史
+（最坏情况：每天都有一条变化记录；实际只在调价时写入，约每 10 天一条），测量：
+
+- 写入一次全国抓取结果（31 省 × 8 油品，含与上一条比较及 30 天前价格查询）
+- 单省单油品全部历史、单油品全国一年历史、全表全部历史
+- 全国每个省份每个油品的 30 天前价格
+
+用法：
+    python benchmarks/bench_price_history.py [--years 5]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+from _fixture_server import add_tool_paths, use_temp_cache_dir  # noqa: E402
+
+use_temp_cache_dir()
+add_tool_paths("oil_price")
+
+from price_history import PriceHistory  # noqa: E402
+
+PROVINCES = [f"p{i:02d}" for i in range(31)]
+GRADES = ("89号汽油", "92号汽油", "95号汽油", "98号汽油", "0号柴油", "-10号柴油", "-20号柴油", "-35号柴油")
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    days = args.years * 365
+    start = datetime(2020, 1, 1, 9)
+    rng = random.Random(0)
+    rows = [
+        (province, grade, int((start + timedelta(days=day)).timestamp()), Decimal(rng.randrange(6000, 9000)) / 1000)
+        for province in PROVINCES for grade in GRADES for day in range(days)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite3")
+        history = PriceHistory(path)
+        load_ms, _ = timed(lambda: history.extend(rows))
+        size = os.path.getsize(path)
+
+        now = start + timedelta(days=days)
+        snapshot = {grade: Decimal("7.123") for grade in GRADES}
+        record_ms, _ = timed(lambda: [history.record(p, snapshot, now) for p in PROVINCES])
+        one_ms, one = timed(lambda: history.series("p07", "92号汽油"))
+        grade_ms, grade = timed(lambda: history.series(grade="92号汽油", start=now - timedelta(days=365), end=now))
+        all_ms, everything = timed(lambda: history.series())
+        month_ms, _ = timed(lambda: [history.price_at(p, g, now - timedelta(days=30)) for p in PROVINCES for g in GRADES])
+        history.close()
+
+    print(f"历史行数: {len(rows)}（{args.years} 年 × 31 省 × 8 油品，每天一条），文件 {size / 1024 / 1024:.1f} MiB，导入 {load_ms:.0f} ms")
+    print(f"写入一次全国抓取（248 个油品价格）:  {record_ms:.1f} ms")
+    print(f"单省单油品全部历史（{len(one)} 行）:   {one_ms:.1f} ms")
+    print(f"单油品全国一年（{len(grade)} 行）:     {grade_ms:.1f} ms")
+    print(f"全部历史（{len(everything)} 行）:      {all_ms:.0f} ms")
+    print(f"全国 248 个 30 天前价格:             {month_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+行情缓存能省下多少次请求：按 cron 表达式（容器时区，默认 Asia/Shanghai）模拟 --year 一整年的指数任务触发，
+用交易日历与 QuoteCache 判断每次触发是否需要访问数据源，统计需要联网的运行次数。
+
+每次联网的运行对每个数据源各发一次批量请求，请求数按同一比例减少。
+
+用法：
+    python benchmarks/bench_quote_cache.py [--year 2026] [--tz Asia/Shanghai] [--cron "0 * * * *" ...]
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from _fixture_server import add_tool_paths
+
+add_tool_paths("get_qqq", "scheduler")
+
+from market_calendar import is_open  # noqa: E402
+from quote_cache import QuoteCache, session_ttl  # noqa: E402
+from scheduler import CronSchedule  # noqa: E402
+
+DEFAULT_SCHEDULES = ("*/30 * * * *", "0 * * * *", "0 */2 * * *", "30 5 * * 2-6")
+
+
+def simulate(expr: str, year: int, tz: ZoneInfo, path: str):
+    """返回 (触发次数, 联网次数, 其中盘中联网次数, 运行间隔秒)"""
+    schedule = CronSchedule(expr)
+    first = schedule.next_after(datetime(year - 1, 12, 31, 23, 59))
+    interval = (schedule.next_after(first) - first).total_seconds()
+    ttl = session_ttl(interval)
+    cache = QuoteCache(path)
+    runs = fetches = in_session = 0
+    t = datetime(year - 1, 12, 31, 23, 59)
+    while True:
+        t = schedule.next_after(t)
+        if t.year > year:
+            break
+        now = t.replace(tzinfo=tz)
+        runs += 1
+        if cache.get("nasdaq100", now, ttl) is None:
+            fetches += 1
+            in_session += is_open(now)
+            cache.put("nasdaq100", {"price": 1.0}, now)
+    return runs, fetches, in_session, interval
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--year", type=int, default=2026)
+    parser.add_argument("--tz", default="Asia/Shanghai", help="cron 表达式所在时区（容器时区）")
+    parser.add_argument("--cron", nargs="+", default=DEFAULT_SCHEDULES)
+    args = parser.parse_args()
+
+    tz = ZoneInfo(args.tz)
+    print(f"{args.year} 年，cron 时区 {args.tz}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, expr in enumerate(args.cron):
+            runs, fetches, in_session, interval = simulate(expr, args.year, tz, os.path.join(tmp, f"{i}.json"))
+            print(f"  {expr:<16} 触发 {runs:5d} 次，需联网 {fetches:5d} 次（盘中 {in_session}，收盘后 {fetches - in_session}），"
+                  f"减少 {(1 - fetches / runs) * 100:4.1f}%（盘中缓存 {session_ttl(interval):.0f}s）")
+
+
+if __name__ == "__main__":
+    main()
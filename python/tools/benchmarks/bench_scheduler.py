@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+常驻调度 vs 每次运行一个进程：油价任务的单次耗时与 CPU 时间
+
+- 每次一个进程：python get_price.py 运行 --runs 次（模拟外部 cron 每次启动一个容器，
+  不含容器本身的创建与销毁开销），CPU 时间取子进程的 user+sys
+- 常驻进程：在本进程内导入一次 get_price，再调用 get_price.main([]) --runs 次，
+  与调度进程中的运行方式相同；分别给出首次（含导入）与之后每次的耗时
+
+数据源替换为本地 HTTP 服务（录制页面，HTTP/1.1 keep-alive，按 --latency 模拟延迟）。
+本地为明文 HTTP，无法体现 TLS 握手的节省，真实数据源上常驻进程的优势更大。
+
+用法：
+    python benchmarks/bench_scheduler.py [--runs 10] [--latency 50]
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "..", "oil_price", "get_price.py")
+FIXTURE = os.path.join(HERE, "fixtures", "qiyoujiage_zhejiang.html")
+
+from _fixture_server import add_tool_paths, start_server  # noqa: E402
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=50, help="模拟的单次请求延迟 (ms)")
+    args = parser.parse_args()
+
+    with open(FIXTURE, "rb") as f:
+        server = start_server(f.read(), args.latency / 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["OIL_PRICE_URL_TEMPLATE"] = f"{server.url}/{{province}}.shtml"
+        os.environ["SERVERCHAN_SENDKEY"] = "YOUR_SENDKEY_HERE"  # 不推送
+        os.environ["CACHE_DIR"] = tmp
+        os.chdir(tmp)  # 日志文件写到临时目录
+
+        wall, cpu = [], []
+        for _ in range(args.runs):
+            started, cpu_started = time.perf_counter(), children_cpu()
+            subprocess.run([sys.executable, SCRIPT], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            wall.append(time.perf_counter() - started)
+            cpu.append(children_cpu() - cpu_started)
+
+        warm_wall, warm_cpu = [], []
+        for i in range(args.runs):
+            started, cpu_started = time.perf_counter(), time.process_time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if i == 0:
+                    add_tool_paths("oil_price")
+                    import get_price
+                    logging.disable(logging.CRITICAL)
+                get_price.main([])
+            warm_wall.append(time.perf_counter() - started)
+            warm_cpu.append(time.process_time() - cpu_started)
+
+    server.shutdown()
+    steady_wall, steady_cpu = statistics.median(warm_wall[1:]), statistics.median(warm_cpu[1:])
+    print(f"运行次数: {args.runs}, 模拟延迟: {args.latency:.0f} ms")
+    print(f"每次一个进程:   中位耗时 {statistics.median(wall) * 1000:.0f} ms, CPU {statistics.median(cpu) * 1000:.0f} ms")
+    print(f"常驻进程首次:   耗时 {warm_wall[0] * 1000:.0f} ms, CPU {warm_cpu[0] * 1000:.0f} ms（含导入）")
+    print(f"常驻进程之后:   中位耗时 {steady_wall * 1000:.0f} ms, CPU {steady_cpu * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+流式读取 vs 完整下载：油价页面（读到价格与调整信息区块即断开）与 DigVPS 更新日志
+（凑够 MAX_ITEMS 条即断开）的传输字节数、耗时与解析期间的内存峰值。
+
+数据源替换为本地 HTTP 服务，返回录制的页面，正文按 --kbps 限速分块发送以模拟慢速链路，
+首字节前按 --latency 模拟网络延迟；--pad 在 </body> 前追加若干 KiB 的列表内容，
+模拟页面底部的评论、相关链接等（目标区块之后的内容越多，流式读取省得越多）。
+完整下载一侧关闭解析结果缓存，每次都重新解析。
+
+用法：
+    python benchmarks/bench_stream_fetch.py [--rounds 5] [--latency 50] [--kbps 256] [--pad 0]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OIL_FIXTURE = os.path.join(HERE, "fixtures", "qiyoujiage_zhejiang.html")
+DIGVPS_FIXTURE = os.path.join(HERE, "fixtures", "digvps_update_log.html")
+
+from _fixture_server import add_tool_paths, start_server  # noqa: E402
+
+
+class NoParseCache:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def key(self, data, extra=""):
+        return ""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        pass
+
+
+def measure(server, fn, rounds):
+    """返回 (结果, 中位耗时秒, 中位发送字节, 内存峰值字节)"""
+    times, sent, peaks = [], [], []
+    for _ in range(rounds):
+        server.sent.clear()
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        time.sleep(0.05)  # 等服务端记下发送字节数
+        sent.append(sum(server.sent))
+    return result, statistics.median(times), statistics.median(sent), statistics.median(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=50, help="首字节前的模拟延迟 (ms)")
+    parser.add_argument("--kbps", type=float, default=256, help="模拟链路带宽 (KiB/s)")
+    parser.add_argument("--pad", type=int, default=0, help="页面末尾追加的内容 (KiB)")
+    args = parser.parse_args()
+
+    filler = b"<ul>" + b"<li><a href='/news/1.shtml'>\xe6\xb2\xb9\xe4\xbb\xb7\xe8\xb5\xb0\xe5\x8a\xbf</a></li>" * (args.pad * 1024 // 60) + b"</ul>"
+    with open(OIL_FIXTURE, "rb") as f:
+        oil_page = f.read().replace(b"</body>", filler + b"</body>", 1)
+    with open(DIGVPS_FIXTURE, "rb") as f:
+        digvps_page = f.read().replace(b"</body>", filler + b"</body>", 1)
+    server = start_server({"/zhejiang.shtml": oil_page, "/update-log": digvps_page},
+                          args.latency / 1000, args.kbps)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CACHE_DIR"] = tmp
+        os.environ["OIL_PRICE_URL_TEMPLATE"] = f"{server.url}/{{province}}.shtml"
+        os.chdir(tmp)  # 日志文件写到临时目录
+        add_tool_paths("oil_price", "digvps_push")
+        import get_price
+        import digvps_update_push
+        logging.disable(logging.CRITICAL)
+        get_price.http_cache.conditional_headers = lambda url: {}  # 每次都完整请求，不走 304
+        get_price.parse_cache.memoize = lambda data, parse, extra="": parse()
+
+        def oil():
+            data = get_price.fetch_oil_price_from_source(get_price.OIL_PRICE_URL)
+            return {k: str(v) for k, v in data.prices.items()}, data.adjustment_info
+
+        def digvps(fetch):
+            index = digvps_update_push.EntryIndex()
+            return lambda: fetch(f"{server.url}/update-log", None, index)[0]
+
+        digvps_update_push.ParseCache = NoParseCache
+
+        cases = []
+        for stream in (False, True):
+            get_price.STREAM_FETCH = stream
+            cases.append(("油价页面", stream, measure(server, oil, args.rounds)))
+        cases.append(("DigVPS 更新日志", False, measure(server, digvps(digvps_update_push.fetch_updates), args.rounds)))
+        cases.append(("DigVPS 更新日志", True, measure(server, digvps(digvps_update_push.stream_updates), args.rounds)))
+
+    server.shutdown()
+    print(f"模拟延迟: {args.latency:.0f} ms, 带宽: {args.kbps:.0f} KiB/s, 每项 {args.rounds} 次取中位数，内存峰值为 tracemalloc 统计的 Python 分配")
+    print(f"油价页面 {len(oil_page)} 字节，DigVPS 页面 {len(digvps_page)} 字节")
+    results = {}
+    for name, stream, (result, elapsed, sent, peak) in cases:
+        results.setdefault(name, []).append(result)
+        print(f"  {name:<14} {'流式' if stream else '完整'}:  耗时 {elapsed * 1000:6.0f} ms  "
+              f"服务端发出 {sent / 1024:5.1f} KiB  内存峰值 {peak / 1024:6.1f} KiB")
+    for name, (full, streamed) in results.items():
+        print(f"  {name} 两种方式结果{'一致' if full == streamed else '不一致！'}")
+
+
+if __name__ == "__main__":
+    main()
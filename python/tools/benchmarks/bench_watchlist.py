@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+大观察列表：各数据源替换为模拟接口（固定延迟 + 服务端限流，超过每秒请求上限返回 429），
+对比"不限速、开头集中突发"与按 SOURCE_LIMITS 分批、令牌桶限速、在窗口内均摊的调度：
+取到的代码数、被限流的请求数、耗时与各源吞吐（有效代码/秒）。
+
+模拟列表：--symbols 个代码，Yahoo 覆盖 90%（其中 5% 不返回数据），Sina 覆盖前 1/3，Stooq 全部，Investing 前 10%。
+为缩短运行时间，所有时间（延迟、限流、窗口、令牌速度）按 --speedup 倍加速，输出已折算回实际时间。
+
+用法：
+    python benchmarks/bench_watchlist.py [--symbols 300] [--window 60] [--speedup 10]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import replace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 源 -> (单次延迟秒, 服务端每秒允许的请求数)
+SERVERS = {"yahoo": (0.4, 2), "sina": (0.15, 5), "stooq": (0.3, 1), "investing": (0.3, 2)}
+
+
+def make_watchlist(n: int):
+    rng = random.Random(0)
+    symbols = []
+    for i in range(n):
+        entry = {"key": f"s{i:04d}", "name": f"S{i:04d}", "stooq": f"s{i:04d}.us"}
+        if i % 10:
+            entry["yahoo"] = f"Y{i:04d}"
+        if i < n // 3:
+            entry["sina"] = f"gb_s{i:04d}"
+        if i < n // 10:
+            entry["alt_symbol"] = f"I{i:04d}"
+        symbols.append(entry)
+    missing = {s["yahoo"] for s in symbols if "yahoo" in s and rng.random() < 0.05}
+    return symbols, missing
+
+
+class FakeSource:
+    """模拟接口：每次请求 latency 秒；最近 1 秒内的请求数超过 per_second 时返回 429"""
+
+    def __init__(self, latency: float, per_second: float, speedup: float, missing=()):
+        self.latency = latency / speedup
+        self.per_second = per_second
+        self.window = 1.0 / speedup
+        self.missing = set(missing)
+        self.recent = deque()
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, symbols):
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] > self.window:
+                self.recent.popleft()
+            self.recent.append(now)
+            limited = len(self.recent) > self.per_second
+            if limited:
+                self.throttled += 1
+        time.sleep(self.latency)
+        if limited:
+            raise RuntimeError("HTTP 429 Too Many Requests")
+        return {s: {"price": 100.0, "prev": 99.0, "source": "fake", "symbol": s}
+                for s in symbols if s not in self.missing}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--window", type=float, default=60, help="一次运行的时间窗口（秒，实际时间）")
+    parser.add_argument("--speedup", type=float, default=10)
+    args = parser.parse_args()
+
+    symbols, missing = make_watchlist(args.symbols)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "watchlist.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"symbols": symbols}, f)
+        os.environ.update(CACHE_DIR=tmp, WATCHLIST_FILE=path)
+        sys.path.insert(0, os.path.join(HERE, "..", "get_qqq"))
+        import index_notify
+        import watchlist
+        from quote_cache import QuoteCache
+        from source_health import Scoreboard
+        logging.disable(logging.CRITICAL)
+
+        modes = {
+            # 不限速：令牌充足、并发不设限，全部请求一开始就发出
+            "突发": {src: replace(limit, rate=1e6, burst=10 ** 6, concurrency=64)
+                     for src, limit in watchlist.SOURCE_LIMITS.items()},
+            "限速均摊": {src: replace(limit, rate=limit.rate * args.speedup)
+                         for src, limit in watchlist.SOURCE_LIMITS.items()},
+        }
+        print(f"{args.symbols} 个代码，窗口 {args.window:.0f}s，模拟服务端限流（次/秒）: "
+              + "，".join(f"{src} {per_second}" for src, (_, per_second) in SERVERS.items()))
+        for mode, limits in modes.items():
+            servers = {src: FakeSource(latency, per_second, args.speedup, missing if src == "yahoo" else ())
+                       for src, (latency, per_second) in SERVERS.items()}
+            index_notify.scoreboard = Scoreboard(os.path.join(tmp, f"scores_{mode}.json"))
+            index_notify.quote_cache = QuoteCache(os.path.join(tmp, f"quotes_{mode}.json"))
+            index_notify.batch_scheduler = watchlist.BatchScheduler(
+                servers, limits, {src: watchlist.TokenBucket(limit.rate, limit.burst) for src, limit in limits.items()})
+            started = time.monotonic()
+            results = index_notify.get_index_values(deadline=args.window / args.speedup)
+            elapsed = (time.monotonic() - started) * args.speedup
+            throttled = sum(server.throttled for server in servers.values())
+            print(f"  {mode}: 取到 {len(results)}/{args.symbols}，被限流 {throttled} 次，耗时 {elapsed:.1f}s")
+            throughput = next((r["throughput"] for r in results.values()), {})
+            latencies = next((r["latencies"] for r in results.values()), {})
+            for src, rate in throughput.items():
+                rate = "-" if rate is None else f"{rate / args.speedup:.1f} 个/秒"
+                spent = latencies.get(src)
+                spent = "-" if spent is None else f"{spent * args.speedup:.1f}s"
+                print(f"    {src:<10} {rate:<12} 用时 {spent:<8} 被限流 {servers[src].throttled} 次")
+
+
+if __name__ == "__main__":
+    main()
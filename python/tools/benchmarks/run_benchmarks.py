@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+离线解析基准：用 fixtures/ 下录制的响应逐个测量各解析函数，无需网络。
+
+覆盖：
+- oil_price: extract_prices_advanced / extract_adjustment_info（qiyoujiage、东方财富）/ scan_fuel_prices
+- digvps_push: extract_updates（lxml / bs4 两种后端）
+- get_qqq: Yahoo / Sina / Stooq / Investing 各 fetch_from_* 的解析路径
+
+输出每项的 ops/sec 与单次调用峰值内存（tracemalloc，只统计 Python 层分配，
+lxml 等 C 扩展内部的内存不计入），可保存为 JSON，并与之前保存的结果对比，
+用于跨提交发现性能回退。
+
+用法：
+    python benchmarks/run_benchmarks.py [--json out.json] [--compare base.json] [--filter oil]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+
+from _fixture_server import add_tool_paths, use_temp_cache_dir  # noqa: E402
+
+# 缓存写到临时目录，避免基准运行污染 /cache
+use_temp_cache_dir()
+add_tool_paths("oil_price", "digvps_push", "get_qqq")
+
+import get_price  # noqa: E402
+import digvps_update_push  # noqa: E402
+import index_notify  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+
+
+def fixture(name, mode="r"):
+    encoding = None if "b" in mode else "utf-8"
+    with open(os.path.join(FIXTURES, name), mode, encoding=encoding) as f:
+        return f.read()
+
+
+def stooq_ingest(csv_bytes, root):
+    """Stooq 解析路径：流式逐行解析并写入本地历史，再取最近两行"""
+    store = HistoryStore(root, "^ndx")
+    for column in os.listdir(store.dir) if os.path.isdir(store.dir) else ():
+        os.remove(os.path.join(store.dir, column))
+    store.extend(index_notify.iter_stooq_rows(csv_bytes.splitlines()))
+    return store.tail(2)
+
+
+def build_cases():
+    qiyoujiage = fixture("qiyoujiage_zhejiang.html")
+    eastmoney = fixture("eastmoney_zhejiang.html")
+    digvps = fixture("digvps_update_log.html")
+    digvps_known = set(digvps_update_push.extract_updates(digvps, max_items=1))
+    yahoo = fixture("yahoo_quote.json", "rb")
+    sina = fixture("sina_hq.txt")
+    stooq = fixture("stooq_ndx_d.csv", "rb")
+    tvc4 = fixture("tvc4_ndx_history.json", "rb")
+    history_root = tempfile.mkdtemp(prefix="bench-history-")
+
+    return {
+        "oil.extract_prices_advanced.qiyoujiage": lambda: get_price.extract_prices_advanced(qiyoujiage, "fixture"),
+        "oil.extract_prices_advanced.eastmoney": lambda: get_price.extract_prices_advanced(eastmoney, "fixture"),
+        "oil.extract_adjustment_info.qiyoujiage": lambda: get_price.extract_adjustment_info(qiyoujiage),
+        "oil.extract_oil_page.qiyoujiage": lambda: get_price.extract_oil_page(qiyoujiage, "fixture"),
+        "oil.scan_fuel_prices.qiyoujiage": lambda: get_price.scan_fuel_prices(qiyoujiage),
+        "digvps.extract_updates.lxml": lambda: digvps_update_push.extract_updates(digvps, backend="lxml"),
+        "digvps.extract_updates.bs4": lambda: digvps_update_push.extract_updates(digvps, backend="bs4"),
+        # 稳态：最新一条已在条目索引中，解析到它即停止
+        "digvps.extract_updates.known": lambda: digvps_update_push.extract_updates(digvps, stop_at=digvps_known.__contains__),
+        "index.parse_yahoo": lambda: index_notify.parse_yahoo(yahoo),
+        "index.parse_sina": lambda: index_notify.parse_sina(sina),
+        "index.parse_stooq": lambda: stooq_ingest(stooq, history_root),
+        "index.parse_investing": lambda: index_notify.parse_investing(tvc4, "NDX"),
+    }
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    # 自动确定每轮调用次数，使单轮耗时不少于 min_time
+    number = 1
+    while True:
+        elapsed = timeit.timeit(fn, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": 1 / best, "mean_us": best * 1e6, "peak_kib": peak / 1024}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="保存结果到 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少计时秒数")
+    args = parser.parse_args()
+
+    # 基准期间屏蔽业务日志，避免 I/O 干扰计时
+    logging.disable(logging.CRITICAL)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'case':<42} {'ops/sec':>12} {'mean':>12} {'peak':>10}  {'vs base':>8}")
+    for name, fn in build_cases().items():
+        if args.filter not in name:
+            continue
+        r = measure(fn, min_time=args.min_time)
+        results[name] = r
+        delta = ""
+        if name in baseline:
+            delta = f"{(r['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1) * 100:+.1f}%"
+        print(f"{name:<42} {r['ops_per_sec']:>12.1f} {r['mean_us']:>10.1f}us {r['peak_kib']:>8.1f}KiB  {delta:>8}")
+
+    if args.json:
+        report = {
+            "revision": git_revision(),
+            "created_at": datetime.now().astimezone().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
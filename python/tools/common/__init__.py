@@ -0,0 +1,5 @@
+"""
+python/tools 下各脚本共用的工具模块
+
+容器内与脚本一同复制到 /app/common，本地运行时由脚本把 python/tools 加入 sys.path。
+"""
@@ -0,0 +1,71 @@
+# coding: utf-8
+"""
+HTTP 条件请求缓存（ETag / Last-Modified）
+
+按 URL 持久化服务器返回的校验字段和上次的解析结果。下次请求带上
+If-None-Match / If-Modified-Since，服务器返回 304 时直接复用上次的解析结果，
+省去下载与解析。
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from common.json_store import atomic_write_json, load_json
+
+# 与 digvps 的 CACHE_FILE 共用同一个 /cache 挂载卷
+CACHE_DIR = os.getenv("CACHE_DIR", "/cache")
+
+
+class ValidatorCache:
+    """按 URL 保存 {etag, last_modified, payload} 的 JSON 文件缓存，线程安全"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = load_json(path, {}, "HTTP 缓存")
+
+    def _save(self):
+        atomic_write_json(self.path, self._entries, "HTTP 缓存")
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        生成条件请求头；没有可复用的解析结果时返回空字典（必须完整下载）
+        """
+        entry = self._entries.get(url)
+        if not entry or entry.get("payload") is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def is_not_modified(response) -> bool:
+        return response is not None and response.status_code == 304
+
+    def payload(self, url: str) -> Optional[Any]:
+        entry = self._entries.get(url)
+        return entry.get("payload") if entry else None
+
+    def store(self, url: str, response_headers, payload: Any):
+        """
+        记录响应的校验字段与对应的解析结果（payload 需可 JSON 序列化）
+
+        服务器未返回任何校验字段时不缓存
+        """
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "payload": payload,
+                "updated_at": int(time.time()),
+            }
+            self._save()
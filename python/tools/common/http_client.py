@@ -0,0 +1,259 @@
+# coding: utf-8
+"""
+共享异步 HTTP 引擎（curl_cffi AsyncSession）
+
+油价、指数、DigVPS 各脚本的请求都交给进程内同一个引擎，常驻调度进程中三个任务也共用：
+- 连接池：一个后台事件循环线程 + 一个 AsyncSession（libcurl multi 句柄），
+  同一主机的 keep-alive 连接在所有请求、多次运行之间复用，HTTP/2 时多个请求复用一条连接
+- DNS 缓存：multi 句柄内所有请求共享解析结果，缓存 HTTP_DNS_CACHE_SECONDS 秒
+- 并发上限：全局 HTTP_MAX_CONNECTIONS 个传输，每个主机最多 HTTP_MAX_PER_HOST 个
+- 重试：RetryPolicy 统一处理连接错误、超时与 408/429/5xx，指数退避加随机抖动，遵守 Retry-After
+
+异步代码直接 await engine.request()（须在 engine.run() 提交的协程中）；
+同步代码调用 engine.get() / engine.post()，提交到引擎线程后等待结果，可用 cancel_event 中途取消。
+流式读取：异步代码传 stream=True 后 async for 读取 response.aiter_content()，用完 await close_stream()；
+同步代码用 engine.open() 逐块（或 iter_lines() 逐行）迭代。读到所需内容后关闭响应即中止传输，剩余正文不再下载（该连接随之关闭，不放回连接池）。
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+from collections import Counter
+from concurrent.futures import CancelledError, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Dict, FrozenSet, Iterator, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from curl_cffi import CurlOpt
+from curl_cffi.const import CurlMOpt
+from curl_cffi.requests import AsyncSession, Response
+from curl_cffi.requests.exceptions import HTTPError, RequestException, Timeout  # noqa: F401（供各脚本导入）
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))  # 同时进行的传输数（curl 句柄数）
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "6"))         # 每个主机同时进行的传输数
+HTTP_DNS_CACHE_SECONDS = int(os.getenv("HTTP_DNS_CACHE_SECONDS", "300"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))                   # 默认重试策略的总尝试次数
+CANCEL_POLL_INTERVAL = 0.05     # 同步调用等待期间检查 cancel_event 的间隔（秒）
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524})
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    attempts 为总尝试次数（1 表示不重试）；第 n 次重试前等待
+    min(backoff * 2^(n-1), max_backoff) 秒的 50%~100%（随机抖动，避免并发请求同时重试）
+    """
+    attempts: int = HTTP_RETRIES
+    backoff: float = 1.0
+    max_backoff: float = 30.0
+    statuses: FrozenSet[int] = RETRYABLE_STATUSES
+
+    def retryable(self, error: Exception) -> bool:
+        """连接失败、超时、传输中断可以重试；URL 无效等参数错误不重试"""
+        return isinstance(error, RequestException) and not isinstance(error, (HTTPError, ValueError))
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.strip().isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * 2 ** (attempt - 1), self.max_backoff) * random.uniform(0.5, 1.0)
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+def detect_encoding(content: bytes) -> str:
+    """响应未声明 charset 时探测编码（相当于 requests 的 apparent_encoding），作为 default_encoding 传入"""
+    from charset_normalizer import from_bytes
+    best = from_bytes(content).best()
+    return best.encoding if best else "utf-8"
+
+
+class HttpEngine:
+    def __init__(self, max_connections: int = HTTP_MAX_CONNECTIONS, max_per_host: int = HTTP_MAX_PER_HOST,
+                 dns_cache_seconds: int = HTTP_DNS_CACHE_SECONDS, retry: RetryPolicy = RetryPolicy()):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.dns_cache_seconds = dns_cache_seconds
+        self.retry = retry
+        self.stats: Counter = Counter()   # requests / retries / errors
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 以下只在引擎线程中访问
+        self._session: Optional[AsyncSession] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    # ---------- 事件循环线程 ----------
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """引擎的事件循环，首次使用时启动后台线程（守护线程，不阻塞进程退出）"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="http-engine", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro: Awaitable[T], cancel_event: Optional[threading.Event] = None) -> T:
+        """
+        在引擎线程中运行协程并等待结果
+
+        cancel_event 被置位时取消协程（进行中的请求随之中止），抛出 CancelledError
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if cancel_event is None:
+            return future.result()
+        while not wait([future], timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED).done:
+            if cancel_event.is_set():
+                future.cancel()
+                raise CancelledError()
+        return future.result()
+
+    def close(self):
+        """关闭会话与连接（之后再次使用会重新建立）"""
+        if self._loop is None:
+            return
+
+        async def _close():
+            if self._session is not None:
+                await self._session.close()
+            self._session = None
+            self._host_slots.clear()
+
+        self.run(_close())
+
+    # ---------- 请求 ----------
+
+    def _get_session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSession(
+                max_clients=self.max_connections,
+                curl_options={CurlOpt.DNS_CACHE_TIMEOUT: self.dns_cache_seconds},
+            )
+            # 空闲连接缓存：至少能为每个活跃主机各留几条
+            self._session.acurl.setopt(CurlMOpt.MAXCONNECTS, self.max_connections)
+        return self._session
+
+    def _slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_slots[host]
+
+    async def request(self, method: str, url: str, retry: Optional[RetryPolicy] = None, **kwargs) -> Response:
+        """
+        发送请求并按重试策略重试，返回最后一次的响应（不检查状态码，由调用方 raise_for_status）
+
+        其余参数原样传给 curl_cffi（headers、timeout、proxy、impersonate、default_encoding 等）；
+        重试用尽仍出错时抛出最后一个异常
+        """
+        policy = retry or self.retry
+        session = self._get_session()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.stats["requests"] += 1
+            try:
+                # 等待退避期间不占用主机并发名额
+                async with self._slot(url):
+                    response = await session.request(method, url, **kwargs)
+            except RequestException as e:
+                self.stats["errors"] += 1
+                if attempt == policy.attempts or not policy.retryable(e):
+                    raise
+                delay = policy.delay(attempt)
+                logger.warning("%s %s 出错（第 %d/%d 次）：%s，%.1fs 后重试", method, url, attempt, policy.attempts, e, delay)
+            else:
+                if response.status_code not in policy.statuses or attempt == policy.attempts:
+                    return response
+                if kwargs.get("stream"):
+                    await close_stream(response)
+                delay = policy.delay(attempt, response.headers.get("Retry-After"))
+                logger.warning("%s %s 返回 HTTP %d（第 %d/%d 次），%.1fs 后重试",
+                               method, url, response.status_code, attempt, policy.attempts, delay)
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def get(self, url: str, cancel_event: Optional[threading.Event] = None, **kwargs) -> Response:
+        """同步 GET，参数同 request()"""
+        return self.run(self.request("GET", url, **kwargs), cancel_event)
+
+    def post(self, url: str, cancel_event: Optional[threading.Event] = None, **kwargs) -> Response:
+        """同步 POST，参数同 request()"""
+        return self.run(self.request("POST", url, **kwargs), cancel_event)
+
+    def open(self, url: str, cancel_event: Optional[threading.Event] = None, **kwargs) -> "StreamingResponse":
+        """同步流式 GET：收到响应头即返回，正文由调用方逐块迭代；用 with 保证关闭"""
+        response = self.run(self.request("GET", url, stream=True, **kwargs), cancel_event)
+        return StreamingResponse(self, response, cancel_event)
+
+
+async def close_stream(response: Response):
+    """关闭流式响应；正文尚未读完时中止传输（curl 在下一次收到数据时停止）"""
+    if response.quit_now is not None:
+        response.quit_now.set()
+    await response.aclose()
+
+
+async def _next_chunk(chunks: AsyncIterator[bytes]) -> Optional[bytes]:
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class StreamingResponse:
+    """
+    engine.open() 返回的同步流式响应
+
+    迭代得到正文块（每块在引擎线程中接收）；close() 时中止尚未接收的部分。
+    received 为已接收的字节数，exhausted 表示正文已完整读完
+    """
+
+    def __init__(self, engine: HttpEngine, response: Response, cancel_event: Optional[threading.Event] = None):
+        self.engine = engine
+        self.response = response
+        self.cancel_event = cancel_event
+        self.received = 0
+        self.exhausted = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        chunks = self.response.aiter_content()
+        while True:
+            chunk = self.engine.run(_next_chunk(chunks), self.cancel_event)
+            if chunk is None:
+                self.exhausted = True
+                return
+            self.received += len(chunk)
+            yield chunk
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """按行迭代正文（不含行尾的 \\r\\n），跨块的行拼接完整后再给出"""
+        pending = b""
+        for chunk in self:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line.rstrip(b"\r")
+        if pending:
+            yield pending.rstrip(b"\r")
+
+    def close(self):
+        self.engine.run(close_stream(self.response))
+
+    def __enter__(self) -> "StreamingResponse":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 进程内共享的引擎：同一进程中的所有脚本共用连接、DNS 缓存与并发上限
+engine = HttpEngine()
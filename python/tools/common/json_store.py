@@ -0,0 +1,41 @@
+# coding: utf-8
+"""
+JSON 状态文件的读取与原子写入
+
+各脚本的缓存等状态都是 /cache 下的小 JSON 文件：
+- 读取：文件不存在或内容损坏时返回调用方给的默认值（损坏时记录警告），不影响本次运行
+- 写入：先写同目录下的 .tmp 文件再 os.replace 替换，进程中途退出也不会留下写了一半的文件
+"""
+
+import json
+import logging
+import os
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def load_json(path: str, default: Any = None, what: str = "JSON 文件") -> Any:
+    """读取 JSON 文件；不存在或无法解析时返回 default"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        logger.warning("读取%s %s 失败，忽略：%s", what, path, e)
+        return default
+
+
+def atomic_write_json(path: str, data: Any, what: str = "JSON 文件") -> bool:
+    """原子地写入 JSON 文件（自动创建目录），失败时记录警告并返回 False"""
+    tmp = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("写入%s %s 失败：%s", what, path, e)
+        return False
+    return True
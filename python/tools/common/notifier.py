@@ -0,0 +1,310 @@
+# coding: utf-8
+"""
+ServerChan 推送发件箱
+
+各脚本调用 Notifier.send() 只把消息写入磁盘上的发件箱（SQLite）后立即返回，
+由后台线程负责投递，抓取流程不必等待推送往返：
+- 合并：合并窗口内排队的多条消息合并成一条摘要推送（含上次运行遗留的消息）
+- 限流：按 ServerChan 每日额度做令牌桶，额度用完时消息留在发件箱，稍后合并发送
+- 重试：推送失败按指数退避重新排队，跨运行持续重试，超过次数上限后放弃
+- 清理：每次投递后删除超过 NOTIFY_RETENTION 的已投递 / 已放弃消息，发件箱不会无限增长
+进程退出时（atexit）立即投递仍在等待合并的消息，最多等待 NOTIFY_EXIT_TIMEOUT 秒。
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from common.http_cache import CACHE_DIR
+from common.http_client import NO_RETRY, RequestException, engine
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_DB = os.getenv("NOTIFY_DB", os.path.join(CACHE_DIR, "notify_outbox.sqlite3"))
+# 合并窗口（秒）：第一条消息入队后等待这么久，期间入队的消息合并成一条推送
+NOTIFY_COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", "30"))
+# ServerChan 每日推送额度（免费版 5 条）
+NOTIFY_DAILY_QUOTA = int(os.getenv("NOTIFY_DAILY_QUOTA", "5"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
+NOTIFY_RETRY_BASE = 60          # 首次重试间隔（秒），之后每次翻倍
+NOTIFY_RETRY_MAX = 6 * 3600     # 重试间隔上限（秒）
+NOTIFY_EXIT_TIMEOUT = float(os.getenv("NOTIFY_EXIT_TIMEOUT", "15"))
+SENDING_TIMEOUT = 300           # 投递中的消息超过这么久未完成（进程崩溃），重新排队
+NOTIFY_RETENTION = 7 * 86400    # 已投递 / 已放弃的消息保留多久（秒）供排查，之后删除
+REQUEST_TIMEOUT = 10
+
+SERVERCHAN_API = "https://sctapi.ftqq.com/{sendkey}.send"
+TITLE_MAX_LENGTH = 100
+# 镜像或代码中的占位默认值，视为未配置
+PLACEHOLDER_SENDKEYS = ("", "YOUR_SENDKEY_HERE", "your_key")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel         TEXT NOT NULL,
+    title           TEXT NOT NULL,
+    desp            TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',   -- pending / sending / sent / failed
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    created_at      REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    claimed_at      REAL,
+    sent_at         REAL,
+    last_error      TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (channel, status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS buckets (
+    channel    TEXT PRIMARY KEY,
+    tokens     REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+def build_digest(messages: List[Tuple[str, str]]) -> Tuple[str, str]:
+    """多条消息合并为一条推送；只有一条时原样发送"""
+    if len(messages) == 1:
+        title, desp = messages[0]
+        return title[:TITLE_MAX_LENGTH], desp
+    title = f"{messages[0][0]} 等 {len(messages)} 条通知"
+    desp = "\n\n---\n\n".join(f"## {t}\n\n{d}" for t, d in messages)
+    return title[:TITLE_MAX_LENGTH], desp
+
+
+class Notifier:
+    """
+    某个 SendKey 的推送发件箱
+
+    发件箱按 SendKey 的摘要区分（不落盘保存 SendKey 本身），多个进程可共用同一个数据库文件。
+    """
+
+    def __init__(self, sendkey: Optional[str], db_path: str = NOTIFY_DB,
+                 coalesce_seconds: float = NOTIFY_COALESCE_SECONDS,
+                 daily_quota: int = NOTIFY_DAILY_QUOTA):
+        self.sendkey = (sendkey or "").strip()
+        self.channel = hashlib.sha256(self.sendkey.encode("utf-8")).hexdigest()[:16]
+        self.db_path = db_path
+        self.coalesce_seconds = coalesce_seconds
+        self.daily_quota = daily_quota
+        self._wakeup = threading.Event()
+        self._closing = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def configured(self) -> bool:
+        return self.sendkey not in PLACEHOLDER_SENDKEYS
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每个线程各自连接；自动提交模式，需要原子性的地方显式 BEGIN IMMEDIATE
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.executescript(SCHEMA)
+        return conn
+
+    # ---------- 入队 ----------
+
+    def send(self, title: str, desp: str) -> bool:
+        """
+        写入发件箱后立即返回，由后台线程投递
+
+        返回: 是否已入队（未配置 SendKey 或写入失败时为 False）
+        """
+        if not self.configured:
+            logger.error("未配置 ServerChan SendKey，消息未入队：%s", title)
+            return False
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT INTO messages (channel, title, desp, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.channel, title, desp, now, now),
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error("写入推送发件箱失败：%s", e)
+            return False
+
+        logger.info("消息已加入推送队列：%s", title)
+        self._ensure_worker()
+        self._wakeup.set()
+        return True
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        timeout = None
+        while True:
+            # 常驻进程中没有新消息时，也要在待重试消息到期（或额度恢复）时醒来投递
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            # 合并窗口：等待更多消息入队；进程退出时立即结束等待
+            self._closing.wait(self.coalesce_seconds)
+            try:
+                self.flush()
+                timeout = self._next_due(time.time())
+            except Exception:
+                logger.exception("投递推送消息时出错")
+                timeout = NOTIFY_RETRY_BASE
+            if self._closing.is_set():
+                return
+
+    def _next_due(self, now: float) -> Optional[float]:
+        """距离下一次可以投递还有多少秒；没有待投递消息时返回 None"""
+        conn = self._connect()
+        try:
+            due = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM messages WHERE channel = ? AND status = 'pending'",
+                (self.channel,),
+            ).fetchone()[0]
+            if due is None:
+                return None
+            bucket = conn.execute("SELECT tokens, updated_at FROM buckets WHERE channel = ?",
+                                  (self.channel,)).fetchone()
+        finally:
+            conn.close()
+        wait = due - now
+        if bucket is not None and self.daily_quota > 0:
+            tokens = bucket[0] + (now - bucket[1]) * self.daily_quota / 86400
+            wait = max(wait, (1 - tokens) * 86400 / self.daily_quota)
+        return max(wait, 1.0)
+
+    def close(self, timeout: float = NOTIFY_EXIT_TIMEOUT):
+        """投递仍在排队的消息（含以前运行遗留的到期重试），最多等待 timeout 秒"""
+        atexit.unregister(self.close)
+        if not self.configured:
+            return
+        self._closing.set()
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._wakeup.set()
+            worker.join(timeout)
+            if worker.is_alive():
+                logger.warning("推送未在 %.0fs 内完成，剩余消息留在发件箱，下次运行继续投递", timeout)
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("投递推送消息时出错")
+
+    # ---------- 投递 ----------
+
+    def _take_token(self, conn: sqlite3.Connection, now: float) -> bool:
+        """令牌桶：容量为每日额度，按额度 / 24 小时匀速补充"""
+        row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE channel = ?", (self.channel,)).fetchone()
+        tokens = float(self.daily_quota) if row is None else min(
+            self.daily_quota, row[0] + (now - row[1]) * self.daily_quota / 86400)
+        ok = tokens >= 1
+        if ok:
+            tokens -= 1
+        conn.execute("INSERT OR REPLACE INTO buckets (channel, tokens, updated_at) VALUES (?, ?, ?)",
+                     (self.channel, tokens, now))
+        return ok
+
+    def _refund_token(self, conn: sqlite3.Connection):
+        conn.execute("UPDATE buckets SET tokens = MIN(tokens + 1, ?) WHERE channel = ?",
+                     (self.daily_quota, self.channel))
+
+    def _claim(self, now: float) -> List[Tuple[int, str, str, int]]:
+        """取出所有到期消息并标记为投递中；额度不足时不取"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # 投递中途崩溃的消息重新排队
+            conn.execute(
+                "UPDATE messages SET status = 'pending' WHERE channel = ? AND status = 'sending' AND claimed_at < ?",
+                (self.channel, now - SENDING_TIMEOUT),
+            )
+            rows = conn.execute(
+                "SELECT id, title, desp, attempts FROM messages "
+                "WHERE channel = ? AND status = 'pending' AND next_attempt_at <= ? ORDER BY id",
+                (self.channel, now),
+            ).fetchall()
+            if rows and not self._take_token(conn, now):
+                logger.warning("ServerChan 今日额度已用完，%d 条消息留在发件箱稍后合并发送", len(rows))
+                rows = []
+            if rows:
+                conn.executemany("UPDATE messages SET status = 'sending', claimed_at = ? WHERE id = ?",
+                                 [(now, row[0]) for row in rows])
+            conn.execute("COMMIT")
+            return rows
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _post(self, title: str, desp: str) -> Optional[str]:
+        """调用 ServerChan，成功返回 None，失败返回错误描述"""
+        # 走共享 HTTP 引擎（与抓取请求共用连接池与代理、超时设置）；失败由发件箱按退避重新排队，引擎不再重试
+        try:
+            r = engine.post(SERVERCHAN_API.format(sendkey=self.sendkey),
+                            data={"title": title, "desp": desp}, timeout=REQUEST_TIMEOUT, retry=NO_RETRY)
+        except RequestException as e:
+            return f"请求失败: {e}"
+        if r.status_code != 200:
+            return f"状态码 {r.status_code}: {r.text[:200]}"
+        try:
+            result = r.json()
+        except ValueError:
+            return f"响应不是 JSON: {r.text[:200]}"
+        if result.get("code") != 0:
+            return f"ServerChan 返回错误: {result}"
+        return None
+
+    def flush(self) -> int:
+        """把到期消息合并成一条推送并投递，返回投递成功的消息数"""
+        if not self.configured:
+            return 0
+        now = time.time()
+        rows = self._claim(now)
+        if not rows:
+            return 0
+
+        title, desp = build_digest([(row[1], row[2]) for row in rows])
+        error = self._post(title, desp)
+        done = time.time()
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if error is None:
+                conn.executemany("UPDATE messages SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                                 [(done, row[0]) for row in rows])
+            else:
+                self._refund_token(conn)
+                updates = []
+                for msg_id, _, _, attempts in rows:
+                    attempts += 1
+                    status = "failed" if attempts >= NOTIFY_MAX_ATTEMPTS else "pending"
+                    delay = min(NOTIFY_RETRY_BASE * 2 ** (attempts - 1), NOTIFY_RETRY_MAX)
+                    updates.append((status, attempts, done + delay, error, msg_id))
+                conn.executemany(
+                    "UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    updates)
+            conn.execute(
+                "DELETE FROM messages WHERE channel = ? AND status IN ('sent', 'failed') "
+                "AND COALESCE(sent_at, next_attempt_at) < ?",
+                (self.channel, done - NOTIFY_RETENTION),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if error is None:
+            logger.info("ServerChan 推送成功（合并 %d 条消息）：%s", len(rows), title)
+            return len(rows)
+        logger.error("ServerChan 推送失败，已安排重试：%s", error)
+        return 0
@@ -0,0 +1,103 @@
+# coding: utf-8
+"""
+按内容摘要缓存解析结果
+
+服务器不支持条件请求时，拿到的字节往往与上次完全相同。以原始响应字节的
+blake2b 摘要为键，把解析出的结构（JSON）存到磁盘，命中时直接返回，省去解析。
+磁盘占用超过上限时按最近使用时间（文件 mtime）淘汰。
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Optional
+
+from common.http_cache import CACHE_DIR
+from common.json_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+PARSE_CACHE_DIR = os.path.join(CACHE_DIR, "parse_cache")
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+
+class ParseCache:
+    """
+    某一类解析结果的磁盘 LRU 缓存
+
+    namespace 区分不同解析器；解析逻辑变化时应修改 namespace（如加版本号），
+    避免命中旧结果。
+    """
+
+    def __init__(self, namespace: str, directory: str = PARSE_CACHE_DIR,
+                 max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.namespace = namespace
+        self.directory = os.path.join(directory, namespace)
+        self.max_bytes = max_bytes
+
+    def key(self, data: bytes, extra: str = "") -> str:
+        h = hashlib.blake2b(data, digest_size=16)
+        if extra:
+            h.update(b"\0" + extra.encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # 刷新最近使用时间
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("读取解析缓存 %s 失败：%s", path, e)
+            return None
+
+    def put(self, key: str, value: Any):
+        if atomic_write_json(self._path(key), value, "解析缓存"):
+            self._evict()
+
+    def _evict(self):
+        """总大小超过上限时删除最久未使用的条目"""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return
+        stats = []
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in stats)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(stats):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def memoize(self, data: bytes, parse: Callable[[], Any], extra: str = "") -> Any:
+        """
+        命中时返回缓存结果，否则调用 parse() 并缓存（结果为 None 时不缓存）
+
+        extra 用于区分“字节相同但解析参数不同”的情况，例如行情代码。
+        """
+        key = self.key(data, extra)
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = parse()
+        if value is not None:
+            self.put(key, value)
+        return value
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+多站点更新日志监控
+
+按配置文件并发抓取多个站点的更新日志页面（共享连接池），每个站点可单独指定
+主内容区域选择器与日期行正则，沿用 digvps_update_push 的“日期行 → 内容段落”解析。
+所有站点的条件请求校验字段与条目指纹集中存放在一个 SQLite 文件中，
+只推送新增或修改过的条目，所有站点的更新合并成一条推送。
+
+配置文件（JSON）示例见 sites.example.json：
+    {"sites": [{"name": "DigVPS", "url": "https://digvps.com/update-log",
+                "container": "article", "date_regex": "...", "max_items": 3}]}
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # python/tools，便于导入 common
+from common.http_cache import CACHE_DIR
+from common.http_client import detect_encoding, engine
+
+from digvps_update_push import (
+    CONTAINER_SELECTORS, DATE_LINE_RE, MAX_INDEX_ENTRIES, MAX_ITEMS,
+    EntryIndex, compile_selectors, extract_updates, format_updates, push_serverchan,
+)
+
+WATCH_CONFIG = os.getenv("WATCH_CONFIG", "/config/sites.json")
+WATCH_DB = os.getenv("WATCH_DB", os.path.join(CACHE_DIR, "changelog_watch.sqlite3"))
+WATCH_CONCURRENCY = int(os.getenv("WATCH_CONCURRENCY", "32"))
+# 整轮抓取的截止时间（秒），保证在一个 cron 周期（1 分钟）内结束
+WATCH_DEADLINE = float(os.getenv("WATCH_DEADLINE", "50"))
+REQUEST_TIMEOUT = 10
+USER_AGENT = "Mozilla/5.0 (compatible; Changelog-Watcher/1.0)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    url           TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    checked_at    INTEGER,
+    last_error    TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    url        TEXT NOT NULL,
+    date       TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (url, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_by_age ON entries (url, updated_at);
+"""
+
+
+# ======================
+# 配置
+# ======================
+
+@dataclass
+class Site:
+    name: str
+    url: str
+    selectors: Tuple[str, ...] = CONTAINER_SELECTORS
+    date_re: Pattern = DATE_LINE_RE
+    max_items: int = MAX_ITEMS
+
+
+def load_sites(path: str) -> List[Site]:
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    sites = []
+    for i, raw in enumerate(config.get("sites", [])):
+        if "url" not in raw:
+            raise ValueError(f"第 {i + 1} 个站点缺少 url")
+        container = raw.get("container", CONTAINER_SELECTORS)
+        selectors = (container,) if isinstance(container, str) else tuple(container)
+        compile_selectors(selectors)  # 提前校验选择器
+        date_re = re.compile(raw["date_regex"]) if raw.get("date_regex") else DATE_LINE_RE
+        if date_re.groups < 1:
+            raise ValueError(f"{raw['url']} 的 date_regex 需要包含一个捕获分组（日期）")
+        sites.append(Site(
+            name=raw.get("name", raw["url"]),
+            url=raw["url"],
+            selectors=selectors,
+            date_re=date_re,
+            max_items=int(raw.get("max_items", MAX_ITEMS)),
+        ))
+    return sites
+
+
+# ======================
+# 状态存储（SQLite）
+# ======================
+
+class WatchStore:
+    """所有站点共用的状态库：条件请求校验字段 + 每条更新的指纹"""
+
+    def __init__(self, path: str = WATCH_DB):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def validators(self) -> Dict[str, Dict[str, Optional[str]]]:
+        rows = self.conn.execute("SELECT url, etag, last_modified FROM sites")
+        return {url: {"etag": etag, "last_modified": lm} for url, etag, lm in rows}
+
+    def entries(self) -> Dict[str, Dict[str, dict]]:
+        """{url: {日期: {"hash", "updated_at"}}}，格式与 EntryIndex.entries 相同"""
+        result: Dict[str, Dict[str, dict]] = {}
+        for url, date, digest, updated_at in self.conn.execute("SELECT url, date, hash, updated_at FROM entries"):
+            result.setdefault(url, {})[date] = {"hash": digest, "updated_at": updated_at}
+        return result
+
+    def record_check(self, site: Site, etag: Optional[str], last_modified: Optional[str],
+                     error: Optional[str] = None):
+        """记录本次检查；出错时保留上次的校验字段"""
+        self.conn.execute(
+            """
+            INSERT INTO sites (url, name, etag, last_modified, checked_at, last_error)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                name = excluded.name,
+                etag = CASE WHEN excluded.last_error IS NULL THEN excluded.etag ELSE sites.etag END,
+                last_modified = CASE WHEN excluded.last_error IS NULL
+                                     THEN excluded.last_modified ELSE sites.last_modified END,
+                checked_at = excluded.checked_at,
+                last_error = excluded.last_error
+            """,
+            (site.url, site.name, etag, last_modified, int(time.time()), error),
+        )
+
+    def add_entries(self, url: str, entries: List[str]):
+        now = int(time.time())
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO entries (url, date, hash, updated_at) VALUES (?, ?, ?, ?)",
+            [(url, *EntryIndex.fingerprint(entry), now) for entry in entries],
+        )
+        # 每个站点最多保留 MAX_INDEX_ENTRIES 条
+        self.conn.execute(
+            """
+            DELETE FROM entries WHERE url = ? AND date NOT IN (
+                SELECT date FROM entries WHERE url = ? ORDER BY updated_at DESC LIMIT ?)
+            """,
+            (url, url, MAX_INDEX_ENTRIES),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# ======================
+# 抓取 & 解析
+# ======================
+
+@dataclass
+class SiteResult:
+    site: Site
+    fresh: List[str] = field(default_factory=list)    # 新增或修改的条目
+    changed: List[str] = field(default_factory=list)  # 其中修改过的条目
+    not_modified: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+def check_site(site: Site, validators: Dict[str, Optional[str]],
+               index: EntryIndex) -> SiteResult:
+    started = time.perf_counter()
+    result = SiteResult(site=site)
+    headers = {"User-Agent": USER_AGENT}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        # 共享 HTTP 引擎：同一主机的连接复用，每个主机并发受 HTTP_MAX_PER_HOST 限制
+        r = engine.get(site.url, headers=headers, timeout=REQUEST_TIMEOUT, default_encoding=detect_encoding)
+        r.raise_for_status()
+        result.etag = r.headers.get("ETag")
+        result.last_modified = r.headers.get("Last-Modified")
+        if r.status_code == 304:
+            # 304 响应不一定带校验字段，沿用上次的
+            result.etag = result.etag or validators.get("etag")
+            result.last_modified = result.last_modified or validators.get("last_modified")
+            result.not_modified = True
+            return result
+
+        # 未声明编码时才做编码探测（default_encoding，需要扫描整页）
+        updates = extract_updates(r.text, site.max_items, stop_at=index.contains,
+                                  selectors=site.selectors, date_re=site.date_re)
+        if not updates and index.matched is None:
+            result.error = "未解析到任何更新内容，请检查选择器或日期正则"
+            return result
+
+        result.fresh = [u for u in updates if index.status(u)]
+        result.changed = [u for u in result.fresh if index.status(u) == "changed"]
+    except Exception as e:
+        result.error = str(e)
+    finally:
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+def check_sites(sites: List[Site], store: WatchStore, concurrency: int = WATCH_CONCURRENCY,
+                deadline: float = WATCH_DEADLINE) -> List[SiteResult]:
+    """并发检查所有站点；超过 deadline 仍未完成的站点本轮放弃，下次再查"""
+    validators = store.validators()
+    entries = store.entries()
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = {
+        pool.submit(check_site, site, validators.get(site.url, {}), EntryIndex(entries.get(site.url, {}))): site
+        for site in sites
+    }
+
+    results = []
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            results.append(future.result())
+    except FuturesTimeoutError:
+        pending = [site.name for f, site in futures.items() if not f.done()]
+        logging.warning("超过 %.0fs 截止时间，%d 个站点本轮未完成：%s", deadline, len(pending), ", ".join(pending[:10]))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+# ======================
+# 推送 & 主流程
+# ======================
+
+def format_digest(results: List[SiteResult]) -> Tuple[str, str]:
+    updated = [r for r in results if r.fresh]
+    title = f"更新日志：{len(updated)} 个站点有更新"
+    blocks = []
+    for r in updated:
+        blocks.append(f"## {r.site.name}\n\n{format_updates(r.fresh, changed=r.changed)}\n👉 来源：{r.site.url}\n")
+    return title, "\n".join(blocks)
+
+
+def run(sites: List[Site], store: WatchStore, concurrency: int = WATCH_CONCURRENCY,
+        deadline: float = WATCH_DEADLINE) -> List[SiteResult]:
+    started = time.perf_counter()
+    results = check_sites(sites, store, concurrency, deadline)
+
+    updated = [r for r in results if r.fresh]
+    pushed = False
+    if updated:
+        pushed = push_serverchan(*format_digest(results))
+        if not pushed:
+            logging.error("推送入队失败，有更新的站点下次重试")
+
+    for r in results:
+        if r.error:
+            logging.warning("[%s] 检查失败：%s", r.site.name, r.error)
+            store.record_check(r.site, None, None, error=r.error)
+        elif r.fresh and not pushed:
+            # 推送失败时不记录校验字段，避免下次被 304 跳过
+            store.record_check(r.site, None, None)
+        else:
+            if r.fresh:
+                store.add_entries(r.site.url, r.fresh)
+            store.record_check(r.site, r.etag, r.last_modified)
+    store.commit()
+
+    logging.info(
+        "检查 %d/%d 个站点，耗时 %.2fs：未变化(304) %d，有更新 %d，失败 %d",
+        len(results), len(sites), time.perf_counter() - started,
+        sum(r.not_modified for r in results), len(updated), sum(bool(r.error) for r in results),
+    )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多站点更新日志监控")
+    parser.add_argument("--config", default=WATCH_CONFIG, help="站点配置 JSON")
+    parser.add_argument("--db", default=WATCH_DB, help="SQLite 状态库路径")
+    parser.add_argument("--concurrency", type=int, default=WATCH_CONCURRENCY)
+    parser.add_argument("--deadline", type=float, default=WATCH_DEADLINE, help="整轮截止时间（秒）")
+    args = parser.parse_args(argv)
+
+    sites = load_sites(args.config)
+    if not sites:
+        logging.error("配置 %s 中没有站点", args.config)
+        return
+    store = WatchStore(args.db)
+    try:
+        run(sites, store, args.concurrency, args.deadline)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
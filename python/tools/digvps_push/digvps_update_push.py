@@ -7,90 +7,284 @@ DigVPS 更新日志抓取 + 变化推送 ServerChan（新版 SCT）
 
 import os
 import re
+import sys
 import json
+import time
+import codecs
 import hashlib
 import logging
+from functools import lru_cache
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # python/tools，便于导入 common
+from common.http_cache import ValidatorCache
+from common.http_client import StreamingResponse, detect_encoding, engine
+from common.json_store import atomic_write_json, load_json
+from common.notifier import Notifier
+from common.parse_cache import ParseCache
 
 URL = "https://digvps.com/update-log"
 CACHE_FILE = "/cache/last_hash.txt"
+HTTP_CACHE_FILE = os.path.join(os.path.dirname(CACHE_FILE), "digvps_http_cache.json")
+PARSE_CACHE_DIR = os.path.join(os.path.dirname(CACHE_FILE), "parse_cache")
+# 每条更新的指纹索引（日期 + 内容摘要），取代整体哈希 CACHE_FILE
+ENTRY_INDEX_FILE = os.path.join(os.path.dirname(CACHE_FILE), "digvps_entries.json")
+MAX_INDEX_ENTRIES = 200
 MAX_ITEMS = 3
+# 解析后端：lxml（流式，凑够 MAX_ITEMS 条即停止）/ bs4（完整构建 BeautifulSoup 树）
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "lxml")
+STREAM_CHUNK_SIZE = 2 * 1024  # 块越小，提前停止时少解析的内容越多
+# 流式下载（仅 lxml 后端）：正文边下载边解析，凑够 MAX_ITEMS 条或遇到已推送条目即断开连接；设为 0 则完整下载
+STREAM_FETCH = os.getenv("STREAM_FETCH", "1") != "0"
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 DATE_LINE_RE = re.compile(r"^\s*(\d{1,2}月\d{1,2}日|\d{4}[-/]\d{1,2}[-/]\d{1,2})\s*$")
 
+# 主内容区域候选（按优先级），都找不到时退回 body
+CONTAINER_SELECTORS = ("article", "main", "div.post-content", "div#content", "div.content")
+SELECTOR_RE = re.compile(r"^([\w-]*)((?:[.#][\w-]+)*)$")
+# BeautifulSoup 的 get_text 不包含这些标签内的文本（除非该标签本身就是子节点）
+STRING_CONTAINER_TAGS = frozenset(("script", "style", "template", "rt", "rp"))
+
 
 # ======================
 # HTTP & HTML 解析
 # ======================
 
-def fetch_html(url, timeout=10):
+def fetch_html(url, timeout=10, cache=None):
+    """
+    下载页面；传入 cache 时发送条件请求，页面未变化（304）返回 (None, r)。
+
+    返回 (html, response)。
+    """
     headers = {
         "User-Agent": "Mozilla/5.0 (compatible; DigVPS-Scraper/5.0)"
     }
-    r = requests.get(url, headers=headers, timeout=timeout)
+    if cache is not None:
+        headers.update(cache.conditional_headers(url))
+    # 共享 HTTP 引擎：进程内复用连接（常驻调度进程中多次运行不再重新握手）
+    r = engine.get(url, headers=headers, timeout=timeout, default_encoding=detect_encoding)
     r.raise_for_status()
-    r.encoding = r.apparent_encoding
-    return r.text
+    if ValidatorCache.is_not_modified(r):
+        return None, r
+    return r.text, r
+
+
+def open_html(url, timeout=10, cache=None) -> StreamingResponse:
+    """
+    流式下载页面：收到响应头即返回，正文由解析器逐块读取，关闭时中止剩余部分的下载。
+    传入 cache 时发送条件请求（304 时正文为空）。需在 with 中使用
+    """
+    headers = {
+        "User-Agent": "Mozilla/5.0 (compatible; DigVPS-Scraper/5.0)"
+    }
+    if cache is not None:
+        headers.update(cache.conditional_headers(url))
+    stream = engine.open(url, headers=headers, timeout=timeout)
+    try:
+        stream.response.raise_for_status()
+    except Exception:
+        stream.close()
+        raise
+    return stream
+
+
+def iter_pieces(html, encoding=None):
+    """
+    把完整页面（str）或正文块序列（bytes）切成 STREAM_CHUNK_SIZE 大小的片段；
+    bytes 按 encoding 增量解码（未声明编码按 utf-8），多字节字符跨块时不会被截断
+    """
+    if isinstance(html, str):
+        for start in range(0, len(html), STREAM_CHUNK_SIZE):
+            yield html[start:start + STREAM_CHUNK_SIZE]
+        return
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in html:
+        for start in range(0, len(chunk), STREAM_CHUNK_SIZE):
+            yield decoder.decode(chunk[start:start + STREAM_CHUNK_SIZE])
+    yield decoder.decode(b"", final=True)
 
 
-def find_main_container(soup):
+def find_main_container(soup, selectors=CONTAINER_SELECTORS):
     """尝试找到主内容区域，若找不到则 fallback 到 body。"""
-    for sel in ("article", "main", "div.post-content", "div#content", "div.content"):
+    for sel in selectors:
         c = soup.select_one(sel)
         if c:
             return c
     return soup.body or soup
 
 
-def extract_updates(html, max_items=MAX_ITEMS):
-    """按 '日期行 → 内容段落' 模式提取最近 N 条更新。"""
-    soup = BeautifulSoup(html, "html.parser")
-    main = find_main_container(soup)
+class ContainerSelector:
+    """
+    lxml 用的简单 CSS 选择器：tag、.class、#id 及其组合（如 div.post-content）
 
-    # 将主内容区域的每个子节点的文本抽取为一行
-    lines = []
+    matches() 在解析到开始标签时就能判断是否命中，不需要等整页建树；
+    整页解析完成后的查找用等价的预编译 XPath
+    """
+
+    def __init__(self, css):
+        m = SELECTOR_RE.match(css.strip())
+        if not m or not any(m.groups()):
+            raise ValueError(f"不支持的容器选择器：{css!r}（仅支持 tag / .class / #id 组合）")
+        self.css = css
+        self.tag = m.group(1) or None
+        parts = re.findall(r"([.#])([\w-]+)", m.group(2))
+        self.ids = [name for kind, name in parts if kind == "#"]
+        self.classes = [name for kind, name in parts if kind == "."]
+        predicates = [f"[@id='{i}']" for i in self.ids]
+        predicates += [f"[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]" for c in self.classes]
+        self.xpath = etree.XPath(f"//{self.tag or '*'}{''.join(predicates)}")
+
+    def matches(self, elem):
+        if not isinstance(elem.tag, str) or (self.tag and elem.tag != self.tag):
+            return False
+        if any(elem.get("id") != i for i in self.ids):
+            return False
+        classes = (elem.get("class") or "").split()
+        return all(c in classes for c in self.classes)
+
+
+@lru_cache(maxsize=None)
+def compile_selectors(selectors):
+    return tuple(ContainerSelector(css) for css in selectors)
+
+
+def iter_block_texts_bs4(html, selectors=CONTAINER_SELECTORS, encoding=None):
+    """主内容区域每个子节点的文本（BeautifulSoup，完整建树；传入正文块时先读完整页）"""
+    soup = BeautifulSoup("".join(iter_pieces(html, encoding)), "html.parser")
+    main = find_main_container(soup, selectors)
     for child in main.children:
-        text = (child.get_text(strip=True) if hasattr(child, "get_text") else str(child).strip())
-        if text:
-            text = " ".join(text.split())  # collapse 空格
-            lines.append((child, text))
+        yield child.get_text(strip=True) if hasattr(child, "get_text") else str(child).strip()
 
-    updates = []
-    i = 0
-    n = len(lines)
-
-    while i < n and len(updates) < max_items:
-        node, text = lines[i]
-
-        # 如果此行是日期
-        if DATE_LINE_RE.match(text):
-            date = DATE_LINE_RE.match(text).group(1)
-
-            # 收集下面连续的内容（直到遇到下一个日期）
-            content_parts = []
-            j = i + 1
-            while j < n:
-                nxt_text = lines[j][1]
-                if DATE_LINE_RE.match(nxt_text):
-                    break
-                content_parts.append(nxt_text)
-                j += 1
-
-            if content_parts:
-                full = date + "\n" + "\n".join(content_parts)
-            else:
-                full = date
-
-            updates.append(full)
-            i = j
-        else:
-            i += 1
 
+def _element_strings(elem):
+    if elem.text:
+        yield elem.text
+    for child in elem:
+        # 注释节点的 tag 不是字符串，只取其后的 tail
+        if isinstance(child.tag, str) and child.tag not in STRING_CONTAINER_TAGS:
+            yield from _element_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _node_texts(node):
+    """子节点自身文本（同 get_text(strip=True)：各段去首尾空白后直接拼接）及其后的文本节点"""
+    if isinstance(node.tag, str):
+        strings = node.itertext() if node.tag in STRING_CONTAINER_TAGS else _element_strings(node)
+        yield "".join(s.strip() for s in strings)
+    if node.tail:
+        yield node.tail
+
+
+def iter_block_texts_lxml(html, selectors=CONTAINER_SELECTORS, encoding=None):
+    """
+    主内容区域每个子节点的文本（lxml 流式解析）
+
+    html 为完整页面或正文块序列（如 open_html 的流式响应，按需逐块下载）。
+    分块喂给 HTMLPullParser，遇到命中第一个选择器的元素（默认 <article>）后，
+    每结束一个直接子节点就产出前面已完整的节点文本；调用方停止迭代后剩余的 HTML 不再解析。
+    页面中没有这样的元素时解析完整页面，再按其余选择器的顺序选择容器。
+    """
+    first, *rest = compile_selectors(tuple(selectors))
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    container = None
+    done = 0  # 已产出的子节点数
+    leading = True  # 容器开头（第一个子节点之前）的文本尚未产出
+
+    def flush(stop=None):
+        """产出 container[done:stop] 这些已完整的子节点"""
+        nonlocal done, leading
+        if leading and container.text:
+            yield container.text
+        leading = False
+        nodes = container[done:stop]
+        done += len(nodes)
+        for node in nodes:
+            yield from _node_texts(node)
+
+    for piece in iter_pieces(html, encoding):
+        parser.feed(piece)
+        for event, elem in parser.read_events():
+            if container is None:
+                if event == "start" and first.matches(elem):
+                    container = elem
+                continue
+            if event != "end":
+                continue
+            if elem is container:
+                yield from flush()
+                return
+            if elem.getparent() is container:
+                # 刚结束的子节点其 tail 尚未解析完，只产出它之前的兄弟节点
+                yield from flush(len(container) - 1)
+
+    root = parser.close()
+    if container is not None:  # 容器未闭合
+        yield from flush()
+        return
+
+    main = next((found[0] for found in (sel.xpath(root) for sel in rest) if found), None)
+    if main is None:
+        main = root.find(".//body")
+    if main is None:
+        yield from _node_texts(root)
+        return
+    if main.text:
+        yield main.text
+    for node in main:
+        yield from _node_texts(node)
+
+
+PARSER_BACKENDS = {
+    "lxml": iter_block_texts_lxml,
+    "bs4": iter_block_texts_bs4,
+}
+
+
+def extract_updates(html, max_items=MAX_ITEMS, backend=None, stop_at=None,
+                    selectors=CONTAINER_SELECTORS, date_re=DATE_LINE_RE, encoding=None):
+    """
+    按 '日期行 → 内容段落' 模式提取最近 N 条更新。
+
+    html 可以是完整页面，也可以是正文块序列（bytes，按 encoding 解码）：
+    lxml 后端按需读取，提前停止时后续正文不再读取。
+
+    stop_at(entry) 返回 True 时立即停止（该条不计入结果）：更新按时间倒序排列，
+    遇到已推送过的条目说明后面都是旧内容，无需继续解析。
+    selectors / date_re 可按站点替换主内容区域选择器与日期行正则（第 1 个分组为日期）。
+    """
+    block_texts = PARSER_BACKENDS[backend or PARSER_BACKEND](html, selectors, encoding)
+
+    updates = []
+    current = None  # [日期, 内容段落...]
+    for text in block_texts:
+        text = " ".join(text.split())  # collapse 空格
+        if not text:
+            continue
+
+        m = date_re.match(text)
+        if m:
+            if current is not None:
+                entry = "\n".join(current)
+                if stop_at is not None and stop_at(entry):
+                    return updates
+                updates.append(entry)
+            # 已凑够 N 条：不再读取后续节点（lxml 后端随之停止解析）
+            if len(updates) >= max_items:
+                return updates
+            current = [m.group(1)]
+        elif current is not None:
+            current.append(text)
+
+    if current is not None and len(updates) < max_items:
+        entry = "\n".join(current)
+        if stop_at is None or not stop_at(entry):
+            updates.append(entry)
     return updates
 
 
@@ -98,9 +292,11 @@ def extract_updates(html, max_items=MAX_ITEMS):
 # 推送格式美化
 # ======================
 
-def format_updates(updates):
+def format_updates(updates, changed=()):
     """
     将 ["12月11日\nxxx", "12月10日\nxxx"] 格式化为更美观的 markdown。
+
+    changed 中的条目（之前推送过、内容有修改）在标题后加标注。
     """
     formatted = []
 
@@ -108,9 +304,10 @@ def format_updates(updates):
         lines = item.split("\n")
         date = lines[0]
         content = " ".join(lines[1:]).strip()
+        mark = "（内容有修改）" if item in changed else ""
 
         block = (
-            f"### 🗓 {date}\n"
+            f"### 🗓 {date}{mark}\n"
             f"{content}\n"
         )
         formatted.append(block)
@@ -127,78 +324,181 @@ def calc_hash(items):
 
 
 def load_last_hash():
+    """旧版整体哈希，仅用于首次迁移到条目索引"""
     p = Path(CACHE_FILE)
     if p.exists():
         return p.read_text(encoding="utf-8").strip()
     return ""
 
 
-def save_last_hash(h):
-    p = Path(CACHE_FILE)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(h, encoding="utf-8")
+class EntryIndex:
+    """
+    已推送条目的指纹索引：{日期: {内容摘要: 记录时间戳}}
+
+    同一日期下可以有多条条目，按内容摘要分别记录，互不覆盖；
+    日期已知但摘要未知的条目视为内容有修改。
+    只推送新日期或内容有变化的条目；旧摘要按记录时间淘汰，最多保留 MAX_INDEX_ENTRIES 条。
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+        self.matched = None  # 解析时命中的第一条已知条目
+
+    @classmethod
+    def load(cls, path=ENTRY_INDEX_FILE):
+        return cls(load_json(path, {}, "条目索引"))
+
+    @staticmethod
+    def fingerprint(entry):
+        date = entry.split("\n", 1)[0]
+        return date, hashlib.sha256(entry.encode("utf-8")).hexdigest()[:16]
+
+    def status(self, entry):
+        """返回 "new" / "changed"，已推送且未变化返回 None"""
+        date, digest = self.fingerprint(entry)
+        known = self.entries.get(date)
+        if known is None:
+            return "new"
+        return "changed" if digest not in known else None
+
+    def contains(self, entry):
+        """日期与内容都已记录（作为 extract_updates 的 stop_at）"""
+        if self.status(entry) is None:
+            self.matched = entry
+            return True
+        return False
+
+    def add(self, entries):
+        now = int(time.time())
+        for entry in entries:
+            date, digest = self.fingerprint(entry)
+            self.entries.setdefault(date, {})[digest] = now
+        records = [(ts, date, digest) for date, digests in self.entries.items() for digest, ts in digests.items()]
+        if len(records) > MAX_INDEX_ENTRIES:
+            records.sort(reverse=True)
+            self.entries = {}
+            for ts, date, digest in records[:MAX_INDEX_ENTRIES]:
+                self.entries.setdefault(date, {})[digest] = ts
+
+    def save(self, path=ENTRY_INDEX_FILE):
+        atomic_write_json(path, self.entries, "条目索引")
 
 
 # ======================
 # ServerChan 推送（新版 SCT）
 # ======================
 
-def push_serverchan(title, desp):
-    sckey = os.getenv("SERVERCHAN_SCKEY")
-    if not sckey:
-        logging.error("未设置 SERVERCHAN_SCKEY")
-        return False
+notifier = Notifier(os.getenv("SERVERCHAN_SCKEY"))
 
-    api = f"https://sctapi.ftqq.com/{sckey}.send"
 
-    try:
-        r = requests.post(api, data={"title": title, "desp": desp}, timeout=10)
-        try:
-            j = r.json()
-            logging.info("ServerChan 返回：%s", j)
-            return j.get("code", 0) == 0 or r.status_code == 200
-        except Exception:
-            return r.status_code == 200
-    except Exception as e:
-        logging.error("推送失败：%s", e)
-        return False
+def push_serverchan(title, desp):
+    """写入推送发件箱后立即返回；发件箱负责合并、限流，失败后跨运行重试"""
+    return notifier.send(title, desp)
 
 
 # ======================
 # 主函数
 # ======================
 
+def parse_updates(html, content, index):
+    """
+    解析页面，到第一条已推送且未变化的条目（index.contains）即停止。
+
+    页面字节与上次相同时复用解析结果（空结果不缓存）。条目索引随推送变化，
+    因此只缓存未被截断的最近 MAX_ITEMS 条，命中后再按当前索引截断，避免复用按旧索引截断的结果。
+    """
+    parse_cache = ParseCache("digvps_updates_v1", directory=PARSE_CACHE_DIR)
+    key = parse_cache.key(content, extra=str(MAX_ITEMS))
+    cached = parse_cache.get(key)
+    if cached is None:
+        updates = extract_updates(html, stop_at=index.contains)
+        if updates and index.matched is None:
+            parse_cache.put(key, updates)
+        return updates
+    updates = []
+    for entry in cached:
+        if index.contains(entry):
+            break
+        updates.append(entry)
+    return updates
+
+
+def fetch_updates(url, cache, index):
+    """
+    完整下载后解析，解析到第一条已推送且未变化的条目即停止；页面字节与上次相同时复用解析结果。
+
+    返回 (updates, response)，页面未变化（304）时 updates 为 None
+    """
+    html, resp = fetch_html(url, cache=cache)
+    if html is None:
+        return None, resp
+    return parse_updates(html, resp.content, index), resp
+
+
+def stream_updates(url, cache, index):
+    """
+    流式下载并解析：凑够 MAX_ITEMS 条或遇到已推送且未变化的条目即断开连接，剩余正文不再下载。
+
+    返回 (updates, response)，页面未变化（304）时 updates 为 None
+    """
+    with open_html(url, cache=cache) as stream:
+        resp = stream.response
+        if ValidatorCache.is_not_modified(resp):
+            return None, resp
+        updates = extract_updates(stream, stop_at=index.contains, encoding=resp.charset_encoding)
+    logging.info("读取 %d 字节%s", stream.received, "" if stream.exhausted else "，已解析到所需条目，提前断开")
+    return updates, resp
+
+
 def main():
+    http_cache = ValidatorCache(HTTP_CACHE_FILE)
+    index = EntryIndex.load()
+    fetch = stream_updates if STREAM_FETCH and PARSER_BACKEND == "lxml" else fetch_updates
     try:
-        html = fetch_html(URL)
+        updates, resp = fetch(URL, http_cache, index)
     except Exception as e:
         logging.error("抓取失败：%s", e)
         return
 
-    updates = extract_updates(html)
-    if not updates:
+    if updates is None:
+        logging.info("页面未变化 (304)，跳过解析与推送")
+        return
+
+    if not updates and index.matched is None:
         logging.error("未解析到任何更新内容，请检查页面结构变化")
         return
 
-    logging.info("成功解析到 %d 条更新", len(updates))
+    # 从整体哈希迁移：上次推送的就是这几条时只建立索引，不重复推送
+    if not index.entries and updates and load_last_hash() == calc_hash(updates):
+        logging.info("已从旧版哈希缓存迁移条目索引")
+        index.add(updates)
+        index.save()
+        http_cache.store(URL, resp.headers, updates)
+        return
 
-    new_hash = calc_hash(updates)
-    old_hash = load_last_hash()
+    fresh = [u for u in updates if index.status(u)]
+    changed = [u for u in fresh if index.status(u) == "changed"]
+    logging.info("解析到 %d 条更新，其中新增 %d 条、修改 %d 条",
+                 len(updates), len(fresh) - len(changed), len(changed))
 
-    if new_hash == old_hash:
+    if not fresh:
         logging.info("内容未变化，不推送")
+        http_cache.store(URL, resp.headers, updates)
         return
 
-    body = format_updates(updates)
+    body = format_updates(fresh, changed=changed)
     body += f"\n\n👉 来源：{URL}"
 
     ok = push_serverchan("DigVPS 更新日志（有更新）", body)
 
     if ok:
-        save_last_hash(new_hash)
-        logging.info("推送成功并更新缓存")
+        index.add(fresh)
+        index.save()
+        # 入队成功后才记录校验字段，避免消息丢失后被 304 跳过；之后的投递失败由发件箱重试
+        http_cache.store(URL, resp.headers, updates)
+        logging.info("已加入推送队列并更新缓存")
     else:
-        logging.error("推送失败")
+        logging.error("推送入队失败")
 
 
 if __name__ == "__main__":
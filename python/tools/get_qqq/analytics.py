@@ -0,0 +1,64 @@
+"""
+基于本地日线历史的技术指标
+
+直接内存映射 history_store 的列文件，只读取计算所需的尾部窗口，
+全部用 NumPy 向量运算完成；标的再多，内存占用也只与窗口大小有关。
+"""
+
+from __future__ import annotations
+from typing import Dict, Optional
+
+import numpy as np
+
+from history_store import COLUMNS, HistoryStore
+
+MA_WINDOWS = (5, 20, 60, 200)
+VOL_WINDOWS = (20, 60)
+# 收益统计区间（交易日）
+RETURN_HORIZONS = {"1w": 5, "1m": 21, "3m": 63, "6m": 126, "1y": 252}
+TRADING_DAYS_PER_YEAR = 252
+LOOKBACK = max(MA_WINDOWS + VOL_WINDOWS + tuple(RETURN_HORIZONS.values())) + 1
+
+
+def load_column(store: HistoryStore, column: str) -> Optional[np.ndarray]:
+    """以只读内存映射方式打开整列（不读入内存）"""
+    n = len(store)
+    if n == 0:
+        return None
+    return np.memmap(store.path(column), dtype=np.dtype(COLUMNS[column]), mode="r", shape=(n,))
+
+
+def compute_metrics(close: np.ndarray) -> Dict[str, Optional[float]]:
+    """
+    close 为按日期升序的收盘价。窗口不足时对应指标为 None。
+
+    返回：ma5/ma20/ma60/ma200、drawdown_52w（距 52 周最高收盘的跌幅）、
+    vol20/vol60（年化已实现波动率）、ret_1w/ret_1m/ret_3m/ret_6m/ret_1y
+    """
+    tail = np.asarray(close[-LOOKBACK:], dtype=np.float64)
+    n = tail.size
+    last = tail[-1]
+    out: Dict[str, Optional[float]] = {}
+
+    for w in MA_WINDOWS:
+        out[f"ma{w}"] = float(tail[-w:].mean()) if n >= w else None
+
+    year = tail[-TRADING_DAYS_PER_YEAR:]
+    out["drawdown_52w"] = float(last / year.max() - 1)
+
+    log_ret = np.diff(np.log(tail))
+    for w in VOL_WINDOWS:
+        out[f"vol{w}"] = (float(log_ret[-w:].std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR))
+                          if log_ret.size >= w else None)
+
+    for name, h in RETURN_HORIZONS.items():
+        out[f"ret_{name}"] = float(last / tail[-1 - h] - 1) if n > h else None
+
+    return out
+
+
+def metrics_for(store: HistoryStore) -> Optional[Dict[str, Optional[float]]]:
+    close = load_column(store, "close")
+    if close is None or close.size < 2:
+        return None
+    return compute_metrics(close)
@@ -0,0 +1,91 @@
+"""
+指数日线历史本地存储
+
+每个代码一个目录，每列一个定长二进制文件（date 为 int32 的 YYYYMMDD，
+open/high/low/close 为 float64），只追加写入，读取最近几行只需 seek 到文件尾部。
+列式定长布局也便于直接内存映射做批量计算。
+"""
+
+from __future__ import annotations
+import os, re
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+# 列名 -> array typecode
+COLUMNS = {"date": "i", "open": "d", "high": "d", "low": "d", "close": "d"}
+
+Row = Tuple[int, float, float, float, float]
+
+
+def safe_name(symbol: str) -> str:
+    return re.sub(r"[^\w.-]", "_", symbol).lower()
+
+
+class HistoryStore:
+    def __init__(self, root: str, symbol: str):
+        self.symbol = symbol
+        self.dir = os.path.join(root, safe_name(symbol))
+
+    def path(self, column: str) -> str:
+        return os.path.join(self.dir, f"{column}.bin")
+
+    @staticmethod
+    def itemsize(column: str) -> int:
+        return array(COLUMNS[column]).itemsize
+
+    def _rows_in(self, column: str) -> int:
+        try:
+            return os.path.getsize(self.path(column)) // self.itemsize(column)
+        except FileNotFoundError:
+            return 0
+
+    def __len__(self) -> int:
+        # 写入中途中断时各列长度可能不一致，以最短列为准
+        return min(self._rows_in(column) for column in COLUMNS)
+
+    def _read(self, column: str, start: int, count: int) -> array:
+        a = array(COLUMNS[column])
+        with open(self.path(column), "rb") as f:
+            f.seek(start * a.itemsize)
+            a.fromfile(f, count)
+        return a
+
+    def tail(self, n: int) -> List[Row]:
+        """最近 n 行（按日期升序）"""
+        total = len(self)
+        n = min(n, total)
+        if n <= 0:
+            return []
+        columns = [self._read(column, total - n, n) for column in COLUMNS]
+        return list(zip(*columns))
+
+    def last_date(self) -> Optional[int]:
+        rows = self.tail(1)
+        return rows[0][0] if rows else None
+
+    def _truncate(self, n: int):
+        for column in COLUMNS:
+            path = self.path(column)
+            if os.path.exists(path):
+                os.truncate(path, n * self.itemsize(column))
+
+    def extend(self, rows: Iterable[Row]) -> int:
+        """
+        追加按日期升序的行；早于最后一行的忽略，与最后一行同日期的覆盖
+        （当日盘中的日线在收盘前会变化）。返回写入行数。
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        total = len(self)
+        self._truncate(total)  # 修复上次中断留下的不等长列
+
+        last = self.last_date()
+        new = [row for row in rows if last is None or row[0] >= last]
+        if not new:
+            return 0
+        if last is not None and new[0][0] == last:
+            self._truncate(total - 1)
+
+        for i, column in enumerate(COLUMNS):
+            with open(self.path(column), "ab") as f:
+                array(COLUMNS[column], (row[i] for row in new)).tofile(f)
+        return len(new)
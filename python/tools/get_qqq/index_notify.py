@@ -8,10 +8,22 @@
 """
 
 from __future__ import annotations
-import os, sys, time, json, random, logging, traceback
-from typing import Optional, Dict, Any
-import requests
-from datetime import datetime, timezone
+import os, re, sys, time, json, queue, random, signal, logging, argparse, threading, traceback
+from typing import Optional, Dict, Any, Callable, List
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # python/tools，便于导入 common
+from common.http_cache import CACHE_DIR, ValidatorCache
+from common.http_client import RetryPolicy, StreamingResponse, engine
+from common.notifier import Notifier
+from common.parse_cache import ParseCache
+from history_store import HistoryStore
+from source_health import Scoreboard
+from analytics import MA_WINDOWS, RETURN_HORIZONS, metrics_for
+from intraday import IndexWatch, WATCH_HYSTERESIS, WATCH_INTERVAL, WATCH_RULES, WATCH_SOURCES, parse_rules, ring_size
+from market_calendar import MARKET_TZ, holidays, is_open as market_is_open, session_for
+from quote_cache import QuoteCache, session_ttl
+from watchlist import HEDGE_LIMIT, RUN_WINDOW, WATCHLIST_FILE, BatchScheduler, load_watchlist, throughput_report
 
 # -------------------------------------------------------
 # config
@@ -21,19 +33,54 @@ PROXY_URL = os.getenv("PROXY_URL", "").strip() or None
 TIMEOUT = float(os.getenv("TIMEOUT", "6"))
 USER_AGENT = os.getenv("USER_AGENT",
                        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36")
+# 初始优先级；积累足够样本后按记分板（成功率、p50 耗时）动态重排，熔断中的源跳过
 PREFERRED_ORDER = os.getenv("PREFERRED_ORDER", "yahoo,sina,stooq,investing").split(",")
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE", "10"))  # 所有数据源并发查询的总时限（秒）
+# 外部 cron / 调度进程运行本脚本的间隔（秒），决定盘中行情缓存时长；--watch 时以轮询间隔为准
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "1800"))
 
-INDICES = {
+# 内置列表；配置了观察列表文件（WATCHLIST_FILE，格式见 watchlist.example.json）时以文件为准
+DEFAULT_INDICES = {
     "nasdaq100": {"name": "Nasdaq-100", "yahoo": "^NDX", "stooq": "^NDX", "sina": "int_nasdaq", "alt_symbol": "NDX"},
     "sp500": {"name": "S&P 500", "yahoo": "^GSPC", "stooq": "^SPX", "sina": "int_sp500", "alt_symbol": "SPX"},
 }
 
+# 条件请求缓存：Stooq/Sina 返回 304 时直接复用上次解析结果
+HTTP_CACHE_FILE = os.path.join(CACHE_DIR, "index_http_cache.json")
+# Stooq 日线历史本地存储；首次运行回补的天数（需覆盖 52 周）
+HISTORY_DIR = os.path.join(CACHE_DIR, "history")
+# 各数据源最近的成败与耗时（记分板 / 熔断状态）
+SCOREBOARD_FILE = os.path.join(CACHE_DIR, "index_source_scores.json")
+# 按代码与交易时段缓存的行情（休市期间不再请求数据源）
+QUOTE_CACHE_FILE = os.path.join(CACHE_DIR, "index_quote_cache.json")
+STOOQ_BOOTSTRAP_DAYS = int(os.getenv("STOOQ_BOOTSTRAP_DAYS", "400"))
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
-session = requests.Session()
-session.headers.update({"User-Agent": USER_AGENT})
-if PROXY_URL:
-    session.proxies.update({"http": PROXY_URL, "https": PROXY_URL})
+# 请求走共享 HTTP 引擎（连接复用）；重试只给一次机会，慢源交给 RUN_DEADLINE 与熔断处理
+HEADERS = {"User-Agent": USER_AGENT}
+RETRY = RetryPolicy(attempts=2, backoff=0.5, max_backoff=2)
+
+
+def http_get(url: str, headers: Optional[dict] = None):
+    return engine.get(url, headers={**HEADERS, **(headers or {})}, timeout=TIMEOUT, proxy=PROXY_URL, retry=RETRY)
+
+
+def http_open(url: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """流式 GET，正文由调用方逐块或逐行读取；需在 with 中使用"""
+    return engine.open(url, headers={**HEADERS, **(headers or {})}, timeout=TIMEOUT, proxy=PROXY_URL, retry=RETRY)
+
+
+http_cache = ValidatorCache(HTTP_CACHE_FILE)
+scoreboard = Scoreboard(SCOREBOARD_FILE)
+quote_cache = QuoteCache(QUOTE_CACHE_FILE)
+notifier = Notifier(SERVERCHAN_SCKEY)
+# 响应字节摘要 → 行情解析结果，各数据源独立命名空间
+parse_cache = {
+    "yahoo": ParseCache("quote_yahoo_v1"),
+    "sina": ParseCache("quote_sina_v2"),
+    "investing": ParseCache("quote_investing_v1"),
+}
 
 def now_iso(): return datetime.now(timezone.utc).astimezone().isoformat()
 
@@ -42,29 +89,15 @@ def now_iso(): return datetime.now(timezone.utc).astimezone().isoformat()
 # ServerChan
 # -------------------------------------------------------
 def send_serverchan(title: str, content_md: str) -> bool:
-    if not SERVERCHAN_SCKEY:
-        logging.error("SERVERCHAN_SCKEY not set, skip push.")
-        return False
-    url = f"https://sctapi.ftqq.com/{SERVERCHAN_SCKEY}.send"
-    data = {"title": title, "desp": content_md}
-    try:
-        r = session.post(url, data=data, timeout=TIMEOUT)
-        logging.info("ServerChan resp: %s %s", r.status_code, r.text[:200])
-        return r.ok
-    except Exception:
-        logging.exception("ServerChan error")
-        return False
+    """写入推送发件箱后立即返回，由后台线程合并、限流、重试投递"""
+    return notifier.send(title, content_md)
 
 
 # -------------------------------------------------------
 # Yahoo Finance (JSON quote)
 # -------------------------------------------------------
-def fetch_from_yahoo(symbols: list[str]) -> Dict[str, dict]:
-    q = ",".join(symbols)
-    url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={q}"
-    r = session.get(url, timeout=TIMEOUT)
-    r.raise_for_status()
-    data = r.json()
+def parse_yahoo(content: bytes) -> Dict[str, dict]:
+    data = json.loads(content)
 
     out = {}
     for qd in data.get("quoteResponse", {}).get("result", []):
@@ -88,22 +121,35 @@ def fetch_from_yahoo(symbols: list[str]) -> Dict[str, dict]:
     return out
 
 
+def fetch_from_yahoo(symbols: list[str]) -> Dict[str, dict]:
+    q = ",".join(symbols)
+    url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={q}"
+    r = http_get(url)
+    r.raise_for_status()
+    return parse_cache["yahoo"].memoize(r.content, lambda: parse_yahoo(r.content))
+
+
 # -------------------------------------------------------
 # Sina 免费行情（仅美股指数）
 # -------------------------------------------------------
-def fetch_from_sina(symbol: str) -> Optional[dict]:
-    url = f"https://hq.sinajs.cn/list={symbol}"
-    try:
-        r = session.get(url, timeout=TIMEOUT)
-        raw = r.text
-        arr = raw.split(",")
+SINA_LINE_RE = re.compile(r'var hq_str_(\w+)="([^"]*)"')
+
+
+def parse_sina(raw: str) -> Dict[str, dict]:
+    """解析 list=a,b,c 的多行响应，每行一个代码；无数据的代码跳过"""
+    out = {}
+    for m in SINA_LINE_RE.finditer(raw):
+        symbol, body = m.group(1), m.group(2)
+        if not body:
+            continue
+        arr = body.split(",")
         price = float(arr[1])
         prev = float(arr[2])
 
         change = price - prev
         pct = change / prev * 100 if prev else None
 
-        return {
+        out[symbol] = {
             "price": price,
             "prev": prev,
             "change": change,
@@ -111,133 +157,358 @@ def fetch_from_sina(symbol: str) -> Optional[dict]:
             "time": now_iso(),
             "source": "sina",
             "symbol": symbol,
-            "raw": raw
+            "raw": m.group(0)
         }
-    except:
-        return None
+    return out
+
+
+def fetch_from_sina(symbols: list[str]) -> Dict[str, dict]:
+    url = f"https://hq.sinajs.cn/list={','.join(symbols)}"
+    r = http_get(url, http_cache.conditional_headers(url))
+    if http_cache.is_not_modified(r):
+        return http_cache.payload(url)
+    r.raise_for_status()
+    out = parse_cache["sina"].memoize(r.content, lambda: parse_sina(r.text))
+    for quote in out.values():
+        quote["time"] = now_iso()  # Sina 不返回行情时间，以抓取时间为准（缓存命中时也刷新）
+    http_cache.store(url, r.headers, out)
+    return out
 
 
 # -------------------------------------------------------
 # Stooq 免费 CSV
 # -------------------------------------------------------
-def fetch_from_stooq(symbol: str) -> Optional[dict]:
-    url = f"https://stooq.com/q/d/l/?s={symbol}&i=d"
-    try:
-        r = session.get(url, timeout=TIMEOUT)
-        lines = r.text.strip().splitlines()
-        if len(lines) < 3:
-            return None
+def iter_stooq_rows(lines):
+    """逐行解析 Date,Open,High,Low,Close[,Volume] CSV，跳过表头和无效行"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("ascii", "ignore")
+        parts = line.strip().split(",")
+        if len(parts) < 5 or not parts[0][:1].isdigit():
+            continue
+        try:
+            yield (int(parts[0].replace("-", "")), float(parts[1]), float(parts[2]),
+                   float(parts[3]), float(parts[4]))
+        except ValueError:
+            continue
 
-        # last and second last rows
-        last = lines[-1].split(",")
-        prev = lines[-2].split(",")
 
-        close = float(last[4])
-        prev_close = float(prev[4])
+def sync_stooq_history(store: HistoryStore, symbol: str) -> int:
+    """
+    只下载本地历史之后的日期区间（含最后一天，盘中日线会更新），边接收边逐行写入本地存储。
+    返回新写入行数。
+    """
+    today = datetime.now(timezone.utc).date()
+    last = store.last_date()
+    if last:
+        start = datetime.strptime(str(last), "%Y%m%d").date()
+    else:
+        start = today - timedelta(days=STOOQ_BOOTSTRAP_DAYS)
+    end = today + timedelta(days=1)
+    url = f"https://stooq.com/q/d/l/?s={symbol}&i=d&d1={start:%Y%m%d}&d2={end:%Y%m%d}"
+
+    with http_open(url, http_cache.conditional_headers(url)) as stream:
+        r = stream.response
+        if http_cache.is_not_modified(r):
+            return 0
+        r.raise_for_status()
+        written = store.extend(iter_stooq_rows(stream.iter_lines()))
+        http_cache.store(url, r.headers, {"last_date": store.last_date()})
+    return written
 
-        change = close - prev_close
-        pct = change / prev_close * 100
 
-        return {
-            "price": close,
-            "prev": prev_close,
-            "change": change,
-            "pct": pct,
-            "time": last[0],
-            "source": "stooq",
-            "symbol": symbol,
-            "raw": last
-        }
-    except:
+def fetch_from_stooq(symbol: str) -> Optional[dict]:
+    store = HistoryStore(HISTORY_DIR, symbol)
+    sync_stooq_history(store, symbol)
+    rows = store.tail(2)
+    if len(rows) < 2:
         return None
 
+    # second last and last rows
+    prev, last = rows
+    close = last[4]
+    prev_close = prev[4]
+
+    change = close - prev_close
+    pct = change / prev_close * 100
+
+    day = str(last[0])
+    return {
+        "price": close,
+        "prev": prev_close,
+        "change": change,
+        "pct": pct,
+        "time": f"{day[:4]}-{day[4:6]}-{day[6:]}",
+        "source": "stooq",
+        "symbol": symbol,
+        "raw": list(last)
+    }
+
 
 # -------------------------------------------------------
 # Investing.com 免费 JSON API（无需登录）
 # -------------------------------------------------------
+def parse_investing(content: bytes, symbol: str) -> Optional[dict]:
+    j = json.loads(content)
+    if "c" not in j:
+        return None
+
+    close = j["c"][-1]
+    prev_close = j["c"][-2]
+
+    change = close - prev_close
+    pct = change / prev_close * 100
+
+    return {
+        "price": close,
+        "prev": prev_close,
+        "change": change,
+        "pct": pct,
+        "time": now_iso(),
+        "source": "investing",
+        "symbol": symbol,
+        "raw": j
+    }
+
+
 def fetch_from_investing(symbol: str) -> Optional[dict]:
     """
     非官方免费源，返回：price, prev, change, pct
     """
     url = f"https://tvc4.forexpros.com/{random.randint(1000000000,1999999999)}/1/1/8/history?symbol={symbol}&resolution=1"
-    try:
-        r = session.get(url, timeout=TIMEOUT)
-        j = r.json()
-        if "c" not in j:
-            return None
+    r = http_get(url)
+    r.raise_for_status()
+    out = parse_cache["investing"].memoize(r.content, lambda: parse_investing(r.content, symbol), extra=symbol)
+    if out:
+        out["time"] = now_iso()
+    return out
+
 
-        close = j["c"][-1]
-        prev_close = j["c"][-2]
+# -------------------------------------------------------
+# 调度器：每个数据源一次批量请求，剩余的再交给下一个源
+# -------------------------------------------------------
+def fetch_each(fetch_one: Callable[[str], Optional[dict]]) -> Callable[[list[str]], Dict[str, dict]]:
+    """
+    把单代码接口包装成批量接口（接口本身不支持多代码时逐个请求）
 
-        change = close - prev_close
-        pct = change / prev_close * 100
+    单个代码失败不影响其余代码；全部失败时抛出最后一个异常，供记分板记录失败原因
+    """
+    def fetch(symbols: list[str]) -> Dict[str, dict]:
+        out, error = {}, None
+        for symbol in symbols:
+            try:
+                r = fetch_one(symbol)
+            except Exception as e:
+                logging.warning("%s 获取失败：%s", symbol, e)
+                error = e
+                continue
+            if r:
+                out[symbol] = r
+        if not out and error is not None:
+            raise error
+        return out
+    return fetch
+
+
+# 数据源 -> (INDICES 中对应的代码字段, 批量抓取函数)
+SOURCES = {
+    "yahoo": ("yahoo", fetch_from_yahoo),
+    "sina": ("sina", fetch_from_sina),
+    "stooq": ("stooq", fetch_each(fetch_from_stooq)),
+    "investing": ("alt_symbol", fetch_each(fetch_from_investing)),
+}
 
-        return {
-            "price": close,
-            "prev": prev_close,
-            "change": change,
-            "pct": pct,
-            "time": now_iso(),
-            "source": "investing",
-            "symbol": symbol,
-            "raw": j
-        }
-    except:
-        return None
 
+INDICES = load_watchlist(WATCHLIST_FILE, DEFAULT_INDICES, (field for field, _ in SOURCES.values()))
+batch_scheduler = BatchScheduler({src: fetch for src, (_, fetch) in SOURCES.items()})
 
-# -------------------------------------------------------
-# 调度器：按 PREFERRED_ORDER 依次尝试
-# -------------------------------------------------------
-def get_index_values() -> dict:
-    results = {}
 
-    for src in PREFERRED_ORDER:
-        src = src.strip().lower()
+def is_large_watchlist() -> bool:
+    """超过 HEDGE_LIMIT 个代码时不再让所有源都查一遍，改为分批、限速、失败转下一个源"""
+    return len(INDICES) > HEDGE_LIMIT
 
-        for k, meta in INDICES.items():
-            if k in results:
-                continue
 
-            if src == "yahoo" and meta.get("yahoo"):
-                try:
-                    out = fetch_from_yahoo([meta["yahoo"]])
-                    if meta["yahoo"] in out:
-                        results[k] = out[meta["yahoo"]]
-                except:
-                    pass
-
-            elif src == "sina" and meta.get("sina"):
-                r = fetch_from_sina(meta["sina"])
-                if r:
-                    results[k] = r
-
-            elif src == "stooq" and meta.get("stooq"):
-                r = fetch_from_stooq(meta["stooq"])
-                if r:
-                    results[k] = r
-
-            elif src == "investing":
-                r = fetch_from_investing(meta["alt_symbol"])
-                if r:
-                    results[k] = r
+def is_valid_quote(q: Optional[dict]) -> bool:
+    return bool(q) and isinstance(q.get("price"), (int, float)) and q["price"] > 0
+
+
+def _source_worker(src: str, pending: Dict[str, str], results_queue: queue.Queue, abandoned: set):
+    _, fetch = SOURCES[src]
+    started = time.monotonic()
+    try:
+        quotes, error = fetch(list(pending)), None
+    except Exception as e:
+        quotes, error = {}, e
+    elapsed = time.monotonic() - started
+    answers = {k: quotes.get(symbol) for symbol, k in pending.items()}
+    # 超时后才返回的源已按超时记录，不再重复记录
+    if src not in abandoned:
+        ok = any(is_valid_quote(q) for q in answers.values())
+        reason = None if ok else (f"{type(error).__name__}: {error}" if error else "未返回有效行情")
+        scoreboard.record(src, ok, elapsed, reason)
+    results_queue.put((src, answers, elapsed, error))
+
+
+def get_index_values(deadline: Optional[float] = None, sources: Optional[List[str]] = None,
+                     use_cache: bool = True) -> dict:
+    """
+    观察列表中每个代码的行情：先查行情缓存（休市时用收盘后取到的缓存，盘中缓存时长按 POLL_INTERVAL 计算），
+    其余的从数据源（或 sources 中列出的）获取：不超过 HEDGE_LIMIT 个代码时 get_hedged_values()，
+    否则 get_watchlist_values()；deadline 默认分别为 RUN_DEADLINE、RUN_WINDOW
 
+    缓存命中的结果带 cached=True。use_cache=False 时不读缓存（盘中监控：缓存里可能是日线或
+    单次运行取到的行情，不能当作本次轮询的实时价格），取到的结果仍写入缓存
+    """
+    now = datetime.now(MARKET_TZ)
+    ttl = session_ttl(POLL_INTERVAL)
+    cached = {}
+    for k in INDICES if use_cache else ():
+        quote = quote_cache.get(k, now, ttl)
+        if quote is not None:
+            cached[k] = dict(quote, cached=True)
+    keys = [k for k in INDICES if k not in cached]
+    if cached:
+        logging.info("行情缓存命中 %d/%d（%s）", len(cached), len(INDICES), "盘中" if market_is_open(now) else "休市")
+    if not keys:
+        return cached
+
+    preferred = [src.strip().lower() for src in PREFERRED_ORDER if src.strip().lower() in SOURCES]
+    if sources is not None:
+        allowed = {src.strip().lower() for src in sources}
+        preferred = [src for src in preferred if src in allowed]
+    order = scoreboard.order(preferred)
+    skipped = [src for src in preferred if src not in order]
+    if skipped:
+        logging.info("熔断中，本次跳过：%s", ",".join(skipped))
+    logging.info("数据源顺序：%s", ",".join(order))
+    if is_large_watchlist():
+        results = get_watchlist_values(keys, order, skipped, RUN_WINDOW if deadline is None else deadline)
+    else:
+        results = get_hedged_values(keys, order, skipped, RUN_DEADLINE if deadline is None else deadline)
+    fetched = datetime.now(MARKET_TZ)
+    for k, quote in results.items():
+        quote_cache.put(k, quote, fetched)
+    results.update(cached)
     return results
 
 
+def get_hedged_values(keys: List[str], order: List[str], skipped: List[str], deadline: float) -> dict:
+    """
+    order 中的数据源并发查询（每个源一次批量请求），为每个代码选取优先级最高的有效结果：
+
+    - 更高优先级的源都已返回（或不覆盖该代码）即可确定，不再等待更慢的低优先级源
+    - 到达 deadline 时以已返回的结果为准
+
+    每条结果附带 latencies：{数据源: 耗时秒数，未在时限内返回为 None}
+    """
+    results_queue: queue.Queue = queue.Queue()
+    abandoned: set = set()
+
+    # 每个源能覆盖的指数：{源: {源代码: 指数 key}}
+    coverage: Dict[str, Dict[str, str]] = {}
+    for src in order:
+        symbol_key, _ = SOURCES[src]
+        pending = {INDICES[k][symbol_key]: k for k in keys if INDICES[k].get(symbol_key)}
+        if pending:
+            coverage[src] = pending
+            # 守护线程：超时未返回的源不会阻塞进程退出
+            threading.Thread(target=_source_worker, args=(src, pending, results_queue, abandoned), daemon=True).start()
+
+    answers: Dict[str, Dict[str, Optional[dict]]] = {}
+    latencies: Dict[str, Optional[float]] = {src: None for src in coverage}
+
+    def pick(k: str, final: bool):
+        """返回 (结果, 是否已确定)"""
+        for src, pending in coverage.items():
+            if k not in pending.values():
+                continue
+            if src not in answers:
+                if final:
+                    continue
+                return None, False
+            if is_valid_quote(answers[src].get(k)):
+                return answers[src][k], True
+        return None, True
+
+    end = time.monotonic() + deadline
+    while len(answers) < len(coverage):
+        if all(pick(k, final=False)[1] for k in keys):
+            break
+        timeout = end - time.monotonic()
+        try:
+            if timeout <= 0:
+                raise queue.Empty
+            src, quotes, elapsed, error = results_queue.get(timeout=timeout)
+        except queue.Empty:
+            late = [s for s in coverage if s not in answers]
+            logging.warning("已到达 %.1fs 时限，未返回的数据源：%s", deadline, ",".join(late))
+            for s in late:
+                abandoned.add(s)
+                scoreboard.record(s, False, deadline, f"超过 {deadline:.0f}s 时限未返回")
+            break
+        answers[src] = quotes
+        latencies[src] = round(elapsed, 3)
+        if error is not None:
+            logging.warning("%s 批量获取失败：%s", src, error)
+
+    results = {}
+    for k in keys:
+        quote, _ = pick(k, final=True)
+        if quote:
+            results[k] = dict(quote, latencies=dict(latencies), skipped=skipped)
+    return results
+
+
+def get_watchlist_values(keys: List[str], order: List[str], skipped: List[str], window: float) -> dict:
+    """
+    大观察列表：每个代码先交给 order 中第一个有对应代码的源，按各源批量上限分批、令牌桶限速、
+    在 window 内均摊发出，无有效行情或失败时转给下一个源
+
+    每条结果附带 latencies（各源从首个请求到最后一个返回的秒数）与 throughput（各源每秒有效代码数）
+    """
+    candidates = {k: [(src, INDICES[k][SOURCES[src][0]]) for src in order if INDICES[k].get(SOURCES[src][0])]
+                  for k in keys}
+    quotes, stats = batch_scheduler.run(candidates, window, is_valid_quote, scoreboard.record, scoreboard.is_open)
+    stats = {src: s for src, s in stats.items() if s.requests}
+    logging.info("共 %d 个代码，取到 %d 个；数据源吞吐：\n%s", len(keys), len(quotes), throughput_report(stats))
+    latencies = {src: None if s.elapsed is None else round(s.elapsed, 3) for src, s in stats.items()}
+    throughput = {src: None if s.rate is None else round(s.rate, 1) for src, s in stats.items()}
+    return {k: dict(q, latencies=latencies, throughput=throughput, skipped=skipped) for k, q in quotes.items()}
+
+
 # -------------------------------------------------------
 # 生成推送内容
 # -------------------------------------------------------
+def format_metrics(m: dict) -> str:
+    """均线、52 周回撤、波动率、多周期收益，单行展示"""
+    mas = "/".join("-" if m[f"ma{w}"] is None else f"{m[f'ma{w}']:.2f}" for w in MA_WINDOWS)
+    parts = [f"MA{'/'.join(str(w) for w in MA_WINDOWS)} `{mas}`",
+             f"距52周高点 `{m['drawdown_52w'] * 100:+.2f}%`"]
+    if m["vol20"] is not None:
+        parts.append(f"20日波动率 `{m['vol20'] * 100:.1f}%`")
+    rets = " ".join(f"{name} {m[f'ret_{name}'] * 100:+.1f}%"
+                    for name in RETURN_HORIZONS if m[f"ret_{name}"] is not None)
+    if rets:
+        parts.append(f"收益 `{rets}`")
+    return "　".join(parts)
+
+
 def build_message(results: dict) -> (str, str):
     title = f"指数快讯 — {datetime.now().astimezone().strftime('%Y-%m-%d %H:%M:%S')}"
     md = [f"**{title}**\n"]
+    # 大观察列表每个代码一行，不附技术指标，失败的汇总成一行
+    detailed = not is_large_watchlist()
+    failed = []
 
     for k, meta in INDICES.items():
         name = meta["name"]
         r = results.get(k)
 
         if not r:
-            md.append(f"- **{name}**：❌ 获取失败")
+            if detailed:
+                md.append(f"- **{name}**：❌ 获取失败")
+            else:
+                failed.append(name)
             continue
 
         price = r["price"]
@@ -251,18 +522,121 @@ def build_message(results: dict) -> (str, str):
             line += f"　`{change:+.2f}`　`({pct:+.2f}%)`"
 
         line += f"　来源：`{src}`"
+        if r.get("cached"):
+            line += "（缓存）"
 
         md.append(line)
 
+        # 基于本地日线历史（Stooq）的技术指标
+        if detailed and meta.get("stooq"):
+            try:
+                metrics = metrics_for(HistoryStore(HISTORY_DIR, meta["stooq"]))
+            except Exception as e:
+                logging.warning("%s 技术指标计算失败：%s", name, e)
+                metrics = None
+            if metrics:
+                md.append("　" + format_metrics(metrics))
+
+    if failed:
+        md.append(f"❌ 获取失败（{len(failed)}）：" + "、".join(failed))
+
+    latencies = next((r["latencies"] for r in results.values() if r.get("latencies")), None)
+    if latencies:
+        md.append("数据源耗时：" + "　".join(
+            f"`{src} {'未返回' if t is None else f'{t:.2f}s'}`" for src, t in latencies.items()))
+    throughput = next((r["throughput"] for r in results.values() if r.get("throughput")), None)
+    if throughput:
+        md.append("数据源吞吐：" + "　".join(
+            f"`{src} {'-' if v is None else f'{v:.1f}/s'}`" for src, v in throughput.items()))
+    skipped = next((r["skipped"] for r in results.values() if r.get("skipped")), None)
+    if skipped:
+        md.append("熔断跳过：" + "　".join(f"`{src}`" for src in skipped))
+
     md.append("\n----\n`Generated at " + now_iso() + "`")
 
     return title, "\n\n".join(md)
 
 
+# -------------------------------------------------------
+# 盘中监控
+# -------------------------------------------------------
+def build_alert_message(alerts: list) -> (str, str):
+    """alerts: [(IndexWatch, 规则, 涨跌幅)]"""
+    names = "、".join(dict.fromkeys(w.name for w, _, _ in alerts))
+    title = f"指数异动 — {names}"
+    md = [f"**{title}**\n"]
+    for w, rule, pct in alerts:
+        md.append(f"- **{w.name}** `{w.price:.2f}`：{rule.label} `{pct:+.2f}%`（阈值 ±{rule.threshold:g}%）")
+    for w in dict.fromkeys(w for w, _, _ in alerts):
+        refs = [f"{label} `{(w.price / ref - 1) * 100:+.2f}%`"
+                for label, ref in (("较开盘", w.open), ("较昨收", w.prev_close)) if ref]
+        if refs:
+            md.append(f"　{w.name}：" + "　".join(refs))
+    md.append("\n----\n`Generated at " + now_iso() + "`")
+    return title, "\n\n".join(md)
+
+
+def watch(stop: threading.Event, interval: float = WATCH_INTERVAL):
+    """
+    美股交易时段内每 interval 秒轮询一次（只用 WATCH_SOURCES），越过阈值时推送；
+    休市（含节假日，提前收盘日按 13:00 收盘）期间等到下一次开盘，直到 stop 被置位
+    """
+    rules = parse_rules(WATCH_RULES)
+    size = ring_size(rules, interval)
+    watches = {k: IndexWatch(meta["name"], rules, size, WATCH_HYSTERESIS) for k, meta in INDICES.items()}
+    logging.info("盘中监控：间隔 %gs，规则 %s，回滞 %.2f 个百分点，每个指数保留最近 %d 个价格",
+                 interval, WATCH_RULES, WATCH_HYSTERESIS, size)
+
+    while not stop.is_set():
+        now = datetime.now(MARKET_TZ)
+        opened, closes = session_for(now)
+        if now < opened:
+            holiday = holidays(now.year).get(now.date())
+            logging.info("休市中%s，下次开盘 %s（本地 %s）", f"（{holiday}）" if holiday else "",
+                         f"{opened:%m-%d %H:%M} ET", opened.astimezone().strftime("%m-%d %H:%M"))
+            scoreboard.save()
+            quote_cache.save()
+            stop.wait((opened - now).total_seconds())
+            continue
+
+        started = time.monotonic()
+        budget = RUN_WINDOW if is_large_watchlist() else RUN_DEADLINE
+        results = get_index_values(deadline=min(budget, interval), sources=WATCH_SOURCES, use_cache=False)
+        ts = time.time()
+        alerts = []
+        for k, w in watches.items():
+            w.start_session(opened)
+            if k in results:
+                w.update(results[k], ts)
+            alerts += [(w, rule, pct) for rule, pct in w.check(ts)]
+        if alerts:
+            logging.info("触发 %d 条异动提醒", len(alerts))
+            send_serverchan(*build_alert_message(alerts))
+        # 收盘前最后一次轮询不越过收盘时间太多
+        stop.wait(max(0.0, min(interval - (time.monotonic() - started), (closes - now).total_seconds())))
+    scoreboard.save()
+    quote_cache.save()
+
+
 # -------------------------------------------------------
 # main
 # -------------------------------------------------------
-def main():
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="指数行情推送")
+    parser.add_argument("--scores", action="store_true", help="输出各数据源成功率、耗时与熔断状态后退出")
+    parser.add_argument("--watch", action="store_true", help="常驻运行，交易时段内轮询并按阈值推送异动")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="--watch 的轮询间隔（秒）")
+    args = parser.parse_args(argv)
+    if args.scores:
+        print(scoreboard.report(list(SOURCES)))
+        return
+    if args.watch:
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+        watch(stop, args.interval)
+        return
+
     try:
         results = get_index_values()
         title, content = build_message(results)
@@ -272,6 +646,10 @@ def main():
         logging.error(err)
         if SERVERCHAN_SCKEY:
             send_serverchan("指数脚本异常", f"```\n{err}\n```")
+    finally:
+        scoreboard.save()
+        quote_cache.prune(INDICES)
+        quote_cache.save()
 
 
 if __name__ == "__main__":
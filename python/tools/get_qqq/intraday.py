@@ -0,0 +1,156 @@
+"""
+盘中监控：美股交易时段（market_calendar，含节假日与提前收盘）内按固定间隔轮询，涨跌幅越过阈值时推送
+
+每个指数只保留固定长度的最近价格环形缓冲区（deque(maxlen)），运行多久内存都不增长：
+- 规则（WATCH_RULES，逗号分隔）：open:1.5 相对开盘价、prev:2 相对昨收、15m:1 最近 15 分钟内的最大波动，单位 %
+- 回滞：规则触发后，涨跌幅回落到 阈值 - WATCH_HYSTERESIS 以内才重新生效，价格在阈值附近来回时不反复推送；
+  直接反向越过阈值时立即触发
+- Investing 返回的 1 分钟 K 线整段并入缓冲区（而不只取最后两根），开盘价、昨收也从 K 线得出
+"""
+
+from __future__ import annotations
+import math, os
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "60"))        # 轮询间隔（秒）
+WATCH_RULES = os.getenv("WATCH_RULES", "open:1.5,prev:2,15m:1")
+WATCH_HYSTERESIS = float(os.getenv("WATCH_HYSTERESIS", "0.3"))   # 回滞（百分点）
+# 盘中轮询使用的数据源（Stooq 只有日线，不参与）
+WATCH_SOURCES = os.getenv("WATCH_SOURCES", "yahoo,sina,investing").split(",")
+
+BAR_SECONDS = 60                # Investing resolution=1
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    kind: str            # open / prev / window
+    threshold: float     # %
+    minutes: int = 0     # window 规则的时间窗口
+
+    @property
+    def label(self) -> str:
+        return {"open": "较开盘", "prev": "较昨收"}.get(self.kind, f"{self.minutes} 分钟内")
+
+
+def parse_rules(text: str) -> List[AlertRule]:
+    """解析 "open:1.5,prev:2,15m:1"；格式错误抛 ValueError"""
+    rules = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, sep, value = part.partition(":")
+        name = name.strip().lower()
+        threshold = float(value) if sep else math.nan
+        if not threshold > 0:
+            raise ValueError(f"阈值须为正数: {part!r}")
+        if name in ("open", "prev"):
+            rules.append(AlertRule(name, threshold))
+        elif name.endswith("m") and name[:-1].isdigit() and int(name[:-1]) > 0:
+            rules.append(AlertRule("window", threshold, int(name[:-1])))
+        else:
+            raise ValueError(f"未知规则: {part!r}（可用 open / prev / <N>m）")
+    return rules
+
+
+def ring_size(rules: List[AlertRule], interval: float) -> int:
+    """缓冲区长度：足以覆盖最长的时间窗口（轮询间隔与 1 分钟 K 线取较密者）"""
+    longest = max((r.minutes for r in rules if r.kind == "window"), default=0)
+    step = min(interval, BAR_SECONDS)
+    return max(16, math.ceil(longest * 60 / step) + 2)
+
+
+class IndexWatch:
+    """单个指数的盘中状态；每次轮询 update() 后 check()，开销只与缓冲区长度有关"""
+
+    def __init__(self, name: str, rules: List[AlertRule], size: int, hysteresis: float = WATCH_HYSTERESIS):
+        self.name = name
+        self.rules = rules
+        self.hysteresis = hysteresis
+        self.ticks: Deque[Tuple[float, float]] = deque(maxlen=size)   # (unix 秒, 价格)
+        self.session: Optional[date] = None
+        self.open_ts = 0.0                  # 本交易日开盘时刻（unix 秒）
+        self.open: Optional[float] = None
+        self.prev_close: Optional[float] = None
+        self.fired: Dict[AlertRule, int] = {r: 0 for r in rules}      # 已触发方向 +1/-1，0 表示待触发
+
+    def start_session(self, opened: datetime):
+        """进入新的交易日时清空缓冲区与触发状态"""
+        if self.session == opened.date():
+            return
+        self.session = opened.date()
+        self.open_ts = opened.timestamp()
+        self.ticks.clear()
+        self.open = self.prev_close = None
+        self.fired = dict.fromkeys(self.rules, 0)
+
+    @property
+    def price(self) -> Optional[float]:
+        return self.ticks[-1][1] if self.ticks else None
+
+    def add_tick(self, ts: float, price: float):
+        if self.ticks and ts <= self.ticks[-1][0]:
+            if ts == self.ticks[-1][0]:
+                self.ticks[-1] = (ts, price)
+            return
+        self.ticks.append((ts, price))
+
+    def update(self, quote: dict, now: float):
+        """并入一次轮询的行情（须先 start_session）"""
+        raw = quote.get("raw")
+        if quote.get("source") == "investing" and isinstance(raw, dict) and raw.get("t"):
+            self._add_bars(raw)
+        else:
+            self.add_tick(now, quote["price"])
+            # Investing 的 prev 是上一根 K 线（缓存命中时没有 K 线），其余源为昨日收盘
+            if self.prev_close is None and quote.get("prev") and quote.get("source") != "investing":
+                self.prev_close = quote["prev"]
+            if self.open is None and isinstance(raw, dict) and raw.get("regularMarketOpen"):
+                self.open = raw["regularMarketOpen"]
+        if self.open is None and self.ticks:
+            self.open = self.ticks[0][1]    # 开盘后才开始监控且数据源不给开盘价时，以首个价格近似
+
+    def _add_bars(self, bars: dict):
+        """只从尾部向前扫描到已有的最后一根，K 线再多也只处理新增部分"""
+        t, c, o = bars["t"], bars["c"], bars.get("o") or bars["c"]
+        open_ts = self.open_ts
+        last = self.ticks[-1][0] if self.ticks else open_ts - BAR_SECONDS
+        start = len(t)
+        while start > 0 and t[start - 1] >= last and t[start - 1] >= open_ts:
+            start -= 1
+        if self.open is None and start < len(t) and t[start] < open_ts + BAR_SECONDS:
+            self.open = o[start]             # 开盘第一根
+        if self.prev_close is None and 0 < start < len(t) and t[start - 1] < open_ts:
+            self.prev_close = c[start - 1]   # 开盘前最后一根即昨收
+        for i in range(start, len(t)):
+            self.add_tick(t[i], c[i])
+
+    def move(self, rule: AlertRule, now: float) -> Optional[float]:
+        """当前价相对规则参照的涨跌幅（%）；窗口规则取窗口内相对最低/最高价中幅度较大者"""
+        price = self.price
+        if price is None:
+            return None
+        if rule.kind == "window":
+            since = now - rule.minutes * 60
+            window = [p for ts, p in self.ticks if ts >= since]
+            if not window:
+                return None
+            up, down = price / min(window) - 1, price / max(window) - 1
+            return (up if up >= -down else down) * 100
+        ref = self.open if rule.kind == "open" else self.prev_close
+        return (price / ref - 1) * 100 if ref else None
+
+    def check(self, now: float) -> List[Tuple[AlertRule, float]]:
+        """返回本次新触发的（规则, 涨跌幅）"""
+        alerts = []
+        for rule in self.rules:
+            pct = self.move(rule, now)
+            if pct is None:
+                continue
+            direction = 1 if pct >= rule.threshold else -1 if pct <= -rule.threshold else 0
+            if direction and direction != self.fired[rule]:
+                self.fired[rule] = direction
+                alerts.append((rule, pct))
+            elif not direction and abs(pct) < rule.threshold - self.hysteresis:
+                self.fired[rule] = 0
+        return alerts
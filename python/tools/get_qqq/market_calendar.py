@@ -0,0 +1,125 @@
+"""
+美股（NYSE / Nasdaq）交易日历
+
+常规交易时段美东 9:30-16:00；休市日与提前收盘（13:00）按交易所规则逐年推算，不依赖网络：
+- 休市：元旦、马丁·路德·金纪念日、总统日、耶稣受难日、阵亡将士纪念日、六月节（2022 年起）、独立日、
+  劳动节、感恩节、圣诞节；逢周六提前到周五、逢周日顺延到周一（元旦逢周六不调休）
+- 提前收盘：独立日前一天（7 月 3 日为交易日时）、感恩节次日、平安夜（12 月 24 日为交易日时）
+- 临时休市（如国丧日）无规则可循，写在 SPECIAL_CLOSURES 或环境变量 MARKET_CLOSURES（逗号分隔的日期）中
+"""
+
+from __future__ import annotations
+import os
+from datetime import date, datetime, time as dtime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+SESSION_OPEN = dtime(9, 30)
+SESSION_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5): "布什国丧日",
+    date(2025, 1, 9): "卡特国丧日",
+}
+for _day in filter(None, os.getenv("MARKET_CLOSURES", "").split(",")):
+    SPECIAL_CLOSURES[date.fromisoformat(_day.strip())] = "临时休市"
+
+Session = Tuple[datetime, datetime]
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """某月第 n 个星期几（n=-1 为最后一个）"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """公历复活节（Anonymous Gregorian 算法）"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day: date) -> date:
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> Dict[date, str]:
+    """该年的休市日（不含周末）"""
+    days = {
+        _nth_weekday(year, 1, 0, 3): "马丁·路德·金纪念日",
+        _nth_weekday(year, 2, 0, 3): "总统日",
+        _easter(year) - timedelta(days=2): "耶稣受难日",
+        _nth_weekday(year, 5, 0, -1): "阵亡将士纪念日",
+        _observed(date(year, 7, 4)): "独立日",
+        _nth_weekday(year, 9, 0, 1): "劳动节",
+        _nth_weekday(year, 11, 3, 4): "感恩节",
+        _observed(date(year, 12, 25)): "圣诞节",
+    }
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days[_observed(new_year)] = "元旦"
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = "六月节"
+    days.update({d: name for d, name in SPECIAL_CLOSURES.items() if d.year == year})
+    return days
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> Set[date]:
+    candidates = {date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 12, 24)}
+    return {d for d in candidates if is_trading_day(d)}
+
+
+def session(day: date) -> Optional[Session]:
+    """该日的（开盘, 收盘），美东时间；休市返回 None"""
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else SESSION_CLOSE
+    return datetime.combine(day, SESSION_OPEN, MARKET_TZ), datetime.combine(day, close, MARKET_TZ)
+
+
+def session_for(now: datetime) -> Session:
+    """当前所在或下一个交易时段"""
+    day = now.astimezone(MARKET_TZ).date()
+    while True:
+        s = session(day)
+        if s is not None and now < s[1]:
+            return s
+        day += timedelta(days=1)
+
+
+def last_session(now: datetime) -> Session:
+    """已经开盘的最近一个交易时段（盘中即当前时段，否则为上一次收盘的时段）"""
+    day = now.astimezone(MARKET_TZ).date()
+    while True:
+        s = session(day)
+        if s is not None and s[0] <= now:
+            return s
+        day -= timedelta(days=1)
+
+
+def is_open(now: datetime) -> bool:
+    opened, closes = last_session(now)
+    return now < closes
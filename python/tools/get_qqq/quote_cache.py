@@ -0,0 +1,64 @@
+"""
+按代码与交易时段缓存的行情
+
+每个代码保存最近一次取到的行情、所属交易时段（开盘日期）与取到的时间：
+- 休市（收盘后、开盘前、周末、节假日）：缓存属于最近一次收盘的时段，且是收盘 CLOSE_SETTLE 秒之后取到的，
+  即为收盘价，直接使用，不发请求；盘中取到的行情收盘后需再取一次
+- 盘中：缓存时长随轮询间隔变化（间隔 × QUOTE_TTL_FACTOR，至少 QUOTE_MIN_TTL 秒），
+  重叠的运行（手动运行、调度与盘中监控同时触发）复用刚取到的结果
+"""
+
+from __future__ import annotations
+import os, threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from common.json_store import atomic_write_json, load_json
+from market_calendar import last_session
+
+CLOSE_SETTLE = 15 * 60          # 收盘后多久的行情视为收盘价（收盘竞价与数据源更新的延迟）
+QUOTE_TTL_FACTOR = float(os.getenv("QUOTE_TTL_FACTOR", "0.5"))
+QUOTE_MIN_TTL = 5.0
+# 只保存展示所需的字段；raw（Investing 整段 K 线等）与每次运行的统计不入缓存
+DROP_FIELDS = ("raw", "latencies", "throughput", "skipped", "cached")
+
+
+def session_ttl(interval: float) -> float:
+    """盘中缓存时长（秒）"""
+    return max(QUOTE_MIN_TTL, interval * QUOTE_TTL_FACTOR)
+
+
+class QuoteCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, dict] = load_json(path, {}, "行情缓存")
+
+    def get(self, key: str, now: datetime, ttl: float) -> Optional[dict]:
+        """仍然有效的缓存行情，否则 None"""
+        e = self.entries.get(key)
+        opened, closes = last_session(now)
+        if not e or e["session"] != opened.date().isoformat():
+            return None
+        if now >= closes:
+            return e["quote"] if e["fetched_at"] >= closes.timestamp() + CLOSE_SETTLE else None
+        return e["quote"] if now.timestamp() - e["fetched_at"] < ttl else None
+
+    def put(self, key: str, quote: dict, now: datetime):
+        opened, _ = last_session(now)
+        with self._lock:
+            self.entries[key] = {
+                "session": opened.date().isoformat(),
+                "fetched_at": now.timestamp(),
+                "quote": {k: v for k, v in quote.items() if k not in DROP_FIELDS},
+            }
+
+    def prune(self, keys):
+        """删除已不在观察列表中的代码"""
+        with self._lock:
+            for key in set(self.entries) - set(keys):
+                del self.entries[key]
+
+    def save(self):
+        with self._lock:
+            atomic_write_json(self.path, self.entries, "行情缓存")
@@ -0,0 +1,115 @@
+"""
+数据源健康记分板与熔断
+
+按数据源持久化最近若干次请求的成败与耗时，给出成功率、p50/p95 耗时和最近一次失败原因：
+- 熔断：连续失败 BREAKER_THRESHOLD 次后在冷却期内跳过该源；冷却期满后放行一次试探，
+  成功即恢复，失败则冷却期翻倍（上限 BREAKER_MAX_COOLDOWN）
+- 排序：按成功率（按 10% 分档）降序、p50 耗时升序重排数据源，样本不足的源保持配置顺序
+"""
+
+from __future__ import annotations
+import logging, math, os, threading, time
+from typing import Dict, List, Optional
+
+from common.json_store import atomic_write_json, load_json
+
+WINDOW = 50                  # 每个源保留的最近样本数
+MIN_SAMPLES = 5              # 样本少于此数时不参与动态排序
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "1800"))   # 首次熔断冷却（秒）
+BREAKER_MAX_COOLDOWN = 6 * 3600
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩法分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Scoreboard:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sources: Dict[str, dict] = load_json(path, {}, "数据源记分板")
+
+    def _entry(self, src: str) -> dict:
+        return self.sources.setdefault(src, {
+            "samples": [],              # [成功 0/1, 耗时秒]
+            "consecutive_failures": 0,
+            "cooldown": 0.0,            # 当前冷却时长，0 表示未熔断
+            "open_until": 0.0,
+            "last_failure": None,       # {"time": ..., "reason": ...}
+        })
+
+    def record(self, src: str, ok: bool, elapsed: float, reason: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            e = self._entry(src)
+            e["samples"] = (e["samples"] + [[int(ok), round(elapsed, 3)]])[-WINDOW:]
+            if ok:
+                if e["cooldown"]:
+                    logging.info("%s 试探成功，解除熔断", src)
+                e.update(consecutive_failures=0, cooldown=0.0, open_until=0.0)
+                return
+            e["consecutive_failures"] += 1
+            e["last_failure"] = {"time": now, "reason": (reason or "未知错误")[:200]}
+            if e["cooldown"]:
+                # 半开状态下试探失败：冷却期翻倍
+                e["cooldown"] = min(e["cooldown"] * 2, BREAKER_MAX_COOLDOWN)
+            elif e["consecutive_failures"] >= BREAKER_THRESHOLD:
+                e["cooldown"] = BREAKER_COOLDOWN
+            else:
+                return
+            e["open_until"] = now + e["cooldown"]
+            logging.warning("%s 连续失败 %d 次，熔断 %.0f 分钟：%s",
+                            src, e["consecutive_failures"], e["cooldown"] / 60, e["last_failure"]["reason"])
+
+    def is_open(self, src: str, now: Optional[float] = None) -> bool:
+        """熔断中（冷却期未满）返回 True；冷却期满后放行试探"""
+        e = self.sources.get(src)
+        return bool(e) and (now or time.time()) < e["open_until"]
+
+    def stats(self, src: str) -> dict:
+        e = self.sources.get(src) or {"samples": [], "last_failure": None}
+        samples = e["samples"]
+        latencies = [t for ok, t in samples if ok]
+        return {
+            "samples": len(samples),
+            "success_rate": sum(ok for ok, _ in samples) / len(samples) if samples else None,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "last_failure": e["last_failure"],
+            "open_until": e["open_until"] if self.is_open(src) else None,
+        }
+
+    def order(self, preferred: List[str]) -> List[str]:
+        """按健康度重排数据源（熔断中的源排除在外）"""
+        def key(item):
+            index, src = item
+            s = self.stats(src)
+            if s["samples"] < MIN_SAMPLES:
+                return (0, 0.0, index)
+            return (-round(s["success_rate"] * 10), s["p50"] if s["p50"] is not None else float("inf"), index)
+        return [src for _, src in sorted(enumerate(preferred), key=key) if not self.is_open(src)]
+
+    def report(self, sources: List[str]) -> str:
+        lines = []
+        for src in sources:
+            s = self.stats(src)
+            rate = "-" if s["success_rate"] is None else f"{s['success_rate'] * 100:.0f}%"
+            p50 = "-" if s["p50"] is None else f"{s['p50']:.2f}s"
+            p95 = "-" if s["p95"] is None else f"{s['p95']:.2f}s"
+            line = f"{src}: 成功率 {rate}（{s['samples']} 次）p50 {p50} p95 {p95}"
+            if s["open_until"]:
+                line += f"　熔断至 {time.strftime('%H:%M', time.localtime(s['open_until']))}"
+            if s["last_failure"]:
+                when = time.strftime("%m-%d %H:%M", time.localtime(s["last_failure"]["time"]))
+                line += f"　最近失败 {when}：{s['last_failure']['reason']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def save(self):
+        with self._lock:
+            atomic_write_json(self.path, self.sources, "数据源记分板")
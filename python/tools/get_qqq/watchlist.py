@@ -0,0 +1,249 @@
+"""
+大观察列表：配置文件、按数据源限速、分批与均摊调度
+
+- 观察列表（WATCHLIST_FILE，JSON）: {"symbols": [{"key": ..., "name": ..., "yahoo": ..., "sina": ..., "stooq": ..., "alt_symbol": ...}]}，
+  文件不存在时使用内置的两个指数
+- 每个代码先交给（记分板排序后）第一个有对应代码的源，无有效行情或请求失败时转给下一个源，
+  而不是所有源都把整个列表查一遍
+- 每个源按单次请求可带的最大代码数（batch）分批；请求前从该源的令牌桶取令牌（rate 次/秒，容量 burst），
+  桶在进程内共享，常驻运行时跨多次运行生效
+- 均摊：某源计划的请求数超过 burst 时，按 max(1/rate, 窗口 * SPREAD / 请求数) 的间隔均匀发出，不在开头集中突发
+"""
+
+from __future__ import annotations
+import json, logging, math, os, threading, time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE", "/config/watchlist.json")
+RUN_WINDOW = float(os.getenv("RUN_WINDOW", "60"))    # 大列表一次运行的时间窗口（秒）
+HEDGE_LIMIT = int(os.getenv("HEDGE_LIMIT", "10"))    # 不超过此数时仍所有源并发查询、取最快的高优先级结果
+SPREAD = 0.8                                         # 计划请求在窗口的前 80% 内发完，留出返回时间
+
+
+@dataclass(frozen=True)
+class SourceLimit:
+    batch: int             # 单次请求最多的代码数
+    rate: float            # 令牌补充速度（次/秒）
+    burst: int             # 令牌桶容量
+    concurrency: int = 2   # 同时进行的请求数
+
+
+# 各源的经验承受能力：Yahoo v7 quote 一次可查数百个代码但频繁请求会 429；
+# Sina list= 以 URL 长度为限；Stooq 与 tvc4 每次一个代码，Stooq 另有每日次数上限
+SOURCE_LIMITS = {
+    "yahoo": SourceLimit(batch=200, rate=1.0, burst=3),
+    "sina": SourceLimit(batch=100, rate=2.0, burst=5),
+    "stooq": SourceLimit(batch=1, rate=0.5, burst=3),
+    "investing": SourceLimit(batch=1, rate=1.0, burst=3, concurrency=3),
+}
+# 覆盖各源的 rate，如 "stooq:0.2,yahoo:2"
+for _item in filter(None, os.getenv("SOURCE_RATES", "").split(",")):
+    _src, _, _rate = _item.partition(":")
+    if _src.strip() in SOURCE_LIMITS:
+        SOURCE_LIMITS[_src.strip()] = replace(SOURCE_LIMITS[_src.strip()], rate=float(_rate))
+
+
+def load_watchlist(path: str, default: Dict[str, dict], fields: Iterable[str]) -> Dict[str, dict]:
+    """读取观察列表（key -> 配置，与内置 INDICES 同结构）；fields 为各源的代码字段"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return default
+    fields = tuple(fields)
+    out: Dict[str, dict] = {}
+    for i, raw in enumerate(config.get("symbols", [])):
+        key = raw.get("key")
+        if not key:
+            raise ValueError(f"第 {i + 1} 个代码缺少 key")
+        if key in out:
+            raise ValueError(f"重复的 key: {key}")
+        if not any(raw.get(f) for f in fields):
+            raise ValueError(f"{key} 没有配置任何数据源代码（{' / '.join(fields)}）")
+        out[key] = dict(raw, name=raw.get("name") or key)
+    if not out:
+        raise ValueError(f"观察列表为空: {path}")
+    return out
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        """取一个令牌：成功返回 0，否则返回还需等待的秒数"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+BUCKETS = {src: TokenBucket(limit.rate, limit.burst) for src, limit in SOURCE_LIMITS.items()}
+
+
+@dataclass
+class Throughput:
+    requests: int = 0
+    symbols: int = 0       # 请求的代码数
+    ok: int = 0            # 拿到有效行情的代码数
+    failed: int = 0        # 失败的请求数
+    first: Optional[float] = None
+    last: Optional[float] = None
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        return None if self.first is None or self.last is None else self.last - self.first
+
+    @property
+    def rate(self) -> Optional[float]:
+        """每秒拿到的有效代码数（从第一个请求发出到最后一个返回）"""
+        if not self.elapsed:
+            return None
+        return self.ok / self.elapsed
+
+
+def throughput_report(stats: Dict[str, Throughput]) -> str:
+    lines = []
+    for src, s in stats.items():
+        if not s.requests:
+            continue
+        rate = "-" if s.rate is None else f"{s.rate:.1f} 个/秒"
+        elapsed = "-" if s.elapsed is None else f"{s.elapsed:.1f}s"
+        lines.append(f"{src}: {s.requests} 次请求（失败 {s.failed}）{s.symbols} 个代码，成功 {s.ok}，耗时 {elapsed}，{rate}")
+    return "\n".join(lines)
+
+
+# 候选：[(数据源, 该源的代码)]，按优先级排列
+Candidates = Dict[str, List[Tuple[str, str]]]
+
+
+class BatchScheduler:
+    """按源分批、限速、失败转下一个源的抓取调度；调度在调用线程中进行，请求在线程池中执行"""
+
+    def __init__(self, fetchers: Dict[str, Callable[[List[str]], Dict[str, dict]]],
+                 limits: Dict[str, SourceLimit] = SOURCE_LIMITS, buckets: Dict[str, TokenBucket] = BUCKETS):
+        self.fetchers = fetchers
+        self.limits = limits
+        self.buckets = buckets
+
+    def run(self, candidates: Candidates, window: float, is_valid: Callable[[Optional[dict]], bool],
+            record: Optional[Callable[..., None]] = None,
+            is_open: Callable[[str], bool] = lambda src: False) -> Tuple[Dict[str, dict], Dict[str, Throughput]]:
+        """
+        返回 ({key: 行情}, {数据源: 吞吐统计})；到达 window 时以已返回的结果为准。
+        record(src, ok, elapsed, reason) 每个请求调用一次（接记分板），is_open(src) 为真的源不再发请求
+        """
+        started = time.monotonic()
+        deadline = started + window
+        step = dict.fromkeys(candidates, 0)                  # 每个代码当前尝试的候选序号
+        pending: Dict[str, Deque[str]] = {src: deque() for src in self.fetchers}
+        for key, cands in candidates.items():
+            if cands:
+                pending[cands[0][0]].append(key)
+        unresolved: Set[str] = {key for key, cands in candidates.items() if cands}
+
+        spacing, next_at = {}, {}
+        for src, keys in pending.items():
+            limit = self.limits[src]
+            n = math.ceil(len(keys) / limit.batch)
+            spacing[src] = 0.0 if n <= limit.burst else max(1 / limit.rate, window * SPREAD / n)
+            next_at[src] = started
+        stats = {src: Throughput() for src in self.fetchers}
+        running = dict.fromkeys(self.fetchers, 0)
+        inflight: Dict[Future, Tuple[str, List[str], float]] = {}
+        results: Dict[str, dict] = {}
+
+        def advance(key: str):
+            """转给下一个候选源；没有了就放弃"""
+            step[key] += 1
+            if step[key] < len(candidates[key]):
+                pending[candidates[key][step[key]][0]].append(key)
+            else:
+                unresolved.discard(key)
+
+        pool = ThreadPoolExecutor(max_workers=sum(self.limits[src].concurrency for src in self.fetchers))
+        try:
+            while unresolved:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wake = deadline
+                for src, queue in pending.items():
+                    limit = self.limits[src]
+                    if queue and is_open(src):
+                        logging.warning("%s 已熔断，剩余 %d 个代码转给下一个源", src, len(queue))
+                        while queue:
+                            advance(queue.popleft())
+                        continue
+                    while queue and running[src] < limit.concurrency:
+                        if now < next_at[src]:
+                            wake = min(wake, next_at[src])
+                            break
+                        delay = self.buckets[src].try_acquire(now)
+                        if delay:
+                            wake = min(wake, now + delay)
+                            break
+                        keys = [queue.popleft() for _ in range(min(limit.batch, len(queue)))]
+                        codes = list(dict.fromkeys(candidates[k][step[k]][1] for k in keys))
+                        inflight[pool.submit(self.fetchers[src], codes)] = (src, keys, now)
+                        running[src] += 1
+                        next_at[src] = max(now, next_at[src]) + spacing[src]
+                        s = stats[src]
+                        s.requests += 1
+                        s.symbols += len(keys)
+                        if s.first is None:
+                            s.first = now
+
+                timeout = max(0.0, wake - time.monotonic())
+                if not inflight:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    src, keys, sent = inflight.pop(future)
+                    running[src] -= 1
+                    ended = time.monotonic()
+                    try:
+                        quotes, error = future.result(), None
+                    except Exception as e:
+                        quotes, error = {}, e
+                    got = 0
+                    for key in keys:
+                        quote = quotes.get(candidates[key][step[key]][1])
+                        if is_valid(quote):
+                            results[key] = quote
+                            unresolved.discard(key)
+                            got += 1
+                        else:
+                            advance(key)
+                    s = stats[src]
+                    s.ok += got
+                    s.last = ended
+                    if error is not None:
+                        s.failed += 1
+                        logging.warning("%s 批量获取 %d 个代码失败：%s", src, len(keys), error)
+                    if record is not None:
+                        reason = None if got else (f"{type(error).__name__}: {error}" if error else "未返回有效行情")
+                        record(src, bool(got), ended - sent, reason)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        late = {src for src, _, _ in inflight.values()}
+        if unresolved or late:
+            logging.warning("已到达 %.0fs 窗口，%d 个代码未取到，未返回的数据源：%s",
+                            window, len(unresolved), ",".join(sorted(late)) or "-")
+        if record is not None:
+            for src in late:
+                record(src, False, window, f"超过 {window:.0f}s 窗口未返回")
+        return results, stats
@@ -1,28 +1,95 @@
-import stealth_requests as requests
 from lxml import html, etree
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 import os
+import sys
 import json
 import time
-from typing import Dict, Optional, Tuple, List
-from dataclasses import dataclass
+import queue
+import atexit
+import asyncio
+import argparse
+import threading
+from typing import Dict, Optional, Tuple, List, Union
+from contextlib import closing
+from dataclasses import dataclass, field
+from decimal import Decimal
+from functools import lru_cache
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # python/tools，便于导入 common
+from common.http_cache import CACHE_DIR, ValidatorCache
+from common.http_client import CancelledError, RequestException, Response, RetryPolicy, close_stream, engine
+from common.json_store import atomic_write_json, load_json
+from common.notifier import Notifier
+from common.parse_cache import ParseCache
+from price_history import COMPARE_DAYS, PriceChange, PriceHistory, format_delta
+
 # ==================== 配置区域 ====================
 # 建议将敏感信息存储在环境变量中
 SERVERCHAN_SENDKEY = os.getenv("SERVERCHAN_SENDKEY", "YOUR_SENDKEY_HERE")  # 从环境变量读取
-OIL_PRICE_URL = "http://m.qiyoujiage.com/zhejiang.shtml"
+notifier = Notifier(SERVERCHAN_SENDKEY)
+
+# 省份（qiyoujiage / 东方财富 页面均以拼音命名）
+PROVINCES = {
+    "beijing": "北京", "tianjin": "天津", "hebei": "河北", "shanxi": "山西", "neimenggu": "内蒙古",
+    "liaoning": "辽宁", "jilin": "吉林", "heilongjiang": "黑龙江", "shanghai": "上海", "jiangsu": "江苏",
+    "zhejiang": "浙江", "anhui": "安徽", "fujian": "福建", "jiangxi": "江西", "shandong": "山东",
+    "henan": "河南", "hubei": "湖北", "hunan": "湖南", "guangdong": "广东", "guangxi": "广西",
+    "hainan": "海南", "chongqing": "重庆", "sichuan": "四川", "guizhou": "贵州", "yunnan": "云南",
+    "xizang": "西藏", "shaanxi": "陕西", "gansu": "甘肃", "qinghai": "青海", "ningxia": "宁夏",
+    "xinjiang": "新疆",
+}
+PROVINCE = os.getenv("PROVINCE", "zhejiang").strip().lower()  # 单省模式使用的省份
+
+OIL_PRICE_URL_TEMPLATE = os.getenv("OIL_PRICE_URL_TEMPLATE", "http://m.qiyoujiage.com/{province}.shtml")
 # 备用数据源（如果主源失败可尝试）
-BACKUP_SOURCES = [
-    "https://datapc.eastmoney.com/soft/cjsj/yjtz/zhejiang.html",  # 东方财富网[citation:6]
+BACKUP_SOURCE_TEMPLATES = [
+    "https://datapc.eastmoney.com/soft/cjsj/yjtz/{province}.html",  # 东方财富网[citation:6]
 ]
-SERVERCHAN_API = "https://sctapi.ftqq.com/{sendkey}.send"
+OIL_PRICE_URL = OIL_PRICE_URL_TEMPLATE.format(province=PROVINCE)
+BACKUP_SOURCES = [template.format(province=PROVINCE) for template in BACKUP_SOURCE_TEMPLATES]
+
+# 批量模式：同时进行中的省份请求上限
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# 流式读取页面：正文边下载边解析，价格与调整信息区块读完即断开连接；设为 0 则完整下载后再解析
+STREAM_FETCH = os.getenv("STREAM_FETCH", "1") != "0"
+
+# 条件请求缓存：页面未变化（304）时复用上次解析结果
+HTTP_CACHE_FILE = os.path.join(CACHE_DIR, "oil_price_http_cache.json")
+# 各数据源上次成功的提取策略及命中统计
+STRATEGY_CACHE_FILE = os.path.join(CACHE_DIR, "oil_price_strategies.json")
+# 价格历史（只在价格变化时追加），推送只在价格变化时发出
+PRICE_HISTORY_FILE = os.path.join(CACHE_DIR, "oil_price_history.sqlite3")
+# 各省最近公布的调价窗口，供调度进程安排轮询
+ADJUSTMENT_STATE_FILE = os.path.join(CACHE_DIR, "oil_adjustment.json")
+
+# 调价窗口生效（通常为某日 24 时）后密集轮询，直到页面价格更新或超出密集轮询时长
+DENSE_POLL_DELAY = timedelta(minutes=float(os.getenv("DENSE_POLL_DELAY", "5")))
+DENSE_POLL_INTERVAL = timedelta(minutes=float(os.getenv("DENSE_POLL_INTERVAL", "10")))
+DENSE_POLL_WINDOW = timedelta(hours=float(os.getenv("DENSE_POLL_WINDOW", "6")))
+
+# 对冲请求：主数据源发出 HEDGE_DELAY 秒后仍无有效结果时，并发请求备用源
+# 设为 0 表示主备源同时发出；留空则沿用"主源失败后再串行尝试备用源"
+_hedge_delay_env = os.getenv("HEDGE_DELAY", "").strip()
+HEDGE_DELAY = float(_hedge_delay_env) if _hedge_delay_env else None
+
+# 油价合理区间（元/升），用于结果校验
+PRICE_RANGE = (5.0, 10.0)
+REQUIRED_GRADES = ('92号汽油', '95号汽油')
+# 需要提取的油品，页面上出现但不在列表中的油品会被忽略
+FUEL_GRADES = ('89号汽油', '92号汽油', '95号汽油', '98号汽油',
+               '0号柴油', '-10号柴油', '-20号柴油', '-35号柴油')
+# 批量模式汇总表展示的油品列（元/升）
+BATCH_TABLE_GRADES = ('92号汽油', '95号汽油', '98号汽油', '0号柴油')
 
 # 数据提取配置 - XPath表达式
 XPATH_CONFIG = {
     "price_div": "/html/body/div[5]/div[2]/div[1]",
     "adjustment_div": "/html/body/div[5]/div[2]/div[2]",
+    # 价格与调整信息共同所在的区块：流式读取时该区块结束即停止下载
+    "stream_stop": "/html/body/div[5]/div[2]",
     # 备用选择器（应对网站结构变化）
     "backup_selectors": [
         "//div[contains(@class, 'price')]",
@@ -30,6 +97,45 @@ XPATH_CONFIG = {
     ]
 }
 
+# 下次调整信息的候选选择器（按优先级排列）
+ADJUSTMENT_SELECTORS = [
+    XPATH_CONFIG["adjustment_div"],
+    "//div[contains(text(), '调整') or contains(text(), '调价')]",
+    "//div[@class='adjustment' or contains(@id, 'adjust')]"
+]
+
+# ==================== 预编译表达式 ====================
+# XPath 与正则在模块加载时编译一次，避免每次调用重复解析表达式字符串
+PRICE_DIV_XPATH = etree.XPath(XPATH_CONFIG["price_div"])
+BACKUP_XPATHS = [(selector, etree.XPath(selector)) for selector in XPATH_CONFIG["backup_selectors"]]
+ADJUSTMENT_XPATHS = [etree.XPath(selector) for selector in ADJUSTMENT_SELECTORS]
+
+# 油价扫描器：以字面量"号"开头，正则引擎可用快速子串查找直接跳到候选位置，
+# 一次遍历即可找出"92号汽油 7.16元"、"0号柴油</dt><dd>6.82元(升)"等全部油品；
+# 标号取自"号"之前固定 4 个字符的后顾分组。价格后必须带单位
+FUEL_PRICE_RE = re.compile(
+    r'号(?<=([\s\S]{4})号)\s*+(汽油|柴油)?\D{0,40}+(\d{1,5}(?:\.\d{1,3})?)\s*+(元/升|元\(升\)|元/吨|元)'
+)
+# 少见写法（"汽油92 7.16元"、"92# 7.16元"），仅在主扫描一无所获时使用
+FUEL_PRICE_ALT_RE = re.compile(
+    r'(?:(汽油|柴油)\s*(-?\d{1,2})\s*[号#]?|(?<![\d.])(-?\d{1,2})\s*#\s*(汽油|柴油)?)'
+    r'\D{0,40}+(\d{1,5}(?:\.\d{1,3})?)\s*+(元/升|元\(升\)|元/吨|元)'
+)
+GRADE_NUMBER_RE = re.compile(r'(?:^|[^\d.])(-?\d{1,2})$')
+# 补在文本前，保证开头处的"号"也有 4 个字符可供后顾
+FUEL_SCAN_PADDING = ' ' * 4
+ADJUSTMENT_LINE_RE = re.compile(r'[\u4e00-\u9fff]|调整|调价|油价|时间|预计')
+# 调价窗口的结构化字段："2025年12月22日24时"、"目前预计下调油价95元/吨(0.07元/升-0.08元/升)"
+ADJUSTMENT_TIME_RE = re.compile(r'(?:(\d{4})\s*年\s*)?(\d{1,2})\s*月\s*(\d{1,2})\s*日\s*(\d{1,2})\s*(?:时|点|:00)')
+ADJUSTMENT_DIRECTION_RE = re.compile(r'上调|上涨|下调|下跌|搁浅|不作调整|不调整')
+ADJUSTMENT_PER_TON_RE = re.compile(r'(\d+(?:\.\d+)?)\s*元/吨')
+ADJUSTMENT_PER_LITER_RE = re.compile(r'(\d+(?:\.\d+)?)\s*元/升(?:\s*[-~～至到]\s*(\d+(?:\.\d+)?)\s*元/升)?')
+ADJUSTMENT_DIRECTIONS = {"上调": "上调", "上涨": "上调", "下调": "下调", "下跌": "下调",
+                         "搁浅": "搁浅", "不作调整": "搁浅", "不调整": "搁浅"}
+WHITESPACE_RE = re.compile(r'\s+')
+BRACKETS_RE = re.compile(r'[\[\]{}()<>]')
+JS_KEYWORDS = ('var ', 'function', 'document.', 'alert(', 'console.', 'getElement')
+
 # 设置日志记录
 logging.basicConfig(
     level=logging.INFO,
@@ -41,191 +147,477 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+http_cache = ValidatorCache(HTTP_CACHE_FILE)
+# 内容摘要 → 解析结果；修改解析逻辑时需要更新版本号
+parse_cache = ParseCache("oil_page_v3")
+
 # ==================== 数据类定义 ====================
+@dataclass
+class FetchAttempt:
+    """单个数据源的请求记录"""
+    source: str
+    url: str
+    elapsed: float  # 秒
+    status: str     # 有效 / 校验未通过 / 已取消
+
+@dataclass(frozen=True)
+class FuelPrice:
+    """单个油品价格：数值用 Decimal 保存，避免浮点误差改变显示的位数"""
+    value: Decimal
+    unit: str = "元/升"
+
+    def __str__(self) -> str:
+        return f"{self.value} {self.unit}"
+
+    def __float__(self) -> float:
+        return float(self.value)
+
+    def to_json(self) -> Dict[str, str]:
+        return {"value": str(self.value), "unit": self.unit}
+
+    @classmethod
+    def from_json(cls, data: Union[str, Dict[str, str]]) -> "FuelPrice":
+        # 兼容旧版缓存中只有价格字符串的记录
+        if isinstance(data, str):
+            return cls(Decimal(data))
+        return cls(Decimal(data["value"]), data.get("unit", "元/升"))
+
+@dataclass(frozen=True)
+class AdjustmentWindow:
+    """下次调价窗口：生效时刻及预计幅度（页面未给出的字段为 None）"""
+    effective_at: datetime                              # "24时"记为次日 0 点
+    direction: Optional[str] = None                     # 上调 / 下调 / 搁浅
+    per_ton: Optional[Decimal] = None                   # 元/吨
+    per_liter: Optional[Tuple[Decimal, Decimal]] = None  # 元/升，(下限, 上限)
+
+    def __str__(self) -> str:
+        text = f"{self.effective_at:%Y-%m-%d %H:%M} 生效"
+        if self.direction:
+            text += f"，预计{self.direction}"
+        if self.per_ton is not None:
+            text += f" {self.per_ton}元/吨"
+        if self.per_liter is not None:
+            low, high = self.per_liter
+            text += f"（{low}元/升）" if low == high else f"（{low}~{high}元/升）"
+        return text
+
+    def to_json(self) -> dict:
+        return {
+            "effective_at": self.effective_at.isoformat(timespec="minutes"),
+            "direction": self.direction,
+            "per_ton": None if self.per_ton is None else str(self.per_ton),
+            "per_liter": None if self.per_liter is None else [str(v) for v in self.per_liter],
+        }
+
+    @classmethod
+    def from_json(cls, data: Optional[dict]) -> Optional["AdjustmentWindow"]:
+        if not data:
+            return None
+        return cls(
+            effective_at=datetime.fromisoformat(data["effective_at"]),
+            direction=data.get("direction"),
+            per_ton=None if data.get("per_ton") is None else Decimal(data["per_ton"]),
+            per_liter=None if data.get("per_liter") is None else tuple(Decimal(v) for v in data["per_liter"]),
+        )
+
 @dataclass
 class OilPriceData:
     """油价数据容器类"""
     timestamp: str
-    prices: Dict[str, str]  # {油品类型: 价格}
+    prices: Dict[str, FuelPrice]  # {油品类型: 价格}
     adjustment_info: str
     source: str
     success: bool
     message: str = ""
+    attempts: List[FetchAttempt] = field(default_factory=list)  # 对冲模式下各数据源的耗时
+    province: str = PROVINCE  # 省份拼音
+    adjustment: Optional[AdjustmentWindow] = None  # 结构化的下次调价窗口
+    changes: List[PriceChange] = field(default_factory=list)  # 与价格历史相比发生变化的油品
+
+def province_name(province: str) -> str:
+    """省份拼音转中文名，未知省份原样返回"""
+    return PROVINCES.get(province, province)
+
+@dataclass
+class PageExtraction:
+    """单次解析页面得到的提取结果"""
+    prices: Dict[str, FuelPrice]
+    adjustment_info: str
+    adjustment: Optional[AdjustmentWindow] = None
+
+    def to_json(self) -> dict:
+        return {
+            "prices": prices_to_json(self.prices),
+            "adjustment_info": self.adjustment_info,
+            "adjustment": self.adjustment.to_json() if self.adjustment else None,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "PageExtraction":
+        return cls(prices=prices_from_json(data["prices"]), adjustment_info=data["adjustment_info"],
+                   adjustment=AdjustmentWindow.from_json(data.get("adjustment")))
+
+def prices_to_json(prices: Dict[str, FuelPrice]) -> Dict[str, Dict[str, str]]:
+    return {oil_type: price.to_json() for oil_type, price in prices.items()}
+
+def prices_from_json(data: dict) -> Dict[str, FuelPrice]:
+    return {oil_type: FuelPrice.from_json(price) for oil_type, price in data.items()}
+
+class StrategyCache:
+    """
+    按数据源URL记住上次成功的提取策略，下次优先尝试；同时累计各策略的
+    尝试次数、命中次数与耗时，用于观察网站结构漂移
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        data = load_json(path, {}, "策略缓存")
+        self.last_success: Dict[str, Dict[str, str]] = data.get("last_success", {})
+        self.stats: Dict[str, Dict[str, Dict[str, float]]] = data.get("stats", {})
+
+    def ordered(self, url: str, strategies: List[Tuple]) -> List[Tuple]:
+        """上次成功的策略排在最前，其余保持原有顺序"""
+        last = self.last_success.get(url, {}).get("strategy")
+        return sorted(strategies, key=lambda strategy: strategy[0] != last)
+
+    def record(self, url: str, name: str, hit: bool, elapsed: float):
+        with self._lock:
+            stat = self.stats.setdefault(url, {}).setdefault(name, {"attempts": 0, "hits": 0, "total_ms": 0.0})
+            stat["attempts"] += 1
+            stat["hits"] += int(hit)
+            stat["total_ms"] += elapsed * 1000
+
+    def remember(self, url: str, name: str, selector: str):
+        """记录成功的策略；与上次不同（页面结构发生变化）时立即落盘"""
+        entry = {"strategy": name, "selector": selector}
+        with self._lock:
+            changed = self.last_success.get(url) != entry
+            self.last_success[url] = entry
+        if changed:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            atomic_write_json(self.path, {"last_success": self.last_success, "stats": self.stats}, "策略缓存")
+
+    def report(self) -> str:
+        """各数据源、各策略的命中率与平均耗时"""
+        lines = []
+        for url, strategies in self.stats.items():
+            last = self.last_success.get(url, {}).get("strategy", "-")
+            lines.append(f"{url} (上次成功: {last})")
+            for name, stat in strategies.items():
+                hit_rate = stat["hits"] / stat["attempts"] * 100 if stat["attempts"] else 0
+                avg_ms = stat["total_ms"] / stat["attempts"] if stat["attempts"] else 0
+                lines.append(f"  {name}: 尝试 {stat['attempts']} 次, 命中率 {hit_rate:.1f}%, 平均 {avg_ms:.2f} ms")
+        return "\n".join(lines) if lines else "暂无策略统计"
+
+strategy_cache = StrategyCache(STRATEGY_CACHE_FILE)
+atexit.register(strategy_cache.save)  # 命中统计在进程退出时落盘
+
+class AdjustmentStore:
+    """
+    各省最近公布的调价窗口，以及窗口生效前最后一次看到的价格
+
+    价格与生效前不同即认为本轮调价已落地；调度进程据此只在窗口生效后密集轮询
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, dict] = load_json(path, {}, "调价窗口缓存")
+
+    def observe(self, data: OilPriceData, now: Optional[datetime] = None) -> Optional[str]:
+        """
+        记录一次抓取结果
+
+        返回: "changed"（窗口生效后价格已更新）、"waiting"（窗口已生效但价格尚未更新）或 None
+        """
+        if not data.success:
+            return None
+        now = now or datetime.now()
+        prices = prices_to_json(data.prices)
+        status = None
+        with self._lock:
+            entry = self.entries.get(data.province)
+            window = AdjustmentWindow.from_json(entry["window"]) if entry else None
+            if window and not entry["applied"] and now >= window.effective_at:
+                if prices != entry["prices"]:
+                    entry.update(applied=True, applied_at=now.isoformat(timespec="seconds"))
+                    status = "changed"
+                    logger.info(f"{province_name(data.province)}油价已按调价窗口更新: {window}")
+                elif window.direction != "搁浅":
+                    status = "waiting"
+
+            if data.adjustment and (window is None or data.adjustment.effective_at != window.effective_at):
+                self.entries[data.province] = {
+                    "window": data.adjustment.to_json(), "prices": prices, "applied": False,
+                }
+            elif window and not entry["applied"] and now < window.effective_at:
+                entry["prices"] = prices  # 生效前保持最新价格作为对比基准
+        return status
+
+    def next_poll(self, now: datetime) -> Optional[datetime]:
+        """尚未落地的调价窗口中，下一次应当轮询的时间；无需密集轮询时返回 None"""
+        polls = []
+        with self._lock:
+            for entry in self.entries.values():
+                window = AdjustmentWindow.from_json(entry["window"])
+                if entry["applied"] or window.direction == "搁浅":
+                    continue
+                start = window.effective_at + DENSE_POLL_DELAY
+                if now < start:
+                    polls.append(start)
+                elif now < window.effective_at + DENSE_POLL_WINDOW:
+                    polls.append(start + ((now - start) // DENSE_POLL_INTERVAL + 1) * DENSE_POLL_INTERVAL)
+        return min(polls, default=None)
+
+    def save(self):
+        with self._lock:
+            atomic_write_json(self.path, self.entries, "调价窗口缓存")
+
+adjustment_store = AdjustmentStore(ADJUSTMENT_STATE_FILE)
 
 # ==================== 核心函数 ====================
 
-def fetch_with_retry(url: str, max_retries: int = 3, timeout: int = 15) -> Optional[requests.response]:
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Referer': 'https://www.baidu.com/',
+}
+# TLS/HTTP2 指纹模拟的浏览器版本（curl_cffi impersonate）
+IMPERSONATE = "chrome136"
+
+def parse_html(html_content: Union[str, bytes]) -> Optional[html.HtmlElement]:
     """
-    带重试机制的请求函数
+    将页面解析为lxml文档树，解析失败时返回None
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Referer': 'https://www.baidu.com/',
-    }
-    
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"尝试请求 {url} (第 {attempt + 1} 次)")
-            # 使用StealthSession保持会话[citation:5][citation:10]
-            from stealth_requests import StealthSession
-            with StealthSession() as session:
-                response = session.get(url, headers=headers, timeout=timeout)
-                response.raise_for_status()
-                
-            # 自动检测编码
-            if response.encoding is None or response.encoding.lower() not in ['utf-8', 'gbk', 'gb2312']:
-                response.encoding = 'utf-8'
-                
-            logger.info(f"请求成功: 状态码 {response.status_code}")
-            return response
-            
-        except requests.exceptions.Timeout:
-            logger.warning(f"请求超时 (尝试 {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # 指数退避
-        except requests.exceptions.RequestException as e:
-            logger.error(f"请求失败: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(1)
-        except Exception as e:
-            logger.error(f"未知错误: {e}")
-            break
-    
-    return None
+    try:
+        return html.fromstring(html_content)
+    except Exception as e:
+        logger.error(f"解析HTML内容时出错: {e}")
+        return None
 
-def extract_prices_advanced(html_content: str, url: str) -> Dict[str, str]:
+# ---------- 价格提取策略：(名称, 选择器, 函数(tree, html_content) -> 价格字典) ----------
+
+def _extract_by_primary_xpath(tree: html.HtmlElement, html_content: str) -> Dict[str, FuelPrice]:
+    # 策略1: 使用原始XPath
+    price_div = PRICE_DIV_XPATH(tree)
+    if price_div:
+        return extract_specific_oil_prices(_element_text(price_div[0]))
+    return {}
+
+def _element_text(elem: html.HtmlElement) -> str:
+    # 与 text_content() 结果相同，但直接序列化为文本，省去一次 XPath 求值
+    return etree.tostring(elem, method="text", encoding=str, with_tail=False).strip()
+
+def _backup_selector_strategy(xpath: etree.XPath):
+    # 策略2: 备用选择器，检查前3个元素
+    def extract(tree: html.HtmlElement, html_content: str) -> Dict[str, FuelPrice]:
+        for elem in xpath(tree)[:3]:
+            extracted = extract_specific_oil_prices(_element_text(elem))
+            if extracted:
+                return extracted
+        return {}
+    return extract
+
+def _extract_by_global_regex(tree: html.HtmlElement, html_content: str) -> Dict[str, FuelPrice]:
+    # 策略3: 对整页原始HTML做一次正则扫描（作为最后手段）
+    return scan_fuel_prices(html_content)
+
+PRICE_STRATEGIES = [
+    ("主XPath", XPATH_CONFIG["price_div"], _extract_by_primary_xpath),
+    *[(f"备用选择器{i}", selector, _backup_selector_strategy(xpath))
+      for i, (selector, xpath) in enumerate(BACKUP_XPATHS, 1)],
+    ("全局正则", "FUEL_PRICE_RE", _extract_by_global_regex),
+]
+
+def extract_prices_advanced(html_content: str, url: str, tree: Optional[html.HtmlElement] = None) -> Dict[str, FuelPrice]:
     """
     高级油价提取函数，支持多种解析策略[citation:9]
+
+    传入已解析的 tree 时直接复用，避免重复解析；
+    按 url 记住上次成功的策略并优先尝试（见 StrategyCache）
     """
     prices = {}
     
     try:
-        tree = html.fromstring(html_content)
+        if tree is None:
+            tree = html.fromstring(html_content)
         
-        # 策略1: 使用原始XPath
-        price_div = tree.xpath(XPATH_CONFIG["price_div"])
-        if price_div:
-            price_text = price_div[0].text_content().strip()
-            extracted = extract_specific_oil_prices(price_text)
+        # 上次成功的策略优先，失败再走完整策略链
+        for name, selector, strategy in strategy_cache.ordered(url, PRICE_STRATEGIES):
+            started = time.perf_counter()
+            extracted = strategy(tree, html_content)
+            strategy_cache.record(url, name, bool(extracted), time.perf_counter() - started)
             if extracted:
                 prices.update(extracted)
-                logger.info("通过主XPath提取油价成功")
-        
-        # 策略2: 如果主策略失败，尝试备用选择器
-        if not prices:
-            for selector in XPATH_CONFIG["backup_selectors"]:
-                elements = tree.xpath(selector)
-                for elem in elements[:3]:  # 检查前3个元素
-                    text = elem.text_content().strip()
-                    extracted = extract_specific_oil_prices(text)
-                    if extracted:
-                        prices.update(extracted)
-                        logger.info(f"通过备用选择器 '{selector}' 提取油价成功")
-                        break
-                if prices:
-                    break
-        
-        # 策略3: 尝试正则表达式全局搜索（作为最后手段）
-        if not prices:
-            patterns = {
-                '92号汽油': r'92号汽油[^\d]*([\d\.]+)\s*元',
-                '95号汽油': r'95号汽油[^\d]*([\d\.]+)\s*元',
-                '汽油92': r'汽油92[^\d]*([\d\.]+)\s*元',
-                '汽油95': r'汽油95[^\d]*([\d\.]+)\s*元'
-            }
-            
-            for oil_type, pattern in patterns.items():
-                match = re.search(pattern, html_content)
-                if match:
-                    price = match.group(1)
-                    key = '92号汽油' if '92' in oil_type else '95号汽油'
-                    prices[key] = price
-                    logger.info(f"通过正则表达式提取 {key} 价格: {price}")
+                strategy_cache.remember(url, name, selector)
+                logger.info(f"通过{name} '{selector}' 提取油价成功")
+                break
         
         # 验证提取结果
-        for oil_type in ['92号汽油', '95号汽油']:
-            if oil_type in prices:
-                # 价格合理性检查（通常油价在5-10元之间）
-                try:
-                    price_val = float(prices[oil_type])
-                    if price_val < 5 or price_val > 10:
-                        logger.warning(f"{oil_type} 价格 {price_val} 元可能异常")
-                except ValueError:
-                    logger.warning(f"{oil_type} 价格格式异常: {prices[oil_type]}")
+        for oil_type, price in prices.items():
+            # 价格合理性检查（通常油价在5-10元/升之间）
+            if price.unit == "元/升" and not PRICE_RANGE[0] <= price.value <= PRICE_RANGE[1]:
+                logger.warning(f"{oil_type} 价格 {price} 可能异常")
     
     except Exception as e:
         logger.error(f"解析HTML内容时出错: {e}")
     
     return prices
 
-def extract_adjustment_info(html_content: str) -> str:
+def _adjustment_lines(tree: html.HtmlElement) -> List[str]:
+    """调整信息区块中清理后的文本行（去掉 JavaScript 与噪音）"""
+    # 尝试多个可能的选择器
+    adjustment_text = ""
+    for xpath in ADJUSTMENT_XPATHS:
+        elements = xpath(tree)
+        if elements:
+            adjustment_text = elements[0].text_content().strip()
+            if adjustment_text and len(adjustment_text) > 10:  # 有效内容检查
+                break
+
+    # 清理JavaScript和其他噪音[citation:9]
+    clean_lines = []
+    for line in adjustment_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # 过滤JavaScript代码
+        if any(js_keyword in line for js_keyword in JS_KEYWORDS):
+            continue
+
+        # 保留包含中文或重要关键词的行
+        if ADJUSTMENT_LINE_RE.search(line):
+            # 移除多余空格和特殊字符
+            line = WHITESPACE_RE.sub(' ', line)
+            line = BRACKETS_RE.sub('', line)
+            clean_lines.append(line)
+    return clean_lines
+
+def _format_adjustment_info(lines: List[str]) -> str:
+    # 取最重要的行（通常前2-3行）
+    result = ' '.join(lines[:3])
+    if result:
+        return result[:150]  # 限制长度
+    return "暂无下次调整信息或信息解析失败"
+
+def extract_adjustment_info(html_content: Union[str, bytes], tree: Optional[html.HtmlElement] = None) -> str:
     """
     提取下次调整信息，增强清理功能
+
+    传入已解析的 tree 时直接复用，避免重复解析
     """
     try:
-        tree = html.fromstring(html_content)
-        
-        # 尝试多个可能的选择器
-        adjustment_selectors = [
-            "/html/body/div[5]/div[2]/div[2]",
-            "//div[contains(text(), '调整') or contains(text(), '调价')]",
-            "//div[@class='adjustment' or contains(@id, 'adjust')]"
-        ]
-        
-        adjustment_text = ""
-        for selector in adjustment_selectors:
-            elements = tree.xpath(selector)
-            if elements:
-                adjustment_text = elements[0].text_content().strip()
-                if adjustment_text and len(adjustment_text) > 10:  # 有效内容检查
-                    break
-        
-        if adjustment_text:
-            # 清理JavaScript和其他噪音[citation:9]
-            lines = adjustment_text.split('\n')
-            clean_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # 过滤JavaScript代码
-                if any(js_keyword in line for js_keyword in 
-                      ['var ', 'function', 'document.', 'alert(', 'console.', 'getElement']):
-                    continue
-                    
-                # 保留包含中文或重要关键词的行
-                if re.search(r'[\u4e00-\u9fff]|调整|调价|油价|时间|预计', line):
-                    # 移除多余空格和特殊字符
-                    line = re.sub(r'\s+', ' ', line)
-                    line = re.sub(r'[\[\]{}()<>]', '', line)
-                    clean_lines.append(line)
-            
-            # 取最重要的行（通常前2-3行）
-            result = ' '.join(clean_lines[:3])
-            if result:
-                return result[:150]  # 限制长度
-        
-        return "暂无下次调整信息或信息解析失败"
-        
+        if tree is None:
+            tree = html.fromstring(html_content)
+        return _format_adjustment_info(_adjustment_lines(tree))
     except Exception as e:
         logger.error(f"提取调整信息时出错: {e}")
         return "调整信息提取失败"
 
-def fetch_oil_price_from_source(url: str, source_name: str = "主数据源") -> OilPriceData:
+def parse_adjustment_window(text: str, now: Optional[datetime] = None) -> Optional[AdjustmentWindow]:
     """
-    从指定数据源获取油价信息
+    从调整信息文本中解析生效时刻与预计幅度；找不到生效时刻时返回 None
+
+    页面省略年份时取离当前最近的年份（跨年时 12 月看到的"1月2日"属于下一年）
+    """
+    match = ADJUSTMENT_TIME_RE.search(text)
+    if not match:
+        return None
+    now = now or datetime.now()
+    year, month, day, hour = match.groups()
+    try:
+        effective_at = datetime(int(year) if year else now.year, int(month), int(day)) + timedelta(hours=int(hour))
+    except ValueError:
+        return None
+    if not year and effective_at < now - timedelta(days=180):
+        effective_at = effective_at.replace(year=effective_at.year + 1)
+
+    rest = text[match.end():]
+    direction = ADJUSTMENT_DIRECTION_RE.search(rest)
+    per_ton = ADJUSTMENT_PER_TON_RE.search(rest)
+    per_liter = ADJUSTMENT_PER_LITER_RE.search(rest)
+    return AdjustmentWindow(
+        effective_at=effective_at,
+        direction=ADJUSTMENT_DIRECTIONS[direction.group()] if direction else None,
+        per_ton=Decimal(per_ton.group(1)) if per_ton else None,
+        per_liter=(Decimal(per_liter.group(1)), Decimal(per_liter.group(2) or per_liter.group(1))) if per_liter else None,
+    )
+
+def extract_oil_page(html_content: str, url: str, tree: Optional[html.HtmlElement] = None) -> PageExtraction:
+    """
+    单次解析页面，同时提取油价与下次调整信息
+
+    整个页面只构建一次lxml文档树，价格与调整信息共用同一棵树（流式读取时传入已构建的 tree）
+    """
+    if tree is None:
+        tree = parse_html(html_content)
+    if tree is None:
+        return PageExtraction(prices={}, adjustment_info="调整信息提取失败")
+
+    try:
+        lines = _adjustment_lines(tree)
+        adjustment_info = _format_adjustment_info(lines)
+        adjustment = parse_adjustment_window(' '.join(lines))
+    except Exception as e:
+        logger.error(f"提取调整信息时出错: {e}")
+        adjustment_info, adjustment = "调整信息提取失败", None
+
+    return PageExtraction(
+        prices=extract_prices_advanced(html_content, url, tree=tree),
+        adjustment_info=adjustment_info,
+        adjustment=adjustment,
+    )
+
+class OilPageStream:
+    """
+    流式解析油价页面：正文块到达即喂给 HTMLPullParser，
+    价格与调整信息所在区块（XPATH_CONFIG["stream_stop"]）结束后 feed() 返回 True，调用方随即断开连接。
+    区块之后的内容不再下载；页面结构变化找不到该区块时读完整页，按原有策略链提取。
+    lxml 的解析器与文档树不能跨线程使用，feed() 与 extract() 须在同一线程（引擎线程）中调用
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.parser = etree.HTMLPullParser(events=("end",), tag="div", encoding=encoding)
+        self.parser.set_element_class_lookup(html.HtmlElementClassLookup())
+        self.chunks: List[bytes] = []
+        self.received = 0
+        self.complete = False  # 已读到目标区块
+
+    def feed(self, chunk: bytes) -> bool:
+        self.chunks.append(chunk)
+        self.received += len(chunk)
+        self.parser.feed(chunk)
+        for _, elem in self.parser.read_events():
+            if elem.getroottree().getpath(elem) == XPATH_CONFIG["stream_stop"]:
+                self.complete = True
+        return self.complete
+
+    def extract(self, url: str) -> PageExtraction:
+        """用已读到的部分提取（未闭合的标签由解析器补全）"""
+        try:
+            tree = self.parser.close()
+        except etree.LxmlError as e:
+            logger.error(f"解析HTML内容时出错: {e}")
+            tree = None
+        content = b"".join(self.chunks).decode(self.encoding, errors='ignore')
+        return extract_oil_page(content, url, tree=tree)
+
+def build_oil_price_data(response, url: str, source_name: str, timestamp: str,
+                         province: str = PROVINCE, extraction: Optional[PageExtraction] = None) -> OilPriceData:
+    """
+    将请求响应转换为 OilPriceData（响应为空表示请求失败；extraction 为流式读取时边下载边解析的结果）
     """
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
     try:
-        response = fetch_with_retry(url)
         if not response:
             return OilPriceData(
                 timestamp=timestamp,
@@ -233,22 +625,44 @@ def fetch_oil_price_from_source(url: str, source_name: str = "主数据源") ->
                 adjustment_info="",
                 source=source_name,
                 success=False,
-                message=f"无法从{source_name}获取数据"
+                message=f"无法从{source_name}获取数据",
+                province=province
             )
         
-        # 提取油价
-        prices = extract_prices_advanced(response.content.decode(response.encoding, errors='ignore'), url)
+        # 页面未变化：跳过下载与解析，直接复用上次结果
+        if http_cache.is_not_modified(response):
+            cached = PageExtraction.from_json(http_cache.payload(url))
+            logger.info(f"{source_name}页面未变化 (304)，复用上次解析结果")
+            return OilPriceData(
+                timestamp=timestamp,
+                prices=cached.prices,
+                adjustment_info=cached.adjustment_info,
+                source=source_name,
+                success=len(cached.prices) > 0,
+                message="数据获取成功（页面未变化）",
+                province=province,
+                adjustment=cached.adjustment
+            )
         
-        # 提取调整信息
-        adjustment_info = extract_adjustment_info(response.content)
+        if extraction is None:
+            # 单次解析，同时提取油价与调整信息；字节与上次相同时直接复用解析结果
+            extraction = PageExtraction.from_json(parse_cache.memoize(
+                response.content,
+                lambda: extract_oil_page(response.content.decode(response.encoding, errors='ignore'), url).to_json()
+            ))
+        prices = extraction.prices
+        if prices:
+            http_cache.store(url, response.headers, extraction.to_json())
         
         return OilPriceData(
             timestamp=timestamp,
             prices=prices,
-            adjustment_info=adjustment_info,
+            adjustment_info=extraction.adjustment_info,
             source=source_name,
             success=len(prices) > 0,
-            message="数据获取成功" if prices else "未找到油价数据"
+            message="数据获取成功" if prices else "未找到油价数据",
+            province=province,
+            adjustment=extraction.adjustment
         )
         
     except Exception as e:
@@ -259,9 +673,99 @@ def fetch_oil_price_from_source(url: str, source_name: str = "主数据源") ->
             adjustment_info="",
             source=source_name,
             success=False,
-            message=str(e)
+            message=str(e),
+            province=province
         )
 
+def _page_encoding(response: Response) -> str:
+    # 自动检测编码：只认 utf-8 / gbk / gb2312，其余按 utf-8
+    encoding = response.charset_encoding
+    return encoding if encoding and encoding.lower() in ['utf-8', 'gbk', 'gb2312'] else 'utf-8'
+
+async def fetch_with_retry_async(url: str, max_retries: int = 3, timeout: int = 15) -> Optional[Response]:
+    """
+    带重试机制的请求函数（共享 HTTP 引擎：连接复用、统一退避重试），完整下载正文
+    """
+    headers = {**REQUEST_HEADERS, **http_cache.conditional_headers(url)}
+    logger.info(f"请求 {url}")
+    try:
+        response = await engine.request("GET", url, headers=headers, timeout=timeout, impersonate=IMPERSONATE,
+                                        retry=RetryPolicy(attempts=max_retries))
+        response.raise_for_status()
+    except RequestException as e:
+        logger.warning(f"请求 {url} 失败: {e}")
+        return None
+    response.encoding = _page_encoding(response)
+    logger.info(f"请求成功: 状态码 {response.status_code}")
+    return response
+
+def fetch_with_retry(url: str, max_retries: int = 3, timeout: int = 15,
+                     cancel_event: Optional[threading.Event] = None) -> Optional[Response]:
+    """
+    同步版 fetch_with_retry_async，在共享 HTTP 引擎中执行
+
+    cancel_event 被置位后中止进行中的请求与后续重试，返回 None
+    """
+    try:
+        return engine.run(fetch_with_retry_async(url, max_retries, timeout), cancel_event)
+    except CancelledError:
+        logger.info(f"请求已取消: {url}")
+        return None
+
+async def fetch_page_async(url: str, max_retries: int = 3,
+                           timeout: int = 15) -> Tuple[Optional[Response], Optional[PageExtraction]]:
+    """
+    请求页面；STREAM_FETCH 开启时流式读取，边下载边解析，价格与调整信息区块到达后立即断开连接
+
+    返回 (响应, 流式解析的提取结果)：请求失败时响应为 None；未开启流式或页面未变化（304）时提取结果为 None，
+    由 build_oil_price_data 解析完整正文或复用缓存。重试只发生在收到正文之前，读取正文中途出错按失败处理
+    """
+    if not STREAM_FETCH:
+        return await fetch_with_retry_async(url, max_retries, timeout), None
+
+    headers = {**REQUEST_HEADERS, **http_cache.conditional_headers(url)}
+    logger.info(f"请求 {url}（流式）")
+    try:
+        response = await engine.request("GET", url, stream=True, headers=headers, timeout=timeout,
+                                        impersonate=IMPERSONATE, retry=RetryPolicy(attempts=max_retries))
+    except RequestException as e:
+        logger.warning(f"请求 {url} 失败: {e}")
+        return None, None
+    try:
+        response.raise_for_status()
+        if http_cache.is_not_modified(response):
+            return response, None
+        page = OilPageStream(_page_encoding(response))
+        async for chunk in response.aiter_content():
+            if page.feed(chunk):
+                break
+    except RequestException as e:
+        logger.warning(f"请求 {url} 失败: {e}")
+        return None, None
+    finally:
+        await close_stream(response)
+    logger.info(f"请求成功: 状态码 {response.status_code}，读取 {page.received} 字节"
+                + ("（已读到价格区块，提前断开）" if page.complete else ""))
+    return response, page.extract(url)
+
+def fetch_oil_price_from_source(url: str, source_name: str = "主数据源",
+                                cancel_event: Optional[threading.Event] = None) -> OilPriceData:
+    """
+    从指定数据源获取油价信息
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    try:
+        # 在共享 HTTP 引擎中请求；cancel_event 被置位后立即中止进行中的请求与后续重试（对冲模式取消落后的数据源）
+        response, extraction = engine.run(fetch_page_async(url), cancel_event)
+    except CancelledError:
+        logger.info(f"请求已取消: {url}")
+        response, extraction = None, None
+    except Exception as e:
+        logger.error(f"从{source_name}获取油价时出错: {e}")
+        response, extraction = None, None
+    return build_oil_price_data(response, url, source_name, timestamp, extraction=extraction)
+
 def fetch_oil_price_with_fallback() -> OilPriceData:
     """
     获取油价信息，支持备用数据源[citation:7]
@@ -280,31 +784,261 @@ def fetch_oil_price_with_fallback() -> OilPriceData:
     
     return main_data
 
+# ==================== 批量模式 ====================
+
+async def fetch_province_async(semaphore: asyncio.Semaphore, province: str) -> OilPriceData:
+    """
+    获取单个省份油价：主源失败或数据不全时依次尝试备用源
+    """
+    urls = [(OIL_PRICE_URL_TEMPLATE.format(province=province), "主数据源")] + [
+        (template.format(province=province), f"备用源{i}")
+        for i, template in enumerate(BACKUP_SOURCE_TEMPLATES, 1)
+    ]
+    async with semaphore:
+        data = None
+        for url, source_name in urls:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            response, extraction = await fetch_page_async(url)
+            candidate = build_oil_price_data(response, url, source_name, timestamp, province=province,
+                                             extraction=extraction)
+            if data is None or (candidate.success and not data.success):
+                data = candidate
+            if candidate.success and len(candidate.prices) >= 2:
+                return candidate
+        return data
+
+async def fetch_provinces_async(provinces: List[str], concurrency: int = BATCH_CONCURRENCY) -> List[OilPriceData]:
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    return list(await asyncio.gather(*(fetch_province_async(semaphore, province) for province in provinces)))
+
+def fetch_provinces(provinces: List[str], concurrency: int = BATCH_CONCURRENCY) -> List[OilPriceData]:
+    """
+    批量获取多个省份油价：在共享 HTTP 引擎中运行，各省请求复用同一主机的少数几条连接，
+    最多 concurrency 个省份并发
+    """
+    return engine.run(fetch_provinces_async(provinces, concurrency))
+
+def format_batch_message(results: List[OilPriceData], elapsed: float) -> Tuple[str, str]:
+    """
+    将多省结果汇总为一张表格
+
+    返回: (标题, 详细内容)
+    """
+    succeeded = [data for data in results if data.success]
+    moved = [data for data in succeeded if any(change.previous is not None for change in data.changes)]
+    if moved:
+        title = f"全国油价变动: {len(moved)}/{len(results)} 个省份"
+    else:
+        title = f"全国油价更新: {len(succeeded)}/{len(results)} 个省份"
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    desp_lines = [
+        "## ⛽ 各省最新油价信息",
+        f"**抓取时间:** {timestamp}",
+        f"**总耗时:** {elapsed:.2f}s",
+        "",
+        f"| 省份 | {' | '.join(BATCH_TABLE_GRADES)} | 数据来源 |",
+        "| --- " * (len(BATCH_TABLE_GRADES) + 2) + "|",
+    ]
+    for data in results:
+        if data.success:
+            deltas = {change.grade: change.delta for change in data.changes if change.previous is not None}
+            cells = [(f"{data.prices[oil_type].value} {format_delta(deltas[oil_type])}" if oil_type in deltas
+                      else str(data.prices[oil_type].value)) if oil_type in data.prices else '-'
+                     for oil_type in BATCH_TABLE_GRADES]
+        else:
+            cells = ['❌'] * len(BATCH_TABLE_GRADES)
+        status = data.source if data.success else data.message
+        desp_lines.append(f"| {province_name(data.province)} | {' | '.join(cells)} | {status} |")
+
+    adjustment_info = next((data.adjustment_info for data in succeeded if data.adjustment_info), "")
+    if adjustment_info:
+        desp_lines.append("")
+        desp_lines.append("### 📅 下次调整提醒")
+        desp_lines.append(adjustment_info)
+
+    desp_lines.append("")
+    desp_lines.append("---")
+    desp_lines.append("*数据仅供参考，实际油价以加油站为准*")
+
+    return title, "\n".join(desp_lines)
+
+def run_batch(provinces: List[str], concurrency: int = BATCH_CONCURRENCY):
+    """
+    批量模式主流程：并发抓取、汇总输出、一次推送
+    """
+    logger.info(f"批量抓取 {len(provinces)} 个省份油价 (并发 {concurrency})")
+    started = time.perf_counter()
+    results = fetch_provinces(provinces, concurrency)
+    elapsed = time.perf_counter() - started
+
+    with closing(PriceHistory(PRICE_HISTORY_FILE)) as history:
+        for data in results:
+            if data.success:
+                data.changes = record_price_history(history, data)
+
+    title, message = format_batch_message(results, elapsed)
+
+    print("\n" + "=" * 60)
+    for data in results:
+        if data.success:
+            prices = ", ".join(f"{oil_type} {price}" for oil_type, price in data.prices.items())
+            print(f"  {province_name(data.province)}: {prices} ({data.source})")
+        else:
+            print(f"  {province_name(data.province)}: 失败 - {data.message}")
+    print("-" * 60)
+    print(f"成功 {sum(data.success for data in results)}/{len(results)}，总耗时 {elapsed:.2f}s")
+    print("=" * 60)
+
+    statuses = [adjustment_store.observe(data) for data in results]
+    adjustment_store.save()
+
+    if any(data.success for data in results) and not any(data.changes for data in results):
+        print("💤 各省油价与上次相同，不推送" + ("（调价窗口已生效，页面价格尚未更新）" if "waiting" in statuses else ""))
+    elif any(data.success for data in results):
+        if send_to_serverchan(title, message):
+            print("✅ 油价信息已加入微信推送队列")
+        else:
+            print("❌ 微信推送入队失败，请检查ServerChan配置")
+    else:
+        print("⚠️  数据获取失败，未执行微信推送")
+
+    logger.info("批量抓取完成")
+    return results
+
+def is_valid_price_data(data: OilPriceData) -> bool:
+    """
+    校验结果：92号与95号汽油价格均存在且处于合理区间
+    """
+    if not data.success:
+        return False
+    for oil_type in REQUIRED_GRADES:
+        try:
+            price = data.prices[oil_type]
+        except KeyError:
+            return False
+        if price.unit != "元/升" or not PRICE_RANGE[0] <= price.value <= PRICE_RANGE[1]:
+            return False
+    return True
+
+def _hedged_worker(url: str, source_name: str, cancel_event: threading.Event, results: queue.Queue):
+    started = time.perf_counter()
+    data = fetch_oil_price_from_source(url, source_name, cancel_event=cancel_event)
+    results.put((source_name, url, data, time.perf_counter() - started))
+
+def fetch_oil_price_hedged(hedge_delay: float = 0.0) -> OilPriceData:
+    """
+    对冲模式获取油价：主数据源先发出，hedge_delay 秒内无有效结果（或提前失败）
+    即并发请求全部备用源，采用第一个通过校验的结果并取消其余请求
+
+    返回的 OilPriceData.attempts 记录各数据源耗时与状态
+    """
+    sources = [(OIL_PRICE_URL, "主数据源")] + [
+        (url, f"备用源{i}") for i, url in enumerate(BACKUP_SOURCES, 1)
+    ]
+    cancel_event = threading.Event()
+    results: queue.Queue = queue.Queue()
+    started: Dict[str, Tuple[str, float]] = {}
+
+    def launch(url: str, source_name: str):
+        started[source_name] = (url, time.perf_counter())
+        # 守护线程：被取消的落后请求不会阻塞进程退出
+        threading.Thread(target=_hedged_worker, args=(url, source_name, cancel_event, results),
+                         daemon=True).start()
+
+    launch(*sources[0])
+    hedge_at = time.perf_counter() + max(hedge_delay, 0.0)
+    backups_launched = False
+    if hedge_delay <= 0:
+        for url, source_name in sources[1:]:
+            launch(url, source_name)
+        backups_launched = True
+
+    attempts: List[FetchAttempt] = []
+    finished: Dict[str, OilPriceData] = {}
+    winner: Optional[OilPriceData] = None
+
+    while len(finished) < len(started) or not backups_launched:
+        timeout = None if backups_launched else max(hedge_at - time.perf_counter(), 0.0)
+        try:
+            source_name, url, data, elapsed = results.get(timeout=timeout)
+        except queue.Empty:
+            logger.info(f"主数据源 {hedge_delay:.1f}s 内未返回，启动备用源")
+            for backup_url, backup_name in sources[1:]:
+                launch(backup_url, backup_name)
+            backups_launched = True
+            continue
+
+        finished[source_name] = data
+        valid = is_valid_price_data(data)
+        attempts.append(FetchAttempt(source_name, url, elapsed, "有效" if valid else "校验未通过"))
+        if valid:
+            winner = data
+            break
+        if not backups_launched:
+            logger.warning(f"{source_name}未返回有效数据，立即启动备用源")
+            for backup_url, backup_name in sources[1:]:
+                launch(backup_url, backup_name)
+            backups_launched = True
+
+    # 取消仍在进行中的请求
+    cancel_event.set()
+    now = time.perf_counter()
+    for source_name, (url, t0) in started.items():
+        if source_name not in finished:
+            attempts.append(FetchAttempt(source_name, url, now - t0, "已取消"))
+
+    if winner is None:
+        # 没有结果通过校验时与串行回退保持一致：主源数据不全则取第一个成功的备用源
+        winner = finished["主数据源"]
+        if not winner.success or len(winner.prices) < 2:
+            for _, source_name in sources[1:]:
+                if finished[source_name].success:
+                    winner = finished[source_name]
+                    break
+
+    for attempt in attempts:
+        logger.info(f"{attempt.source}: {attempt.status}，耗时 {attempt.elapsed:.2f}s")
+    logger.info(f"采用数据源: {winner.source}")
+
+    winner.attempts = attempts
+    return winner
+
 def format_oil_price_message(data: OilPriceData) -> Tuple[str, str]:
     """
     格式化油价信息为推送消息[citation:3]
     
     返回: (标题, 详细内容)
     """
+    name = province_name(data.province)
+    
     # 基础标题
-    if data.success and data.prices:
+    moved = [change for change in data.changes if change.previous is not None]
+    if data.success and moved:
+        title = f"{name}油价变动: " + ", ".join(f"{change.grade}{format_delta(change.delta)}" for change in moved)
+    elif data.success and data.prices:
         price_types = list(data.prices.keys())
-        title = f"浙江油价更新: {', '.join(price_types)}"
+        title = f"{name}油价更新: {', '.join(price_types)}"
     else:
         title = "油价获取通知"
     
     # 详细内容 (Markdown格式)
     desp_lines = []
     
-    desp_lines.append(f"## ⛽ 浙江最新油价信息")
+    desp_lines.append(f"## ⛽ {name}最新油价信息")
     desp_lines.append(f"**抓取时间:** {data.timestamp}")
     desp_lines.append(f"**数据来源:** {data.source}")
     desp_lines.append("")
     
     if data.prices:
         desp_lines.append("### 当前油价")
+        changes = {change.grade: change for change in data.changes}
         for oil_type, price in data.prices.items():
-            desp_lines.append(f"- **{oil_type}:** `{price} 元/升`")
+            line = f"- **{oil_type}:** `{price}`"
+            change = changes.get(oil_type)
+            if change is not None and change.previous is not None:
+                line += f" 较上次 {format_delta(change.delta)}，较{COMPARE_DAYS}天前 {format_delta(change.delta_month)}"
+            desp_lines.append(line)
     else:
         desp_lines.append("### ❌ 油价获取失败")
         desp_lines.append(f"错误信息: {data.message}")
@@ -314,6 +1048,14 @@ def format_oil_price_message(data: OilPriceData) -> Tuple[str, str]:
     if data.adjustment_info:
         desp_lines.append("### 📅 下次调整提醒")
         desp_lines.append(f"{data.adjustment_info}")
+        if data.adjustment:
+            desp_lines.append(f"- 调价窗口: `{data.adjustment}`")
+    
+    if data.attempts:
+        desp_lines.append("")
+        desp_lines.append("### ⏱ 数据源耗时")
+        for attempt in data.attempts:
+            desp_lines.append(f"- {attempt.source}: {attempt.status} `{attempt.elapsed:.2f}s`")
     
     desp_lines.append("")
     desp_lines.append("---")
@@ -321,99 +1063,106 @@ def format_oil_price_message(data: OilPriceData) -> Tuple[str, str]:
     
     return title, "\n".join(desp_lines)
 
-def send_to_serverchan(title: str, desp: str, sendkey: str = None) -> bool:
+def record_price_history(history: PriceHistory, data: OilPriceData) -> List[PriceChange]:
+    """把成功抓取的价格写入历史（只记录 元/升 的价格），返回发生变化的油品"""
+    when = datetime.strptime(data.timestamp, '%Y-%m-%d %H:%M:%S')
+    prices = {oil_type: price.value for oil_type, price in data.prices.items() if price.unit == "元/升"}
+    return history.record(data.province, prices, when)
+
+def send_to_serverchan(title: str, desp: str) -> bool:
     """
-    通过ServerChan发送消息到微信[citation:3][citation:8]
-    
-    返回: 是否成功
+    把消息加入推送发件箱，由后台线程合并、限流后推送到微信，不阻塞抓取流程
+
+    返回: 是否已入队
     """
-    if sendkey is None:
-        sendkey = SERVERCHAN_SENDKEY
-    
-    if sendkey == "YOUR_SENDKEY_HERE":
-        logger.error("请设置ServerChan SendKey！")
-        logger.info("请到 https://sct.ftqq.com/ 注册获取SendKey")
-        return False
-    
-    api_url = SERVERCHAN_API.format(sendkey=sendkey)
-    
-    try:
-        data = {
-            "text": title[:100],  # 标题限制长度
-            "desp": desp
-        }
-        
-        logger.info("正在发送消息到ServerChan...")
-        response = requests.post(api_url, data=data, timeout=10)
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get("code") == 0 or "success" in response.text.lower():
-                logger.info("ServerChan消息发送成功")
-                return True
-            else:
-                logger.error(f"ServerChan返回错误: {result}")
-                return False
-        else:
-            logger.error(f"ServerChan请求失败: 状态码 {response.status_code}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"发送ServerChan请求时出错: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"处理ServerChan推送时出错: {e}")
-        return False
+    return notifier.send(title, desp)
+
+@lru_cache(maxsize=512)
+def _parse_fuel_match(number_text: str, kind: str, price: str, unit: str) -> Optional[Tuple[str, FuelPrice]]:
+    """
+    扫描命中 -> (油品, 价格)，油品不在 FUEL_GRADES 中时返回 None
+
+    同一页面、不同省份之间命中文本高度重复，FuelPrice 不可变，可直接缓存复用
+    """
+    match = GRADE_NUMBER_RE.search(number_text)
+    if not match:
+        return None
+    number = int(match.group(1))
+    # "92号"这类省略油品名的写法：0号及负号标号视为柴油，其余视为汽油
+    oil_type = f"{number}号{kind or ('柴油' if number <= 0 else '汽油')}"
+    if oil_type not in FUEL_GRADES:
+        return None
+    return oil_type, FuelPrice(Decimal(price), "元/吨" if unit == "元/吨" else "元/升")
 
-def extract_specific_oil_prices(text: str) -> Dict[str, str]:
+def scan_fuel_prices(text: str) -> Dict[str, FuelPrice]:
     """
-    精确提取92号和95号汽油价格（原函数优化版）
+    单次扫描文本，提取 FUEL_GRADES 中所有油品的价格，每个油品取第一次出现的价格
     """
+    matches = FUEL_PRICE_RE.findall(FUEL_SCAN_PADDING + text)
+    if not matches:
+        matches = [(num_a or num_b, kind_a or kind_b, price, unit)
+                   for kind_a, num_a, num_b, kind_b, price, unit in FUEL_PRICE_ALT_RE.findall(text)]
+
     prices = {}
-    
-    # 改进的正则表达式模式
-    patterns = {
-        '92号汽油': [
-            r'92号汽油[^\d]*([\d\.]+)\s*[元\(]',
-            r'92[^\d]*([\d\.]+)\s*元',
-            r'汽油92[^\d]*([\d\.]+)'
-        ],
-        '95号汽油': [
-            r'95号汽油[^\d]*([\d\.]+)\s*[元\(]',
-            r'95[^\d]*([\d\.]+)\s*元',
-            r'汽油95[^\d]*([\d\.]+)'
-        ]
-    }
-    
-    for oil_type, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            match = re.search(pattern, text)
-            if match:
-                price = match.group(1)
-                # 价格验证
-                if re.match(r'^\d+\.?\d*$', price):
-                    prices[oil_type] = price
-                    break
-    
+    for match in matches:
+        parsed = _parse_fuel_match(*match)
+        if parsed is not None and parsed[0] not in prices:
+            prices[parsed[0]] = parsed[1]
     return prices
 
+def extract_specific_oil_prices(text: str) -> Dict[str, FuelPrice]:
+    """
+    精确提取价格区块文本中的各油品价格
+    """
+    return scan_fuel_prices(text)
+
 # ==================== 主函数 ====================
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="油价抓取并推送到微信")
+    parser.add_argument("--provinces", help="批量模式：逗号分隔的省份拼音，如 zhejiang,jiangsu")
+    parser.add_argument("--all", action="store_true", help="批量模式：抓取全部省份")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="批量模式并发数")
+    parser.add_argument("--strategy-stats", action="store_true", help="输出各数据源提取策略的命中率与耗时后退出")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
     """
     主函数：获取油价并推送到微信[citation:8]
+
+    指定 --provinces 或 --all 时进入批量模式
     """
+    args = parse_args(argv)
+    if args.strategy_stats:
+        print(strategy_cache.report())
+        return
+    
+    if args.all or args.provinces:
+        provinces = list(PROVINCES) if args.all else [
+            p.strip().lower() for p in args.provinces.split(",") if p.strip()
+        ]
+        run_batch(provinces, args.concurrency)
+        return
+
     logger.info("=" * 60)
-    logger.info("开始抓取浙江油价信息...")
+    logger.info(f"开始抓取{province_name(PROVINCE)}油价信息...")
     logger.info("=" * 60)
     
     # 1. 获取油价数据
-    oil_data = fetch_oil_price_with_fallback()
+    if HEDGE_DELAY is not None:
+        oil_data = fetch_oil_price_hedged(HEDGE_DELAY)
+    else:
+        oil_data = fetch_oil_price_with_fallback()
     
-    # 2. 格式化消息
+    # 2. 写入价格历史，得到相对上次的变化
+    if oil_data.success:
+        with closing(PriceHistory(PRICE_HISTORY_FILE)) as history:
+            oil_data.changes = record_price_history(history, oil_data)
+
+    # 3. 格式化消息
     title, message = format_oil_price_message(oil_data)
     
-    # 3. 控制台输出
+    # 4. 控制台输出
     print("\n" + "=" * 60)
     print(f"抓取时间: {oil_data.timestamp}")
     print(f"数据来源: {oil_data.source}")
@@ -421,26 +1170,39 @@ def main():
     print("-" * 60)
     
     if oil_data.prices:
-        print("浙江最新油价:")
+        print(f"{province_name(PROVINCE)}最新油价:")
         for oil_type, price in oil_data.prices.items():
-            print(f"  {oil_type}: {price}元/升")
+            print(f"  {oil_type}: {price}")
     else:
         print(f"错误: {oil_data.message}")
     
     if oil_data.adjustment_info:
         print("-" * 60)
         print(f"下次油价调整提醒:\n{oil_data.adjustment_info}")
+        if oil_data.adjustment:
+            print(f"调价窗口: {oil_data.adjustment}")
+    
+    if oil_data.attempts:
+        print("-" * 60)
+        for attempt in oil_data.attempts:
+            print(f"  {attempt.source}: {attempt.status} ({attempt.elapsed:.2f}s)")
     
     print("=" * 60)
     
-    # 4. 推送到微信（仅在成功获取油价或需要通知失败时推送）
-    if oil_data.success or ("失败" in oil_data.message):
+    # 记录调价窗口，供调度进程安排窗口生效后的密集轮询
+    adjustment_status = adjustment_store.observe(oil_data)
+    adjustment_store.save()
+
+    # 5. 推送到微信（仅在油价变化或需要通知失败时推送）
+    if oil_data.success and not oil_data.changes:
+        print("💤 油价与上次相同，不推送" + ("（调价窗口已生效，页面价格尚未更新）" if adjustment_status == "waiting" else ""))
+    elif oil_data.success or ("失败" in oil_data.message):
         push_success = send_to_serverchan(title, message)
         
         if push_success:
-            print("✅ 油价信息已推送到微信")
+            print("✅ 油价信息已加入微信推送队列")
         else:
-            print("❌ 微信推送失败，请检查ServerChan配置")
+            print("❌ 微信推送入队失败，请检查ServerChan配置")
     else:
         print("⚠️  数据获取失败，未执行微信推送")
     
@@ -448,7 +1210,7 @@ def main():
 
 if __name__ == "__main__":
     # 配置检查
-    if SERVERCHAN_SENDKEY == "YOUR_SENDKEY_HERE":
+    if not notifier.configured:
         print("⚠️  警告: 请先配置ServerChan SendKey")
         print("1. 访问 https://sct.ftqq.com/ 注册并获取SendKey")
         print("2. 将SendKey设置为环境变量 SERVERCHAN_SENDKEY")
@@ -0,0 +1,156 @@
+"""
+油价历史本地存储（SQLite）
+
+只追加写入：某省某油品的价格与上一条记录不同时才新增一行，每行表示从该时刻起生效的价格，
+因此"某时刻的价格"就是该时刻之前最近的一行。一行只有 省份编号、油品编号、时间戳（秒）、价格（0.001 元/升）
+四个整数（省份、油品名称另存对照表），主键 (province, grade, ts) 即聚簇索引（WITHOUT ROWID），
+按省份+油品的区间查询只读连续的页；另建 (grade, ts) 索引用于跨省份查询同一油品。
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PRICE_SCALE = 1000  # 整数存储，单位 0.001 元/升
+COMPARE_DAYS = 30   # 推送中"较 30 天前"的对比跨度
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE     -- 省份拼音或油品名称
+);
+CREATE TABLE IF NOT EXISTS prices (
+    province INTEGER NOT NULL,  -- names.id
+    grade    INTEGER NOT NULL,  -- names.id
+    ts       INTEGER NOT NULL,  -- 生效（首次观察到）时刻，Unix 秒
+    price    INTEGER NOT NULL,  -- 0.001 元/升
+    PRIMARY KEY (province, grade, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_by_grade ON prices (grade, ts);
+"""
+
+Row = Tuple[str, str, int, Decimal]
+
+
+def to_units(value: Decimal) -> int:
+    return int((value * PRICE_SCALE).to_integral_value())
+
+
+@lru_cache(maxsize=None)
+def from_units(units: int) -> Decimal:
+    # 价格取值只有几千种，缓存后批量读取历史时不必逐行构造 Decimal
+    return Decimal(units) / PRICE_SCALE
+
+
+def format_delta(delta: Optional[Decimal]) -> str:
+    """涨跌显示为 ↑0.07 / ↓0.07 / 持平；无历史时为 -"""
+    if delta is None:
+        return "-"
+    if delta == 0:
+        return "持平"
+    return f"{'↑' if delta > 0 else '↓'}{abs(delta).normalize():f}"
+
+
+@dataclass(frozen=True)
+class PriceChange:
+    """本次记录的新价格，以及上一条价格、COMPARE_DAYS 天前的价格（无历史时为 None）"""
+    grade: str
+    price: Decimal
+    previous: Optional[Decimal]
+    month_ago: Optional[Decimal]
+
+    @property
+    def delta(self) -> Optional[Decimal]:
+        return None if self.previous is None else self.price - self.previous
+
+    @property
+    def delta_month(self) -> Optional[Decimal]:
+        return None if self.month_ago is None else self.price - self.month_ago
+
+
+class PriceHistory:
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.executescript(SCHEMA)
+        self.ids: Dict[str, int] = dict(self.conn.execute("SELECT name, id FROM names"))
+        self.names: Dict[int, str] = {i: name for name, i in self.ids.items()}
+
+    def _id(self, name: str, create: bool = False) -> Optional[int]:
+        """省份/油品名称对应的编号；create 为 False 且不存在时返回 None"""
+        if name not in self.ids and create:
+            self.conn.execute("INSERT OR IGNORE INTO names (name) VALUES (?)", (name,))
+            (i,) = self.conn.execute("SELECT id FROM names WHERE name = ?", (name,)).fetchone()
+            self.ids[name], self.names[i] = i, name
+        return self.ids.get(name)
+
+    def close(self):
+        self.conn.close()
+
+    def price_at(self, province: str, grade: str, when: datetime) -> Optional[Decimal]:
+        """when 时刻生效的价格（该时刻之前最近的一条记录）"""
+        row = self.conn.execute(
+            "SELECT price FROM prices WHERE province = ? AND grade = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+            (self._id(province), self._id(grade), int(when.timestamp())),
+        ).fetchone()
+        return None if row is None else from_units(row[0])
+
+    def latest(self, province: str, grade: str) -> Optional[Tuple[datetime, Decimal]]:
+        row = self.conn.execute(
+            "SELECT ts, price FROM prices WHERE province = ? AND grade = ? ORDER BY ts DESC LIMIT 1",
+            (self._id(province), self._id(grade)),
+        ).fetchone()
+        return None if row is None else (datetime.fromtimestamp(row[0]), from_units(row[1]))
+
+    def record(self, province: str, prices: Dict[str, Decimal], when: datetime) -> List[PriceChange]:
+        """
+        写入一次观察结果，只有与上一条不同的油品才追加
+
+        返回: 价格发生变化（或首次出现）的油品
+        """
+        changes = []
+        ts = int(when.timestamp())
+        with self.conn:
+            for grade, price in prices.items():
+                last = self.latest(province, grade)
+                if last is not None and last[1] == price:
+                    continue
+                month_ago = self.price_at(province, grade, when - timedelta(days=COMPARE_DAYS))
+                self.conn.execute("INSERT OR REPLACE INTO prices (province, grade, ts, price) VALUES (?, ?, ?, ?)",
+                                  (self._id(province, True), self._id(grade, True), ts, to_units(price)))
+                changes.append(PriceChange(grade, price, None if last is None else last[1], month_ago))
+        return changes
+
+    def series(self, province: Optional[str] = None, grade: Optional[str] = None,
+               start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Row]:
+        """按条件取历史记录（按省份、油品、时间排序）；条件均可省略"""
+        clauses, params = [], []
+        for column, value in (("province", province), ("grade", grade)):
+            if value is not None:
+                if self._id(value) is None:
+                    return []
+                clauses.append(f"{column} = ?")
+                params.append(self._id(value))
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(int(start.timestamp()))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(int(end.timestamp()))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT province, grade, ts, price FROM prices {where} ORDER BY province, grade, ts", params)
+        names = self.names
+        return [(names[p], names[g], ts, from_units(price)) for p, g, ts, price in rows]
+
+    def extend(self, rows: Iterable[Tuple[str, str, int, Decimal]]):
+        """批量导入 (province, grade, ts, price)，用于回填"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO prices (province, grade, ts, price) VALUES (?, ?, ?, ?)",
+                ((self._id(p, True), self._id(g, True), ts, to_units(price)) for p, g, ts, price in rows))
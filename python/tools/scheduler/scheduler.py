@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+常驻调度进程：在一个进程内按 cron 表达式定时运行油价、指数、DigVPS 三个任务
+
+与"外部 cron 每次启动一个容器"相比，解释器启动、导入 lxml/bs4/curl_cffi
+只发生一次，三个脚本共用的 HTTP 引擎（common/http_client：连接池、DNS 缓存）在多次运行之间保持。
+- 调度：标准 5 段 cron（分 时 日 月 周），每次触发时间随机推迟 0~SCHEDULE_JITTER 秒
+- 不重叠：任务在同一个线程中依次运行；另外按任务加文件锁，
+  手动 --run 或仍在运行的旧容器持有锁时跳过本次触发
+- 错过的触发（前一个任务运行过久）不补跑，按当前时间计算下一次
+
+用法：
+    python scheduler.py                # 常驻运行
+    python scheduler.py --list         # 列出各任务接下来的触发时间
+    python scheduler.py --run oil      # 立即运行一次指定任务后退出
+"""
+
+import argparse
+import fcntl
+import heapq
+import logging
+import os
+import random
+import shlex
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+TOOLS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # python/tools
+# 容器内各脚本与本文件同在 /app；本地运行时从各工具目录导入
+for sub in ("oil_price", "get_qqq", "digvps_push"):
+    sys.path.insert(0, os.path.join(TOOLS, sub))
+sys.path.insert(0, TOOLS)
+
+from common.http_cache import CACHE_DIR  # noqa: E402
+
+# ==================== 配置 ====================
+
+# 各任务的 cron 表达式（容器时区，默认 Asia/Shanghai）；设为空字符串表示停用该任务
+OIL_SCHEDULE = os.getenv("OIL_SCHEDULE", "0 9 * * *")
+INDEX_SCHEDULE = os.getenv("INDEX_SCHEDULE", "30 5 * * 2-6")  # 美股收盘后
+DIGVPS_SCHEDULE = os.getenv("DIGVPS_SCHEDULE", "*/30 * * * *")
+# 油价任务的命令行参数，如 "--all" 或 "--provinces zhejiang,jiangsu"
+OIL_ARGS = os.getenv("OIL_ARGS", "")
+SCHEDULE_JITTER = float(os.getenv("SCHEDULE_JITTER", "60"))
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+
+logger = logging.getLogger("scheduler")
+
+
+# ==================== cron 表达式 ====================
+
+CRON_FIELDS = (  # 名称, 最小值, 最大值
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),  # 0 和 7 都表示周日
+)
+
+
+def parse_cron_field(text: str, low: int, high: int) -> Set[int]:
+    """解析单个字段：*、数字、a-b 范围、/n 步长及逗号分隔的组合"""
+    values = set()
+    for part in text.split(","):
+        expr, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start, end = (int(x) for x in expr.split("-", 1))
+        else:
+            start = int(expr)
+            end = high if step > 1 else start
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"cron 字段超出范围: {part!r}（{low}-{high}）")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """标准 5 段 cron 表达式；日与周都有限制时按 cron 惯例满足其一即可"""
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != len(CRON_FIELDS):
+            raise ValueError(f"cron 表达式需要 5 段（分 时 日 月 周）: {expr!r}")
+        self.expr = expr
+        fields = [parse_cron_field(p, low, high) for p, (_, low, high) in zip(parts, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {d % 7 for d in weekdays}
+        self.day_any = parts[2] == "*"
+        self.weekday_any = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays  # cron 以周日为 0
+        if self.day_any or self.weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt: datetime) -> datetime:
+        """严格晚于 dt 的下一个触发时间（精确到分钟）"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"cron 表达式没有可触发的时间: {self.expr!r}")
+
+
+# ==================== 任务 ====================
+
+@dataclass(order=True)
+class Job:
+    next_run: float
+    name: str = field(compare=False)
+    schedule: CronSchedule = field(compare=False)
+    target: Callable[[], None] = field(compare=False)
+    jitter: float = field(default=SCHEDULE_JITTER, compare=False)
+    runs: int = field(default=0, compare=False)
+    failures: int = field(default=0, compare=False)
+    # 事件驱动的额外触发：给定当前时间返回下一次应运行的时间（无则 None），与 cron 取较早者
+    extra: Optional[Callable[[datetime], Optional[datetime]]] = field(default=None, compare=False)
+
+    def plan_next(self, now: Optional[float] = None) -> float:
+        """按当前时间计算下一次触发（cron 触发含随机推迟），错过的触发不补跑"""
+        now = time.time() if now is None else now
+        fire = self.schedule.next_after(datetime.fromtimestamp(now)).timestamp()
+        self.next_run = fire + random.uniform(0, self.jitter)
+        if self.extra is not None:
+            event = self.extra(datetime.fromtimestamp(now))
+            if event is not None and event.timestamp() < self.next_run:
+                self.next_run = max(event.timestamp(), now)
+        return self.next_run
+
+
+class JobLock:
+    """按任务名加的排他文件锁（非阻塞），防止与其他进程中的同名任务重叠"""
+
+    def __init__(self, name: str, directory: str = LOCK_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.lock")
+        self.fd = None
+
+    def __enter__(self) -> bool:
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            os.close(self.fd)
+            self.fd = None
+            return False
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+def run_job(job: Job) -> bool:
+    """运行一次任务，返回是否成功；任务内的异常不影响调度进程"""
+    with JobLock(job.name) as locked:
+        if not locked:
+            logger.warning("任务 %s 正在其他进程中运行，跳过本次触发", job.name)
+            return False
+        logger.info("开始运行任务 %s", job.name)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        ok = True
+        try:
+            job.target()
+        except (Exception, SystemExit):
+            ok = False
+            job.failures += 1
+            logger.exception("任务 %s 运行出错", job.name)
+        job.runs += 1
+        # 进程 CPU 时间包含推送等后台线程，仅作参考
+        logger.info("任务 %s %s，耗时 %.2fs（CPU %.2fs），累计运行 %d 次、失败 %d 次",
+                    job.name, "完成" if ok else "失败", time.perf_counter() - started,
+                    time.process_time() - cpu_started, job.runs, job.failures)
+        return ok
+
+
+def build_jobs() -> Dict[str, Job]:
+    """导入三个脚本（只在启动时导入一次）并按配置创建任务"""
+    import get_price
+    import index_notify
+    import digvps_update_push
+
+    oil_args = shlex.split(OIL_ARGS)
+    if INDEX_SCHEDULE.strip() and "POLL_INTERVAL" not in os.environ:
+        # 指数任务的盘中行情缓存时长随运行间隔变化：按 cron 相邻两次触发的间隔计算
+        cron = CronSchedule(INDEX_SCHEDULE)
+        first = cron.next_after(datetime.now())
+        index_notify.POLL_INTERVAL = (cron.next_after(first) - first).total_seconds()
+    targets = {
+        # 显式传入参数列表，避免脚本解析调度进程自己的命令行；
+        # 调价窗口生效后按 get_price 记录的窗口密集轮询，其余时间只按 OIL_SCHEDULE 运行
+        "oil": (OIL_SCHEDULE, lambda: get_price.main(oil_args), get_price.adjustment_store.next_poll),
+        "index": (INDEX_SCHEDULE, lambda: index_notify.main([]), None),
+        "digvps": (DIGVPS_SCHEDULE, digvps_update_push.main, None),
+    }
+    jobs = {}
+    for name, (expr, target, extra) in targets.items():
+        if not expr.strip():
+            logger.info("任务 %s 未配置调度，已停用", name)
+            continue
+        jobs[name] = Job(0.0, name, CronSchedule(expr), target, extra=extra)
+    return jobs
+
+
+def serve(jobs: List[Job], stop: threading.Event):
+    """按触发时间依次运行任务，直到 stop 被置位（当前任务会先运行完）"""
+    queue = []
+    for job in jobs:
+        job.plan_next()
+        heapq.heappush(queue, job)
+        logger.info("任务 %s（%s）下次运行: %s", job.name, job.schedule.expr,
+                    datetime.fromtimestamp(job.next_run).strftime("%Y-%m-%d %H:%M:%S"))
+
+    while queue and not stop.is_set():
+        job = queue[0]
+        if stop.wait(max(0.0, job.next_run - time.time())):
+            break
+        heapq.heappop(queue)
+        run_job(job)
+        job.plan_next()
+        heapq.heappush(queue, job)
+        logger.info("任务 %s 下次运行: %s", job.name,
+                    datetime.fromtimestamp(job.next_run).strftime("%Y-%m-%d %H:%M:%S"))
+    logger.info("调度进程退出")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="列出各任务接下来的触发时间后退出")
+    parser.add_argument("--run", metavar="JOB", help="立即运行一次指定任务后退出（oil / index / digvps）")
+    args = parser.parse_args(argv)
+
+    jobs = build_jobs()
+    if args.list:
+        now = datetime.now()
+        for job in jobs.values():
+            fires, t = [], now
+            for _ in range(3):
+                t = job.schedule.next_after(t)
+                fires.append(t.strftime("%m-%d %H:%M"))
+            print(f"{job.name:<8} {job.schedule.expr:<16} {', '.join(fires)}（另加 0~{job.jitter:.0f}s 随机推迟）")
+            event = job.extra(now) if job.extra else None
+            if event is not None:
+                print(f"{'':<8} 事件触发: {event:%m-%d %H:%M}")
+        return
+    if args.run:
+        if args.run not in jobs:
+            parser.error(f"未知任务: {args.run}，可选 {', '.join(jobs)}")
+        sys.exit(0 if run_job(jobs[args.run]) else 1)
+
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    serve(list(jobs.values()), stop)
+
+
+if __name__ == "__main__":
+    main()